@@ -24,7 +24,6 @@ class AtlasAnalJobBroker (JobBrokerBase):
     # constructor
     def __init__(self,ddmIF,taskBufferIF):
         JobBrokerBase.__init__(self,ddmIF,taskBufferIF)
-        self.dataSiteMap = {}
 
 
         
@@ -37,7 +36,7 @@ class AtlasAnalJobBroker (JobBrokerBase):
 
 
     # main
-    def doBrokerage(self,taskSpec,cloudName,inputChunk,taskParamMap):
+    def doBrokerage(self,taskSpec,cloudName,inputChunk,taskParamMap,liveCounter=None,lockIDs=None):
         # make logger
         tmpLog = MsgWrapper(logger,'<jediTaskID={0}>'.format(taskSpec.jediTaskID),
                             monToken='<jediTaskID={0} {1}>'.format(taskSpec.jediTaskID,
@@ -421,12 +420,13 @@ class AtlasAnalJobBroker (JobBrokerBase):
         # selection for data availability
         hasDDS = False
         dataWeight = {}
+        dataSiteMap = {}
         remoteSourceList = {}
         if inputChunk.getDatasets() != []:
             oldScanSiteList = copy.copy(scanSiteList)
             for datasetSpec in inputChunk.getDatasets():
                 datasetName = datasetSpec.datasetName
-                if not self.dataSiteMap.has_key(datasetName):
+                if not dataSiteMap.has_key(datasetName):
                     # get the list of sites where data is available
                     tmpLog.debug('getting the list of sites where {0} is available'.format(datasetName))
                     tmpSt,tmpRet = AtlasBrokerUtils.getAnalSitesWithData(scanSiteList,
@@ -445,7 +445,7 @@ class AtlasAnalJobBroker (JobBrokerBase):
                         self.sendLogMessage(tmpLog)
                         return retFatal
                     # append
-                    self.dataSiteMap[datasetName] = tmpRet
+                    dataSiteMap[datasetName] = tmpRet
                     if datasetName.startswith('ddo'):
                         tmpLog.debug(' {0} sites'.format(len(tmpRet)))
                     else:
@@ -468,7 +468,7 @@ class AtlasAnalJobBroker (JobBrokerBase):
                                     datasetSpec.setDistributed()
                                     tmpLog.debug(' {0} is distributed'.format(datasetName))
                 # check if the data is available at somewhere
-                if self.dataSiteMap[datasetName] == {}:
+                if dataSiteMap[datasetName] == {}:
                     tmpLog.error('{0} is unavailable at any site'.format(datasetName))
                     taskSpec.setErrDiag(tmpLog.uploadLog(taskSpec.jediTaskID))
                     # send info to logger
@@ -478,7 +478,7 @@ class AtlasAnalJobBroker (JobBrokerBase):
             scanSiteList = None
             scanSiteListOnDisk = None
             normFactor = 0
-            for datasetName,tmpDataSite in self.dataSiteMap.iteritems():
+            for datasetName,tmpDataSite in dataSiteMap.iteritems():
                 normFactor += 1
                 # get sites where replica is available
                 tmpSiteList = AtlasBrokerUtils.getAnalSitesWithDataDisk(tmpDataSite,includeTape=True)
@@ -42,28 +42,42 @@ class AtlasProdJobBroker (JobBrokerBase):
     # constructor
     def __init__(self,ddmIF,taskBufferIF):
         JobBrokerBase.__init__(self,ddmIF, taskBufferIF)
-        self.hospitalQueueMap = AtlasBrokerUtils.getHospitalQueues(self.siteMapper)
-        self.dataSiteMap = {}
         self.suppressLogSending = False
 
-        self.nwActive = taskBufferIF.getConfigValue(COMPONENT, 'NW_ACTIVE', APP, VO)
+    # refresh SiteMapper and config values since the instance may live for the whole process
+    def refresh(self):
+        JobBrokerBase.refresh(self)
+        self.hospitalQueueMap = AtlasBrokerUtils.getHospitalQueues(self.siteMapper)
+        self.readConfigValues()
+
+    # read config values
+    def readConfigValues(self):
+        # get config values in one batch
+        with self.taskBufferIF.batch() as tbBatch:
+            idxNwActive = tbBatch.getConfigValue(COMPONENT, 'NW_ACTIVE', APP, VO)
+            idxNwQueueImportance = tbBatch.getConfigValue(COMPONENT, 'NW_QUEUE_IMPORTANCE', APP, VO)
+            idxNwThreshold = tbBatch.getConfigValue(COMPONENT, 'NW_THRESHOLD', APP, VO)
+            idxQueueThreshold = tbBatch.getConfigValue(COMPONENT, 'NQUEUED_SAT_CAP', APP, VO)
+            idxNwWeightMultiplier = tbBatch.getConfigValue(COMPONENT, 'NW_WEIGHT_MULTIPLIER', APP, VO)
+
+        self.nwActive = tbBatch.getResult(idxNwActive)
         if self.nwActive is None:
             self.nwActive = False
 
-        self.nwQueueImportance = taskBufferIF.getConfigValue(COMPONENT, 'NW_QUEUE_IMPORTANCE', APP, VO)
+        self.nwQueueImportance = tbBatch.getResult(idxNwQueueImportance)
         if self.nwQueueImportance is None:
             self.nwQueueImportance = 0.5
         self.nwThroughputImportance = 1 - self.nwQueueImportance
 
-        self.nw_threshold = taskBufferIF.getConfigValue(COMPONENT, 'NW_THRESHOLD', APP, VO)
+        self.nw_threshold = tbBatch.getResult(idxNwThreshold)
         if self.nw_threshold is None:
             self.nw_threshold = 1.7
 
-        self.queue_threshold = taskBufferIF.getConfigValue(COMPONENT, 'NQUEUED_SAT_CAP', APP, VO)
+        self.queue_threshold = tbBatch.getResult(idxQueueThreshold)
         if self.queue_threshold is None:
             self.queue_threshold = 150
 
-        self.nw_weight_multiplier = taskBufferIF.getConfigValue(COMPONENT, 'NW_WEIGHT_MULTIPLIER', APP, VO)
+        self.nw_weight_multiplier = tbBatch.getResult(idxNwWeightMultiplier)
         if self.nw_weight_multiplier is None:
             self.nw_weight_multiplier = 1
 
@@ -147,7 +161,8 @@ class AtlasProdJobBroker (JobBrokerBase):
 
 
     # main
-    def doBrokerage(self, taskSpec, cloudName, inputChunk, taskParamMap, hintForTB=False, siteListForTB=None, glLog=None):
+    def doBrokerage(self, taskSpec, cloudName, inputChunk, taskParamMap, hintForTB=False, siteListForTB=None, glLog=None,
+                    liveCounter=None, lockIDs=None):
         # suppress sending log
         if hintForTB:
             self.suppressLogSending = True
@@ -208,8 +223,13 @@ class AtlasProdJobBroker (JobBrokerBase):
             scanSiteList = self.siteMapper.getCloud(cloudName)['sites']
             tmpLog.debug('cloud=%s has %s candidates' % (cloudName,len(scanSiteList)))
 
+        # get job statistics, site mapping and pilot activity in parallel since they are independent
+        jobStatFuture = self.taskBufferIF.async_.getJobStatisticsWithWorkQueue_JEDI(taskSpec.vo,taskSpec.prodSourceLabel)
+        siteMappingFuture = self.taskBufferIF.async_.getPandaSiteToAtlasSiteMapping()
+        if not sitePreAssigned:
+            nWNmapFuture = self.taskBufferIF.async_.getCurrentSiteData()
         # get job statistics
-        tmpSt,jobStatMap = self.taskBufferIF.getJobStatisticsWithWorkQueue_JEDI(taskSpec.vo,taskSpec.prodSourceLabel)
+        tmpSt,jobStatMap = jobStatFuture.result()
         if not tmpSt:
             tmpLog.error('failed to get job statistics')
             taskSpec.setErrDiag(tmpLog.uploadLog(taskSpec.jediTaskID))
@@ -289,7 +309,7 @@ class AtlasProdJobBroker (JobBrokerBase):
         #################################################
         # WORLD CLOUD: get the nucleus and the network map
         nucleus = taskSpec.nucleus
-        siteMapping = self.taskBufferIF.getPandaSiteToAtlasSiteMapping()
+        siteMapping = siteMappingFuture.result()
 
         if taskSpec.useWorldCloud() and nucleus:
             # get connectivity stats to the nucleus in case of WORLD cloud
@@ -399,13 +419,14 @@ class AtlasProdJobBroker (JobBrokerBase):
         ######################################
         # selection for data availability
         """
+        dataSiteMap = {}
         if not sitePreAssigned and not siteListPreAssigned:
             for datasetSpec in inputChunk.getDatasets():
                 datasetName = datasetSpec.datasetName
                 # ignore DBR
                 if DataServiceUtils.isDBR(datasetName):
                     continue
-                if not self.dataSiteMap.has_key(datasetName):
+                if not dataSiteMap.has_key(datasetName):
                     # get the list of sites where data is available
                     tmpLog.debug('getting the list of sites where {0} is available'.format(datasetName))
                     tmpSt,tmpRet = AtlasBrokerUtils.getSitesWithData(self.siteMapper,
@@ -422,21 +443,21 @@ class AtlasProdJobBroker (JobBrokerBase):
                         self.sendLogMessage(tmpLog)
                         return retFatal
                     # append
-                    self.dataSiteMap[datasetName] = tmpRet
+                    dataSiteMap[datasetName] = tmpRet
                     tmpLog.debug('map of data availability : {0}'.format(str(tmpRet)))
                 # check if T1 has the data
-                if self.dataSiteMap[datasetName].has_key(cloudName):
+                if dataSiteMap[datasetName].has_key(cloudName):
                     cloudHasData = True
                 else:
                     cloudHasData = False
                 t1hasData = False
                 if cloudHasData:
-                    for tmpSE,tmpSeVal in self.dataSiteMap[datasetName][cloudName]['t1'].iteritems():
+                    for tmpSE,tmpSeVal in dataSiteMap[datasetName][cloudName]['t1'].iteritems():
                         if tmpSeVal['state'] == 'complete':
                             t1hasData = True
                             break
                     # T1 has incomplete data while no data at T2
-                    if not t1hasData and self.dataSiteMap[datasetName][cloudName]['t2'] == []:
+                    if not t1hasData and dataSiteMap[datasetName][cloudName]['t2'] == []:
                         # use incomplete data at T1 anyway
                         t1hasData = True
                 # data is missing at T1         
@@ -448,7 +469,7 @@ class AtlasProdJobBroker (JobBrokerBase):
                     # use T2 until data is complete at T1
                     newScanSiteList = []
                     for tmpSiteName in scanSiteList:                    
-                        if cloudHasData and tmpSiteName in self.dataSiteMap[datasetName][cloudName]['t2']:
+                        if cloudHasData and tmpSiteName in dataSiteMap[datasetName][cloudName]['t2']:
                             newScanSiteList.append(tmpSiteName)
                         else:
                             tmpSiteSpec = self.siteMapper.getSite(tmpSiteName)
@@ -909,7 +930,7 @@ class AtlasProdJobBroker (JobBrokerBase):
         # selection for nPilot
         nPilotMap = {}
         if not sitePreAssigned:
-            nWNmap = self.taskBufferIF.getCurrentSiteData()
+            nWNmap = nWNmapFuture.result()
             newScanSiteList = []
             for tmpSiteName in scanSiteList:
                 tmpSiteSpec = self.siteMapper.getSite(tmpSiteName)
@@ -934,6 +955,9 @@ class AtlasProdJobBroker (JobBrokerBase):
         # return if to give a hint for task brokerage
         if hintForTB:
             return self.SC_SUCCEEDED,scanSiteList
+        # get job statistics with priority while getting available files
+        jobStatPrioFuture = self.taskBufferIF.async_.getJobStatisticsWithWorkQueue_JEDI(taskSpec.vo,
+                                                                                        taskSpec.prodSourceLabel)
         ######################################
         # get available files
         siteSizeMap = {}        
@@ -1022,8 +1046,7 @@ class AtlasProdJobBroker (JobBrokerBase):
                 return retTmpError
         ######################################
         # calculate weight
-        tmpSt,jobStatPrioMap = self.taskBufferIF.getJobStatisticsWithWorkQueue_JEDI(taskSpec.vo,
-                                                                                    taskSpec.prodSourceLabel)
+        tmpSt,jobStatPrioMap = jobStatPrioFuture.result()
         if not tmpSt:
             tmpLog.error('failed to get job statistics with priority')
             taskSpec.setErrDiag(tmpLog.uploadLog(taskSpec.jediTaskID))
@@ -1037,7 +1060,7 @@ class AtlasProdJobBroker (JobBrokerBase):
         for tmpSiteName in scanSiteList:
             tmpSiteSpec = self.siteMapper.getSite(tmpSiteName)
             nRunning   = AtlasBrokerUtils.getNumJobs(jobStatPrioMap,tmpSiteName,'running',None,taskSpec.workQueue_ID)
-            nDefined   = AtlasBrokerUtils.getNumJobs(jobStatPrioMap,tmpSiteName,'defined',None,taskSpec.workQueue_ID) + self.getLiveCount(tmpSiteName)
+            nDefined   = AtlasBrokerUtils.getNumJobs(jobStatPrioMap,tmpSiteName,'defined',None,taskSpec.workQueue_ID) + self.getLiveCount(tmpSiteName,liveCounter)
             nAssigned  = AtlasBrokerUtils.getNumJobs(jobStatPrioMap,tmpSiteName,'assigned',None,taskSpec.workQueue_ID)
             nActivated = AtlasBrokerUtils.getNumJobs(jobStatPrioMap,tmpSiteName,'activated',None,taskSpec.workQueue_ID) + \
                          AtlasBrokerUtils.getNumJobs(jobStatPrioMap,tmpSiteName,'throttled',None,taskSpec.workQueue_ID)
@@ -1158,7 +1181,7 @@ class AtlasProdJobBroker (JobBrokerBase):
             lockedByBrokerage = False
             if taskSpec.useWorldCloud():
                 lockedByBrokerage = self.checkSiteLock(taskSpec.vo,taskSpec.prodSourceLabel,
-                                                       tmpSiteName,taskSpec.workQueue_ID)
+                                                       tmpSiteName,taskSpec.workQueue_ID,lockIDs)
             # check cap with nRunning
             cutOffValue = 20
             cutOffFactor = 2 
@@ -1279,7 +1302,7 @@ class AtlasProdJobBroker (JobBrokerBase):
         # lock sites for WORLD
         if taskSpec.useWorldCloud():
             for tmpSiteName in scanSiteList:
-                #self.lockSite(taskSpec.vo,taskSpec.prodSourceLabel,tmpSiteName,taskSpec.workQueue_ID)
+                #self.lockSite(taskSpec.vo,taskSpec.prodSourceLabel,tmpSiteName,taskSpec.workQueue_ID,lockIDs)
                 pass
         tmpLog.debug('final {0} candidates'.format(len(scanSiteList)))
         # return
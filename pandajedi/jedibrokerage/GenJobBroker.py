@@ -23,7 +23,7 @@ class GenJobBroker (JobBrokerBase):
 
 
     # main
-    def doBrokerage(self,taskSpec,cloudName,inputChunk,taskParamMap):
+    def doBrokerage(self,taskSpec,cloudName,inputChunk,taskParamMap,liveCounter=None,lockIDs=None):
         # make logger
         tmpLog = MsgWrapper(logger,'<jediTaskID={0}>'.format(taskSpec.jediTaskID))
         tmpLog.debug('start')
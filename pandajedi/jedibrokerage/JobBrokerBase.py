@@ -11,6 +11,7 @@ class JobBrokerBase (object):
         self.baseLockID = None
         self.useLock = False
         self.testMode = False
+        self.siteMapper = None
         self.refresh()
 
 
@@ -25,41 +26,59 @@ class JobBrokerBase (object):
 
 
 
-    def getLiveCount(self,siteName):
-        if self.liveCounter == None:
+    # liveCounter given as an argument is used since the instance may be shared by threads
+    def getLiveCount(self,siteName,liveCounter=None):
+        if liveCounter == None:
+            liveCounter = self.liveCounter
+        if liveCounter == None:
             return 0
-        return self.liveCounter.get(siteName)
+        return liveCounter.get(siteName)
+
+
+
+    # make base lock ID and lock ID for a thread
+    @staticmethod
+    def makeLockIDs(pid,tid):
+        baseLockID = '{0}-jbr'.format(pid)
+        return baseLockID,'{0}-{1}'.format(baseLockID,tid)
 
 
 
     def setLockID(self,pid,tid):
-        self.baseLockID = '{0}-jbr'.format(pid)
-        self.lockID = '{0}-{1}'.format(self.baseLockID,tid)
+        self.baseLockID,self.lockID = self.makeLockIDs(pid,tid)
+
+
+
+    # lockIDs is a tuple of base lock ID and lock ID made by makeLockIDs
+    def getLockIDs(self,lockIDs=None):
+        if lockIDs == None:
+            return self.baseLockID,self.lockID
+        return lockIDs
 
 
 
-    def getBaseLockID(self):
+    def getBaseLockID(self,lockIDs=None):
         if self.useLock:
-            return self.baseLockID
+            return self.getLockIDs(lockIDs)[0]
         return None
 
 
 
-    def releaseSiteLock(self,vo,prodSourceLabel,queue_id):
+    def releaseSiteLock(self,vo,prodSourceLabel,queue_id,lockIDs=None):
         if self.useLock:
-            self.taskBufferIF.unlockProcessWithPID_JEDI(vo,prodSourceLabel,queue_id,self.lockID,False)
+            self.taskBufferIF.unlockProcessWithPID_JEDI(vo,prodSourceLabel,queue_id,self.getLockIDs(lockIDs)[1],False)
         
 
 
-    def lockSite(self,vo,prodSourceLabel,siteName,queue_id):
+    def lockSite(self,vo,prodSourceLabel,siteName,queue_id,lockIDs=None):
         if not self.useLock:
             self.useLock = True
-        self.taskBufferIF.lockProcess_JEDI(vo,prodSourceLabel,siteName,queue_id,self.lockID,True)
+        self.taskBufferIF.lockProcess_JEDI(vo,prodSourceLabel,siteName,queue_id,self.getLockIDs(lockIDs)[1],True)
 
 
 
-    def checkSiteLock(self,vo,prodSourceLabel,siteName,queue_id):
-        return self.taskBufferIF.checkProcessLock_JEDI(vo,prodSourceLabel,siteName,queue_id,self.baseLockID,True)
+    def checkSiteLock(self,vo,prodSourceLabel,siteName,queue_id,lockIDs=None):
+        return self.taskBufferIF.checkProcessLock_JEDI(vo,prodSourceLabel,siteName,queue_id,self.getLockIDs(lockIDs)[0],True)
 
 
 
@@ -1,4 +1,6 @@
 import sys
+import time
+import threading
 from MsgWrapper import MsgWrapper
 
 _factoryModuleName = __name__.split('.')[-1]
@@ -29,6 +31,21 @@ class FactoryBase:
         self.classMap = {}
         
 
+    # initialize all modules or reuse implementations made with the same config in this process.
+    # args are used only when implementations are made for the first time
+    def initializeSharedMods(self,*args):
+        key = (self.__class__.__name__,self.modConfig,tuple(self.vos),tuple(self.sourceLabels))
+        registry.lock.acquire()
+        try:
+            if not key in registry.entryMap:
+                self.initializeMods(*args)
+                registry.entryMap[key] = (self.implMap,self.classMap)
+            self.implMap,self.classMap = registry.entryMap[key]
+        finally:
+            registry.lock.release()
+        return True
+
+
     # initialize all modules
     def initializeMods(self,*args):
         # parse config
@@ -189,3 +206,53 @@ class FactoryBase:
         if impl == None:
             return None
         return impl.__class__.__name__
+
+
+
+# registry of implementations which live for the whole process
+class FactoryRegistry:
+
+    # constructor
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entryMap = {}
+        self.siteMapperVersion = None
+        self.refreshTime = None
+
+
+    # refresh all implementations when SiteMapper is updated or refresh interval passed
+    def refresh(self,siteMapperVersion=None,interval=600):
+        timeNow = time.time()
+        self.lock.acquire()
+        try:
+            if siteMapperVersion != None and siteMapperVersion == self.siteMapperVersion and \
+                    self.refreshTime != None and timeNow-self.refreshTime < interval:
+                return False
+            implMapList = [implMap for implMap,classMap in self.entryMap.itervalues()]
+        finally:
+            self.lock.release()
+        # refresh implementations
+        for implMap in implMapList:
+            for voImplMap in implMap.itervalues():
+                for srcImplMap in voImplMap.itervalues():
+                    for impl in srcImplMap.itervalues():
+                        impl.refresh()
+        self.siteMapperVersion = siteMapperVersion
+        self.refreshTime = timeNow
+        return True
+
+
+    # clear all implementations so that they are made with the current config
+    def clear(self):
+        self.lock.acquire()
+        try:
+            self.entryMap = {}
+            self.siteMapperVersion = None
+            self.refreshTime = None
+        finally:
+            self.lock.release()
+
+
+
+# registry in this process
+registry = FactoryRegistry()
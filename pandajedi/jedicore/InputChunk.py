@@ -2,6 +2,7 @@ import copy
 import random
 
 import JediCoreUtils
+from WeightedSampler import WeightedSampler
 
 from pandacommon.pandalogger.PandaLogger import PandaLogger
 logger = PandaLogger().getLogger(__name__.split('.')[-1])
@@ -32,6 +33,9 @@ class InputChunk:
         self.siteCandidates = {}
         # the list of site candidates for jumbo jobs
         self.siteCandidatesJumbo = {}
+        # weighted sampler of site candidates and the map of site name to index in the sampler
+        self.siteSampler = None
+        self.siteIndexMap = {}
         # the name of master index
         self.masterIndexName = None
         # dataset mapping including indexes of files/events
@@ -53,6 +57,8 @@ class InputChunk:
         self.ramCount = ramCount
         #flag to set if inputchunk is empty
         self.isEmpty = False
+        # cache of statistics of atomic subchunks
+        self.atomStatsCache = None
 
 
 
@@ -114,9 +120,28 @@ class InputChunk:
 
 
 
+    # get used counters
+    def getUsedCounters(self):
+        usedCounters = []
+        for tmpKey,tmpVal in self.datasetMap.iteritems():
+            usedCounters.append((tmpKey,tmpVal['used']))
+        usedCounters.sort()
+        return tuple(usedCounters)
+
+
+
+    # set used counters
+    def setUsedCounters(self,usedCounters):
+        for tmpKey,tmpUsed in usedCounters:
+            self.datasetMap[tmpKey]['used'] = tmpUsed
+
+
+
     # add site candidates
     def addSiteCandidate(self,siteCandidateSpec):
         self.siteCandidates[siteCandidateSpec.siteName] = siteCandidateSpec
+        # the sampler is remade with new candidates
+        self.siteSampler = None
         return
 
 
@@ -130,7 +155,6 @@ class InputChunk:
 
     # get one site candidate randomly
     def getOneSiteCandidate(self,nSubChunks=0,ngSites=None):
-        retSiteCandidate = None
         if ngSites == None:
             ngSites = []
         ngSites = copy.copy(ngSites)
@@ -144,31 +168,25 @@ class InputChunk:
                         # skip if the first file is unavalble at the site
                         if not siteCandidate.isAvailableFile(tmpFileSpec):
                             ngSites.append(siteCandidate.siteName)
-        # get total weight
-        totalWeight = 0
-        weightList  = []
-        siteCandidateList = self.siteCandidates.values()
-        newSiteCandidateList = []
-        for siteCandidate in siteCandidateList:
-            # remove NG sites
-            if siteCandidate.siteName in ngSites:
-                continue
-            totalWeight += siteCandidate.weight
-            newSiteCandidateList.append(siteCandidate)
-        siteCandidateList = newSiteCandidateList
+        # make the sampler with weights at the first call
+        if self.siteSampler == None:
+            siteCandidateList = self.siteCandidates.values()
+            self.siteSampler = WeightedSampler(siteCandidateList,
+                                               [siteCandidate.weight for siteCandidate in siteCandidateList])
+            self.siteIndexMap = {}
+            for idx,siteCandidate in enumerate(siteCandidateList):
+                self.siteIndexMap[siteCandidate.siteName] = idx
+        # remove NG sites
+        ngIndexes = set()
+        for siteName in ngSites:
+            if siteName in self.siteIndexMap:
+                ngIndexes.add(self.siteIndexMap[siteName])
+        # draw
+        idx = self.siteSampler.draw(ngIndexes)
         # empty
-        if siteCandidateList == []:
+        if idx == None:
             return None
-        # get random number
-        rNumber = random.random() * totalWeight
-        for siteCandidate in siteCandidateList:
-            rNumber -= siteCandidate.weight
-            if rNumber <= 0:
-                retSiteCandidate = siteCandidate
-                break
-        # return something as a protection against precision of float
-        if retSiteCandidate == None:
-            retSiteCandidate = random.choice(siteCandidateList)
+        retSiteCandidate = self.siteSampler.itemList[idx]
         # modify weight
         try:
             if retSiteCandidate.nQueuedJobs != None and retSiteCandidate.nAssignedJobs != None:
@@ -178,7 +196,8 @@ class InputChunk:
                 oldNumAssigned = retSiteCandidate.nAssignedJobs
                 retSiteCandidate.nAssignedJobs += nSubChunks
                 newNumAssigned = retSiteCandidate.nAssignedJobs
-                siteCandidate.weight = siteCandidate.weight * float(oldNumQueued+1) / float(newNumQueued+1)
+                retSiteCandidate.weight = retSiteCandidate.weight * float(oldNumQueued+1) / float(newNumQueued+1)
+                self.siteSampler.update(idx,retSiteCandidate.weight)
         except:
             pass
         return retSiteCandidate
@@ -266,8 +285,42 @@ class InputChunk:
         useBoundary = self.taskSpec.useGroupWithBoundaryID()    
         # LB
         respectLB = self.taskSpec.respectLumiblock()
-        maxAtomSize = 0    
+        # key of the cache which is invalidated when parameters or files are changed
+        cacheKey = [self.isMerging,nFilesPerJob,nEventsPerJob,useBoundary,respectLB]
+        for tmpDatasetID,tmpDatasetVal in self.datasetMap.iteritems():
+            cacheKey.append((tmpDatasetID,len(tmpDatasetVal['datasetSpec'].Files)))
+        usedCounters = self.getUsedCounters()
+        # make statistics of atomic subchunks from the first file once
+        if self.atomStatsCache == None or self.atomStatsCache['key'] != cacheKey:
+            self.resetUsedCounters()
+            self.atomStatsCache = self.makeAtomStats(nFilesPerJob,nEventsPerJob,useBoundary,respectLB)
+            self.atomStatsCache['key'] = cacheKey
+        atomStats = self.atomStatsCache
+        # the first unused atomic subchunk
+        atomIndex = atomStats['indexMap'].get(usedCounters)
+        if atomIndex == None:
+            # files were used with other parameters and the position is not at a boundary of atomic subchunks
+            self.setUsedCounters(usedCounters)
+            atomStats = self.makeAtomStats(nFilesPerJob,nEventsPerJob,useBoundary,respectLB)
+            atomIndex = 0
+        # reset counters
+        self.resetUsedCounters()
+        # return
+        if effectiveSize:
+            return self.getMaxOfAtoms(atomStats,'effectiveSize')[atomIndex]
+        if getNumEvents:
+            return self.getMaxOfAtoms(atomStats,'numEvents')[atomIndex]
+        return self.getMaxOfAtoms(atomStats,'size')[atomIndex]
+
+
+
+    # make statistics of atomic subchunks from the current position. the size and the number of events
+    # are computed for each atomic subchunk together with master files, and indexes of atomic subchunks
+    # are mapped from used counters at their beginning
+    def makeAtomStats(self,nFilesPerJob,nEventsPerJob,useBoundary,respectLB):
+        atomStats = {'size':[],'numEvents':[],'masterFiles':[],'indexMap':{},'maxMap':{}}
         while True:
+            atomStats['indexMap'].setdefault(self.getUsedCounters(),len(atomStats['size']))
             # get one subchunk
             subChunk = self.getSubChunk(None,nFilesPerJob=nFilesPerJob,
                                         nEventsPerJob=nEventsPerJob,
@@ -277,23 +330,42 @@ class InputChunk:
                 break
             # get size
             tmpAtomSize = 0
+            tmpNumEvents = 0
+            tmpMasterFileList = []
             for tmpDatasetSpec,tmpFileSpecList in subChunk:
-                if (effectiveSize or getNumEvents) and not tmpDatasetSpec.isMaster():
-                    continue
                 for tmpFileSpec in tmpFileSpecList:
-                    if effectiveSize:
+                    tmpAtomSize += tmpFileSpec.fsize
+                    # only master for effective size and the number of events
+                    if not tmpDatasetSpec.isMaster():
+                        continue
+                    tmpMasterFileList.append(tmpFileSpec)
+                    tmpNumEvents += tmpFileSpec.getEffectiveNumEvents()
+            atomStats['size'].append(tmpAtomSize)
+            atomStats['numEvents'].append(tmpNumEvents)
+            atomStats['masterFiles'].append(tmpMasterFileList)
+        return atomStats
+
+
+
+    # get the list of max values over atomic subchunks from each index to the end. effective size is
+    # computed only when required since it is undefined for some files
+    def getMaxOfAtoms(self,atomStats,valueType):
+        if not valueType in atomStats['maxMap']:
+            if valueType == 'effectiveSize':
+                valueList = []
+                for tmpMasterFileList in atomStats['masterFiles']:
+                    tmpAtomSize = 0
+                    for tmpFileSpec in tmpMasterFileList:
                         tmpAtomSize += JediCoreUtils.getEffectiveFileSize(tmpFileSpec.fsize,tmpFileSpec.startEvent,
                                                                           tmpFileSpec.endEvent,tmpFileSpec.nEvents)
-                    elif getNumEvents:
-                        tmpAtomSize += tmpFileSpec.getEffectiveNumEvents()
-                    else:
-                        tmpAtomSize += tmpFileSpec.fsize
-            if maxAtomSize < tmpAtomSize:
-                maxAtomSize = tmpAtomSize
-        # reset counters
-        self.resetUsedCounters()
-        # return
-        return maxAtomSize
+                    valueList.append(tmpAtomSize)
+            else:
+                valueList = atomStats[valueType]
+            maxList = [0] * (len(valueList)+1)
+            for tmpIndex in range(len(valueList)-1,-1,-1):
+                maxList[tmpIndex] = max(maxList[tmpIndex+1],valueList[tmpIndex])
+            atomStats['maxMap'][valueType] = maxList
+        return atomStats['maxMap'][valueType]
 
 
 
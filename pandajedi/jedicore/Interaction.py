@@ -1,15 +1,27 @@
 import os
 import sys
+import mmap
 import time
 import types
+import Queue
+import cPickle
+import hashlib
+import cStringIO
+import errno
 import signal
 import datetime
+import tempfile
+import itertools
+import threading
 import multiprocessing
 import multiprocessing.reduction
 
 # patch multiprocessing
 import JediPatch
 
+import ResultCache
+from InteractionStats import stats
+
 #import multiprocessing
 #logger = multiprocessing.log_to_stderr()
 #logger.setLevel(multiprocessing.SUBDEBUG)
@@ -71,6 +83,210 @@ def dumpStdOut(sender,message):
 
 
 
+# counter for request IDs
+_requestCounter = itertools.count()
+
+# make ID which is unique across processes
+def makeRequestID():
+    return '{0}-{1}'.format(os.getpid(),_requestCounter.next())
+
+
+
+# connections rebuilt or reduced in this process
+_connectionCache = {}
+
+
+
+# payloads larger than this size in bytes are passed through shared memory by default
+defaultLargePayloadSize = 8*1024*1024
+
+# directory for large payloads
+if os.path.isdir('/dev/shm'):
+    payloadDir = '/dev/shm'
+else:
+    payloadDir = tempfile.gettempdir()
+
+
+# handle of large payload in shared memory
+class PayloadHandle(object):
+
+    # constructor
+    def __init__(self,path,size):
+        self.path = path
+        self.size = size
+
+
+
+# prefix of payload files. the PID of the child process is appended so that files can be cleaned up with the child
+payloadPrefix = 'jedi_payload_'
+
+
+
+# file-like object to pickle payload. data is kept in memory until it exceeds maxSize bytes,
+# and then the data and the rest of the stream are written to a file in shared memory
+class PayloadWriter(object):
+
+    # constructor
+    def __init__(self,maxSize,childPid):
+        self.maxSize = maxSize
+        self.childPid = childPid
+        self.buffer = cStringIO.StringIO()
+        self.file = None
+        self.path = None
+        self.size = 0
+
+    # write data
+    def write(self,data):
+        self.size += len(data)
+        if self.file != None:
+            self.file.write(data)
+            return
+        self.buffer.write(data)
+        if self.maxSize != None and self.size > self.maxSize:
+            self.spill()
+
+    # move data to a file in shared memory. data is kept in memory when shared memory is unavailable
+    def spill(self):
+        try:
+            tmpFD,self.path = tempfile.mkstemp(dir=payloadDir,prefix='{0}{1}_'.format(payloadPrefix,self.childPid))
+            self.file = os.fdopen(tmpFD,'wb')
+            self.file.write(self.buffer.getvalue())
+        except:
+            self.discard()
+            self.maxSize = None
+            return
+        self.buffer = None
+
+    # close the file
+    def close(self):
+        if self.file != None:
+            self.file.close()
+
+    # remove the file
+    def discard(self):
+        if self.file != None:
+            try:
+                self.file.close()
+            except:
+                pass
+            self.file = None
+        if self.path != None:
+            try:
+                os.remove(self.path)
+            except:
+                pass
+            self.path = None
+
+
+
+# pickle and send object. payload is pickled directly into shared memory once it gets larger than
+# largePayloadSize, and only the handle is sent. childPid is the PID of the child process at either
+# end of the pipe, the own PID by default. the size of payload is returned
+def sendObject(pipe,obj,largePayloadSize,childPid=None):
+    if childPid == None:
+        childPid = os.getpid()
+    tmpWriter = PayloadWriter(largePayloadSize,childPid)
+    try:
+        cPickle.dump(obj,tmpWriter,cPickle.HIGHEST_PROTOCOL)
+        tmpWriter.close()
+    except (IOError,OSError):
+        if tmpWriter.path == None:
+            raise
+        # pickle in memory when shared memory is full
+        tmpWriter.discard()
+        tmpWriter = PayloadWriter(None,childPid)
+        cPickle.dump(obj,tmpWriter,cPickle.HIGHEST_PROTOCOL)
+    except:
+        tmpWriter.discard()
+        raise
+    payloadSize = tmpWriter.size
+    if tmpWriter.path == None:
+        pipe.send_bytes(tmpWriter.buffer.getvalue())
+        return payloadSize
+    try:
+        pipe.send_bytes(cPickle.dumps(PayloadHandle(tmpWriter.path,payloadSize),cPickle.HIGHEST_PROTOCOL))
+    except:
+        tmpWriter.discard()
+        raise
+    return payloadSize
+
+
+
+# receive object. the object and the size of payload are returned
+def recvObject(pipe):
+    tmpStr = pipe.recv_bytes()
+    obj = cPickle.loads(tmpStr)
+    if not isinstance(obj,PayloadHandle):
+        return obj,len(tmpStr)
+    # read large payload from shared memory
+    tmpFile = open(obj.path,'rb')
+    try:
+        os.remove(obj.path)
+        tmpMap = mmap.mmap(tmpFile.fileno(),0,access=mmap.ACCESS_READ)
+        try:
+            retObj = cPickle.load(tmpMap)
+        finally:
+            tmpMap.close()
+    finally:
+        tmpFile.close()
+    return retObj,obj.size
+
+
+
+# remove payload files of a child process which were not received
+def removePayloadFiles(childPid):
+    tmpPrefix = '{0}{1}_'.format(payloadPrefix,childPid)
+    try:
+        fileNames = os.listdir(payloadDir)
+    except:
+        return
+    for fileName in fileNames:
+        if fileName.startswith(tmpPrefix):
+            try:
+                os.remove(os.path.join(payloadDir,fileName))
+            except:
+                pass
+
+
+
+# check if process is alive
+def isProcessAlive(pid):
+    try:
+        os.kill(pid,0)
+    except OSError,e:
+        if e.errno == errno.ESRCH:
+            return False
+    return True
+
+
+
+# remove stale payload files left by dead processes. files without PID are removed when they are older than maxAge sec
+def sweepPayloadFiles(maxAge=24*60*60):
+    try:
+        fileNames = os.listdir(payloadDir)
+    except:
+        return
+    timeNow = time.time()
+    for fileName in fileNames:
+        if not fileName.startswith(payloadPrefix):
+            continue
+        tmpPath = os.path.join(payloadDir,fileName)
+        try:
+            tmpPid = int(fileName[len(payloadPrefix):].split('_')[0])
+            toRemove = not isProcessAlive(tmpPid)
+        except ValueError:
+            try:
+                toRemove = timeNow-os.path.getmtime(tmpPath) > maxAge
+            except:
+                toRemove = False
+        if toRemove:
+            try:
+                os.remove(tmpPath)
+            except:
+                pass
+
+
+
 # object class for command
 class CommandObject(object):
     
@@ -79,6 +295,10 @@ class CommandObject(object):
         self.methodName = methodName
         self.argList = argList
         self.argMap = argMap
+        # ID to associate the response with the command
+        self.requestID = makeRequestID()
+        # the number of items in each chunk when the return value is streamed
+        self.chunkSize = None
 
 
 
@@ -86,10 +306,17 @@ class CommandObject(object):
 class ReturnObject(object):
 
     # constructor
-    def __init__(self):
+    def __init__(self,requestID=None):
         self.statusCode  = None
         self.errorValue  = None
         self.returnValue = None
+        self.requestID   = requestID
+        # execution time in the child
+        self.execTime    = None
+        # chunk of streamed return value which is followed by other chunks
+        self.hasMore     = False
+        # the return value was streamed
+        self.isStreamed  = False
 
 
 
@@ -101,17 +328,109 @@ class ProcessClass(object):
         self.nused = 0
         self.usedMemory = 0
         self.nMemLookup = 20
+        self.startTime = time.time()
+        # unique ID to look up the connection cache
+        self.uid = makeRequestID()
+        self.reducerPid = None
         # reduce connection to make it picklable
-        self.reduced_pipe = multiprocessing.reduction.reduce_connection(connection)
+        self.reduceConnection(connection)
 
     # get connection
     def connection(self):
+        cacheKey = (os.getpid(),self.uid)
+        # reuse the connection if the process object was reduced in this process
+        if self.reducerPid == os.getpid() and cacheKey in _connectionCache:
+            return _connectionCache[cacheKey]
         # rebuild connection
-        return self.reduced_pipe[0](*self.reduced_pipe[1])
+        conn = self.reduced_pipe[0](*self.reduced_pipe[1])
+        # replace old connection
+        self.closeConnection()
+        _connectionCache[cacheKey] = conn
+        return conn
 
     # reduce connection
     def reduceConnection(self,connection):
         self.reduced_pipe = multiprocessing.reduction.reduce_connection(connection)
+        self.reducerPid = os.getpid()
+        _connectionCache[(os.getpid(),self.uid)] = connection
+
+    # release connection to put the process object back to the queue
+    def releaseConnection(self,connection):
+        # reduce only when the connection was rebuilt from another process
+        if self.reducerPid != os.getpid():
+            self.reduceConnection(connection)
+
+    # close cached connection
+    def closeConnection(self):
+        cacheKey = (os.getpid(),self.uid)
+        if cacheKey in _connectionCache:
+            try:
+                _connectionCache[cacheKey].close()
+            except:
+                pass
+            del _connectionCache[cacheKey]
+
+    # send commands and receive responses without waiting for each response.
+    # times and payload sizes are added to timeMap
+    def exchange(self,pipe,commandObjList,timeoutPeriod,timeMap,largePayloadSize=defaultLargePayloadSize,
+                 chunkCallback=None):
+        # send all commands
+        timeMap['requestSize'] = 0
+        tmpStart = time.time()
+        for commandObj in commandObjList:
+            timeMap['requestSize'] += sendObject(pipe,commandObj,largePayloadSize,self.pid)
+        timeMap['send'] = time.time()-tmpStart
+        # receive responses
+        timeMap['replySize'] = 0
+        timeMap['recv'] = 0
+        timeMap['exec'] = 0
+        retMap = {}
+        for commandObj in commandObjList:
+            retMap[commandObj.requestID] = None
+        nReceived = 0
+        while nReceived < len(commandObjList):
+            if not pipe.poll(timeoutPeriod):
+                raise JEDITimeoutError,"did not get response for %ssec" % timeoutPeriod
+            # transfer and unpickle
+            tmpStart = time.time()
+            ret,payloadSize = recvObject(pipe)
+            timeMap['recv'] += time.time()-tmpStart
+            timeMap['replySize'] += payloadSize
+            # ignore stale responses
+            if not ret.requestID in retMap or retMap[ret.requestID] != None:
+                continue
+            # chunk of streamed return value
+            if ret.hasMore:
+                if chunkCallback != None:
+                    chunkCallback(ret.returnValue)
+                continue
+            retMap[ret.requestID] = ret
+            nReceived += 1
+            if ret.execTime != None:
+                timeMap['exec'] += ret.execTime
+        return [retMap[commandObj.requestID] for commandObj in commandObjList]
+
+    # check if the process is alive
+    def isAlive(self):
+        try:
+            # reap if the process is a child of this process
+            if os.waitpid(self.pid,os.WNOHANG)[0] != 0:
+                return False
+        except OSError:
+            pass
+        # check status since zombies are reaped by another process
+        try:
+            t = open('/proc/{0}/status'.format(self.pid))
+            v = t.read()
+            t.close()
+        except IOError:
+            return False
+        for line in v.split('\n'):
+            if line.startswith('State'):
+                if line.split()[1] in ['Z','X']:
+                    return False
+                break
+        return True
 
     # get memory usage
     def getMemUsage(self):
@@ -155,90 +474,409 @@ class MethodClass(object):
     def __call__(self,*args,**kwargs):
         commandObj = CommandObject(self.methodName,
                                    args,kwargs)
+        ret = self.voIF.sendCommands([commandObj],self.methodName,True)[0]
+        return ret.returnValue
+
+
+
+# future for a method called asynchronously
+class FutureClass(object):
+
+    # constructor
+    def __init__(self):
+        self.event = threading.Event()
+        self.returnValue = None
+        self.excInfo = None
+
+    # set result
+    def setResult(self,returnValue,excInfo):
+        self.returnValue = returnValue
+        self.excInfo = excInfo
+        self.event.set()
+
+    # check if done
+    def done(self):
+        return self.event.isSet()
+
+    # get return value. exception is raised if the call failed
+    def result(self,timeout=None):
+        self.event.wait(timeout)
+        if not self.event.isSet():
+            raise JEDITimeoutError,'did not get result for %ssec' % timeout
+        if self.excInfo != None:
+            raise self.excInfo[0],self.excInfo[1],self.excInfo[2]
+        return self.returnValue
+
+
+
+# get results of futures in order
+def gather(futureList,timeout=None):
+    return [future.result(timeout) for future in futureList]
+
+
+
+# iterator over chunks of return value streamed from a child. the iterator must be consumed to the end
+# since the child is occupied until the last chunk is received
+class ChunkIterator(object):
+
+    # constructor
+    def __init__(self,voIF,commandObj,maxChunks=10):
+        self.chunkQueue = Queue.Queue(maxChunks)
+        # return value when it was not streamed
+        self.returnValue = None
+        self.isStreamed = False
+        self.excInfo = None
+        self.isDone = False
+        thr = threading.Thread(target=self.receive,args=(voIF,commandObj))
+        thr.daemon = True
+        thr.start()
+
+    # receive chunks
+    def receive(self,voIF,commandObj):
+        try:
+            ret = voIF.sendCommands([commandObj],commandObj.methodName,True,self.chunkQueue.put)[0]
+            self.returnValue = ret.returnValue
+            self.isStreamed = ret.isStreamed
+        except:
+            self.excInfo = sys.exc_info()
+        # end of stream
+        self.chunkQueue.put(None)
+
+    def __iter__(self):
+        return self
+
+    # get next chunk
+    def next(self):
+        if self.isDone:
+            raise StopIteration
+        chunk = self.chunkQueue.get()
+        if chunk == None:
+            self.isDone = True
+            if self.excInfo != None:
+                raise self.excInfo[0],self.excInfo[1],self.excInfo[2]
+            raise StopIteration
+        return chunk
+
+
+
+# class to call methods with streamed return value
+class StreamClass(object):
+
+    # constructor
+    def __init__(self,voIF,chunkSize):
+        self.voIF = voIF
+        self.chunkSize = chunkSize
+
+    # return iterator over chunks of the return value
+    def __getattr__(self,attrName):
+        def callStream(*args,**kwargs):
+            commandObj = CommandObject(attrName,args,kwargs)
+            commandObj.chunkSize = self.chunkSize
+            return ChunkIterator(self.voIF,commandObj)
+        return callStream
+
+
+
+# pool of threads to run asynchronous calls. threads are started on demand up to maxThreads and
+# kept to run later calls
+class AsyncExecutor(object):
+
+    # constructor
+    def __init__(self,maxThreads):
+        self.maxThreads = max(maxThreads,1)
+        self.lock = threading.Lock()
+        self.funcQueue = Queue.Queue()
+        self.nThreads = 0
+        # the number of calls queued or running
+        self.nPending = 0
+
+    # run function in a thread of the pool
+    def submit(self,func):
+        self.lock.acquire()
+        try:
+            self.nPending += 1
+            if self.nPending > self.nThreads and self.nThreads < self.maxThreads:
+                thr = threading.Thread(target=self.runThread)
+                thr.daemon = True
+                thr.start()
+                self.nThreads += 1
+        finally:
+            self.lock.release()
+        self.funcQueue.put(func)
+
+    # main loop of threads
+    def runThread(self):
+        while True:
+            func = self.funcQueue.get()
+            try:
+                func()
+            except:
+                pass
+            self.lock.acquire()
+            self.nPending -= 1
+            self.lock.release()
+
+
+
+# pools for asynchronous calls in this process
+_asyncExecutorMap = {}
+_asyncExecutorLock = threading.Lock()
+
+# get pool for asynchronous calls of an interface. the pool is made per process since threads are
+# not inherited by child processes
+def getAsyncExecutor(voIF,maxThreads):
+    cacheKey = (os.getpid(),id(voIF))
+    _asyncExecutorLock.acquire()
+    try:
+        if not cacheKey in _asyncExecutorMap:
+            _asyncExecutorMap[cacheKey] = AsyncExecutor(maxThreads)
+        return _asyncExecutorMap[cacheKey]
+    finally:
+        _asyncExecutorLock.release()
+
+
+
+# class to call methods asynchronously
+class AsyncClass(object):
+
+    # constructor
+    def __init__(self,voIF,executor):
+        self.voIF = voIF
+        self.executor = executor
+
+    # run method call in a thread of the pool and return future
+    def __getattr__(self,attrName):
+        methodObj = getattr(self.voIF,attrName)
+        def callAsync(*args,**kwargs):
+            future = FutureClass()
+            def execute():
+                try:
+                    future.setResult(methodObj(*args,**kwargs),None)
+                except:
+                    future.setResult(None,sys.exc_info())
+            self.executor.submit(execute)
+            return future
+        return callAsync
+
+
+
+# class to queue method calls and send them in one command
+class BatchClass(object):
+
+    # constructor
+    def __init__(self,voIF):
+        self.voIF = voIF
+        self.commandObjList = []
+        self.retList = None
+
+    # enter context
+    def __enter__(self):
+        return self
+
+    # execute queued calls when leaving context without exception
+    def __exit__(self,errtype,errvalue,traceback):
+        if errtype == None:
+            self.execute()
+        return False
+
+    # queue method call. the index of the call is returned
+    def __getattr__(self,attrName):
+        def queueCommand(*args,**kwargs):
+            self.commandObjList.append(CommandObject(attrName,args,kwargs))
+            return len(self.commandObjList)-1
+        return queueCommand
+
+    # execute queued calls in the child process
+    def execute(self):
+        if self.commandObjList == []:
+            self.retList = []
+        else:
+            commandObj = CommandObject('executeBatch',(self.commandObjList,),{})
+            ret = self.voIF.sendCommands([commandObj],'executeBatch',True)[0]
+            self.retList = ret.returnValue
+        self.commandObjList = []
+        return self.retList
+
+    # get the list of (statusCode,value) where value is the return value or the error message
+    def getResults(self):
+        return self.retList
+
+    # get return value of a call. exception is raised as done for a single call
+    def getResult(self,idx):
+        statusCode,retValue = self.retList[idx]
+        if statusCode == SC_FAILED:
+            raise JEDITemporaryError,'VO={0} {1}'.format(self.voIF.vo,retValue)
+        elif statusCode == SC_FATAL:
+            raise JEDIFatalError,'VO={0} {1}'.format(self.voIF.vo,retValue)
+        return retValue
+
+
+
+# lane which is a sub-pool of child processes dedicated to some methods
+class LaneClass(object):
+    # constructor
+    def __init__(self,name,maxChild,timeout,methodNames):
+        self.name = name
+        self.maxChild = maxChild
+        self.timeout = timeout
+        self.methodNames = methodNames
+        self.connectionQueue = multiprocessing.Queue(maxChild)
+        # pre-started children to replace old ones
+        self.spareQueue = multiprocessing.Queue()
+
+
+
+# interface class to send command
+class CommandSendInterface(object):
+    # constructor
+    def __init__(self,vo,maxChild,moduleName,className,maxCacheSize=100,laneConfig=None):
+        self.vo = vo
+        self.maxChild = maxChild
+        self.connectionQueue = multiprocessing.Queue(maxChild)
+        self.moduleName = moduleName
+        self.className  = className
+        # max size of result cache in MB
+        self.maxCacheSize = maxCacheSize
+        self.cacheManager = None
+        self.resultCache = None
+        # lanes
+        self.laneMap = {}
+        self.laneMap['default'] = LaneClass('default',maxChild,600,[])
+        self.laneMap['default'].connectionQueue = self.connectionQueue
+        self.methodLaneMap = {}
+        if laneConfig != None:
+            self.parseLaneConfig(laneConfig)
+        # policy to retire child processes
+        self.setRetirementPolicy()
+        self.timeoutForExit = 60
+        # payloads larger than this size in bytes are passed through shared memory
+        self.largePayloadSize = defaultLargePayloadSize
+
+
+    # parse lane config. the format is name:nChildren:timeout:method1,method2,...;name:...
+    def parseLaneConfig(self,laneConfig):
+        for laneStr in laneConfig.split(';'):
+            laneStr = laneStr.strip()
+            if laneStr == '':
+                continue
+            try:
+                laneName,nChild,timeout,methodStr = laneStr.split(':')
+                methodNames = [methodName.strip() for methodName in methodStr.split(',') if methodName.strip() != '']
+                laneObj = LaneClass(laneName,int(nChild),int(timeout),methodNames)
+            except:
+                errtype,errvalue = sys.exc_info()[:2]
+                dumpStdOut(self.className,'skip broken lane config {0} with {1}:{2}'.format(laneStr,errtype,errvalue))
+                continue
+            self.laneMap[laneName] = laneObj
+            for methodName in methodNames:
+                self.methodLaneMap[methodName] = laneName
+
+
+    # get lane for commands
+    def getLane(self,commandObjList):
+        laneNames = set()
+        for commandObj in commandObjList:
+            # use methods in batch
+            if commandObj.methodName == 'executeBatch':
+                methodNames = [tmpObj.methodName for tmpObj in commandObj.argList[0]]
+            else:
+                methodNames = [commandObj.methodName]
+            for methodName in methodNames:
+                if methodName in self.methodLaneMap:
+                    laneNames.add(self.methodLaneMap[methodName])
+                else:
+                    laneNames.add('default')
+        # use default lane if commands are for different lanes
+        if len(laneNames) == 1:
+            return self.laneMap[laneNames.pop()]
+        return self.laneMap['default']
+        
+
+    # factory method
+    def __getattr__(self,attrName):
+        return MethodClass(self.className,attrName,self.vo,self.connectionQueue,self)
+
+
+    # send commands to a child process and receive responses in one exchange
+    def sendCommands(self,commandObjList,methodName,checkStatus,chunkCallback=None):
         nTry = 3
+        # no retry for streaming since chunks were consumed
+        if chunkCallback != None:
+            nTry = 1
         for iTry in range(nTry):
             # exceptions
             retException = None
             strException = None
+            retList = None
+            ret = None
+            pipe = None
+            laneObj = self.getLane(commandObjList)
+            timeMap = {}
             try:
                 stepIdx = 0
                 # get child process
-                child_process = self.connectionQueue.get()
+                tmpStart = time.time()
+                child_process = laneObj.connectionQueue.get()
+                timeMap['childWait'] = time.time()-tmpStart
                 # get pipe
                 stepIdx = 1
                 pipe = child_process.connection()
-                # get ack
+                # send commands and get responses
                 stepIdx = 2
-                timeoutPeriodACK = 30
-                if not pipe.poll(timeoutPeriodACK):
-                    raise JEDITimeoutError,"did not get ACK for %ssec" % timeoutPeriodACK
-                ack = pipe.recv()
-                # send command
-                stepIdx = 3
-                pipe.send(commandObj)
-                # wait response
-                stepIdx = 4
-                timeoutPeriod = 600
-                if not pipe.poll(timeoutPeriod):
-                    raise JEDITimeoutError,"didn not get response for %ssec" % timeoutPeriod
-                # get response
-                stepIdx = 5
-                ret = pipe.recv()
+                timeoutPeriod = laneObj.timeout
+                tmpStart = time.time()
+                retList = child_process.exchange(pipe,commandObjList,timeoutPeriod,timeMap,
+                                                 self.largePayloadSize,chunkCallback)
+                timeMap['total'] = time.time()-tmpStart+timeMap['childWait']
                 # set exception type based on error
-                stepIdx = 6
-                if ret.statusCode == SC_FAILED:
-                    retException = JEDITemporaryError
-                elif ret.statusCode == SC_FATAL:
-                    retException = JEDIFatalError
+                stepIdx = 3
+                if checkStatus:
+                    ret = retList[0]
+                    if ret.statusCode == SC_FAILED:
+                        retException = JEDITemporaryError
+                    elif ret.statusCode == SC_FATAL:
+                        retException = JEDIFatalError
             except:
                 errtype,errvalue = sys.exc_info()[:2]
                 retException = errtype
-                argStr = 'args=%s kargs=%s' % (str(args),str(kwargs))
+                argStr = ''
+                for commandObj in commandObjList:
+                    argStr += 'args=%s kargs=%s ' % (str(commandObj.argList),str(commandObj.argMap))
                 strException = 'VO=%s type=%s stepIdx=%s : %s.%s %s %s' % \
                                (self.vo,errtype.__name__,stepIdx,
-                                self.className,self.methodName,errvalue,
+                                self.className,methodName,errvalue,
                                 argStr[:200])
+            # record times and sizes
+            if retList != None:
+                for metric,value in timeMap.iteritems():
+                    stats.record(self.vo,self.className,methodName,metric,value)
             # increment nused
-            child_process.nused += 1
+            child_process.nused += len(commandObjList)
             # memory check
             largeMemory = False
             memUsed = child_process.getMemUsage()
             if memUsed != None:
                 memStr= 'pid={0} memory={1}MB'.format(child_process.pid,memUsed)
-                if memUsed > 1.5*1024:
+                if memUsed > self.maxMemory:
                     largeMemory = True
                     memStr += ' exceeds memory limit'
                     dumpStdOut(self.className,memStr)
-            # kill old or problematic process
-            if child_process.nused > 1000 or not retException in [None,JEDITemporaryError,JEDIFatalError] or \
-                    largeMemory:
-                dumpStdOut(self.className,'methodName={0} ret={1} nused={2} {3} in pid={4}'.format(self.methodName,retException,
+            # too old
+            oldProcess = False
+            if self.maxAge != None and time.time()-child_process.startTime > self.maxAge:
+                oldProcess = True
+            # replace old or problematic process
+            isBroken = not retException in [None,JEDITemporaryError,JEDIFatalError]
+            if child_process.nused > self.maxCalls or isBroken or largeMemory or oldProcess:
+                dumpStdOut(self.className,'methodName={0} ret={1} nused={2} {3} in pid={4}'.format(methodName,retException,
                                                                                                    child_process.nused,
                                                                                                    strException,
                                                                                                    child_process.pid))
-                # close connection
-                try:
-                    pipe.close()
-                except:
-                    pass
-                # terminate child process
-                try:
-                    dumpStdOut(self.className,'killing pid={0}'.format(child_process.pid))
-                    os.kill(child_process.pid,signal.SIGKILL)
-                    dumpStdOut(self.className,'waiting pid={0}'.format(child_process.pid))
-                    os.waitpid(child_process.pid,0)
-                    dumpStdOut(self.className,'terminated pid={0}'.format(child_process.pid))
-                except:
-                    errtype,errvalue = sys.exc_info()[:2]
-                    if not 'No child processes' in str(errvalue):
-                        dumpStdOut(self.className,'failed to terminate {0} with {1}:{2}'.format(child_process.pid,
-                                                                                                errtype,errvalue))
-                # make new child process
-                self.voIF.launchChild()
+                self.replaceChild(laneObj,child_process,pipe,isBroken)
             else:
                 # reduce process object to avoid deadlock due to rebuilding of connection 
-                child_process.reduceConnection(pipe)
-                self.connectionQueue.put(child_process)
+                child_process.releaseConnection(pipe)
+                laneObj.connectionQueue.put(child_process)
             # success, fatal error, or maximally attempted    
             if retException in [None,JEDIFatalError] or (iTry+1 == nTry):
                 break
@@ -250,27 +888,44 @@ class MethodClass(object):
                 strException = 'VO={0} {1}'.format(self.vo,ret.errorValue)
             raise retException,strException
         # return
-        if ret.statusCode == SC_SUCCEEDED:
-            return ret.returnValue
-        else:
-            raise retException,'VO=%s %s' % (self.vo,ret.errorValue)
-        
+        return retList
 
 
-# interface class to send command
-class CommandSendInterface(object):
-    # constructor
-    def __init__(self,vo,maxChild,moduleName,className):
-        self.vo = vo
-        self.maxChild = maxChild
-        self.connectionQueue = multiprocessing.Queue(maxChild)
-        self.moduleName = moduleName
-        self.className  = className
-        
+    # send multiple commands to one child process without waiting for each response.
+    # callList is a list of (methodName,argList,argMap) and a list of (statusCode,value) is returned
+    # where value is the return value or the error message
+    def pipeline(self,callList):
+        commandObjList = []
+        for methodName,argList,argMap in callList:
+            commandObjList.append(CommandObject(methodName,argList,argMap))
+        if commandObjList == []:
+            return []
+        retList = self.sendCommands(commandObjList,'pipeline',False)
+        retVals = []
+        for ret in retList:
+            if ret.statusCode == SC_SUCCEEDED:
+                retVals.append((ret.statusCode,ret.returnValue))
+            else:
+                retVals.append((ret.statusCode,ret.errorValue))
+        return retVals
+
+
+    # make batch to send multiple calls in one command which are executed sequentially in the child
+    def batch(self):
+        return BatchClass(self)
 
-    # factory method
-    def __getattr__(self,attrName):
-        return MethodClass(self.className,attrName,self.vo,self.connectionQueue,self)
+
+    # asynchronous calls which return futures and run on different children in parallel.
+    # calls are executed by a pool of threads as many as children
+    @property
+    def async_(self):
+        return AsyncClass(self,getAsyncExecutor(self,self.maxChild))
+
+
+    # calls which return iterators over chunks of return values. lists and generators returned
+    # by the methods are streamed with chunkSize items in each chunk
+    def stream(self,chunkSize=100):
+        return StreamClass(self,chunkSize)
 
 
     # launcher for child processe
@@ -286,15 +941,99 @@ class CommandSendInterface(object):
         dumpStdOut(self.moduleName,msg)
         timeNow = datetime.datetime.utcnow()
         try:
-            cls(channel).start()
+            receiver = cls(channel)
+            # use cache shared by all children
+            if self.resultCache != None:
+                receiver.resultCache = self.resultCache
+                receiver.cacheManagerInfo = (self.cacheManager.address,self.maxCacheSize*1024*1024)
+            else:
+                receiver.resultCache = ResultCache.ResultCache(self.maxCacheSize*1024*1024)
+            receiver.largePayloadSize = self.largePayloadSize
+            receiver.start()
+            dumpStdOut(self.moduleName,'exit {0} with pid={1}'.format(self.className,os.getpid()))
         except:
             errtype,errvalue = sys.exc_info()[:2]
             dumpStdOut(self.className,'launcher crashed with {0}:{1}'.format(errtype,errvalue))
                      
             
 
+    # set policy to retire child processes. maxMemory is in MB and maxAge is in sec.
+    # no spare is used by default so that the number of DB connections is unchanged
+    def setRetirementPolicy(self,maxCalls=1000,maxMemory=1.5*1024,maxAge=None,nSpares=0):
+        self.maxCalls = maxCalls
+        self.maxMemory = maxMemory
+        self.maxAge = maxAge
+        self.nSpares = nSpares
+
+
+    # replace child process with a spare
+    def replaceChild(self,laneObj,child_process,pipe,isBroken):
+        # get spare
+        try:
+            spareObj = laneObj.spareQueue.get_nowait()
+        except Queue.Empty:
+            spareObj = None
+        if spareObj == None:
+            # terminate and launch inline when no spare is available
+            child_process.closeConnection()
+            self.terminateChild(child_process)
+            removePayloadFiles(child_process.pid)
+            self.launchChild(laneObj.name)
+            return
+        dumpStdOut(self.className,'use spare pid={0} to replace pid={1}'.format(spareObj.pid,child_process.pid))
+        laneObj.connectionQueue.put(spareObj)
+        # retire in background
+        thr = threading.Thread(target=self.retireChild,args=(laneObj,child_process,pipe,isBroken))
+        thr.daemon = True
+        thr.start()
+
+
+    # launch new spare and retire child process
+    def retireChild(self,laneObj,child_process,pipe,isBroken):
+        # launch new spare
+        self.launchChild(laneObj.name,True)
+        # ask the child to exit since it doesn't have any request in progress
+        if pipe == None:
+            isBroken = True
+        if not isBroken:
+            try:
+                sendObject(pipe,CommandObject('exitChild',(),{}),None,child_process.pid)
+                # wait for exit
+                for iTry in range(self.timeoutForExit*10):
+                    if not child_process.isAlive():
+                        dumpStdOut(self.className,'retired pid={0}'.format(child_process.pid))
+                        break
+                    time.sleep(0.1)
+                else:
+                    isBroken = True
+            except:
+                isBroken = True
+        child_process.closeConnection()
+        # kill when the child didn't exit
+        if isBroken:
+            self.terminateChild(child_process)
+        # remove payloads which were not received
+        removePayloadFiles(child_process.pid)
+        sweepPayloadFiles()
+
+
+    # terminate child process
+    def terminateChild(self,child_process):
+        try:
+            dumpStdOut(self.className,'killing pid={0}'.format(child_process.pid))
+            os.kill(child_process.pid,signal.SIGKILL)
+            dumpStdOut(self.className,'waiting pid={0}'.format(child_process.pid))
+            os.waitpid(child_process.pid,0)
+            dumpStdOut(self.className,'terminated pid={0}'.format(child_process.pid))
+        except:
+            errtype,errvalue = sys.exc_info()[:2]
+            if not 'No child processes' in str(errvalue):
+                dumpStdOut(self.className,'failed to terminate {0} with {1}:{2}'.format(child_process.pid,
+                                                                                        errtype,errvalue))
+
+
     # launch child processes to interact with DDM
-    def launchChild(self):
+    def launchChild(self,laneName='default',isSpare=False):
         # make pipe
         parent_conn, child_conn = multiprocessing.Pipe()
         # make child process
@@ -305,13 +1044,46 @@ class CommandSendInterface(object):
         child_process.start()
         # keep process in queue        
         processObj = ProcessClass(child_process.pid,parent_conn)
-        self.connectionQueue.put(processObj)
+        if isSpare:
+            self.laneMap[laneName].spareQueue.put(processObj)
+        else:
+            self.laneMap[laneName].connectionQueue.put(processObj)
 
 
     # initialize
     def initialize(self):
-        for i in range(self.maxChild):
-            self.launchChild()
+        # remove payloads left by dead processes
+        sweepPayloadFiles()
+        # start manager of the result cache shared by children
+        try:
+            self.cacheManager = ResultCache.ResultCacheManager()
+            self.cacheManager.start()
+            self.resultCache = self.cacheManager.getSharedCache(self.maxCacheSize*1024*1024)
+        except:
+            errtype,errvalue = sys.exc_info()[:2]
+            dumpStdOut(self.className,'failed to start cache manager with {0}:{1}'.format(errtype,errvalue))
+            self.cacheManager = None
+            self.resultCache = None
+        for laneObj in self.laneMap.values():
+            for i in range(laneObj.maxChild):
+                self.launchChild(laneObj.name)
+            for i in range(self.nSpares):
+                self.launchChild(laneObj.name,True)
+
+
+    # get the number of idle children in a lane. None if unknown
+    def getNumIdleChildren(self,laneName='default'):
+        try:
+            return self.laneMap[laneName].connectionQueue.qsize()
+        except:
+            return None
+
+
+    # get statistics of the shared result cache
+    def getCacheStats(self):
+        if self.resultCache == None:
+            return None
+        return self.resultCache.getStats()
 
 
 
@@ -321,99 +1093,240 @@ class CommandReceiveInterface(object):
     # constructor
     def __init__(self,con):
         self.con = con
-        self.cacheMap = {}
+        # result cache which is replaced with the shared one by the launcher
+        self.resultCache = ResultCache.ResultCache(100*1024*1024)
+        # address of the manager of the shared cache and the cache size to reconnect
+        self.cacheManagerInfo = None
+        self.cacheReconnectTime = None
+        self.cacheReconnectInterval = 60
+        # payloads larger than this size in bytes are passed through shared memory
+        self.largePayloadSize = defaultLargePayloadSize
 
 
     # make key for cache
     def makeKey(self,className,methodName,argList,argMap):
         try:
-            tmpKey = '{0}:{1}:'.format(className,methodName)
-            for argItem in argList:
-                tmpKey += '{0}:'.format(str(argItem))
-            for argKey,argVal in argMap.iteritems():
-                tmpKey += '{0}={1}:'.format(argKey,str(argVal))
-            tmpKey = tmpKey[:-1]   
-            return tmpKey    
+            argItems = argMap.items()
+            argItems.sort()
+            tmpStr = cPickle.dumps((argList,argItems),cPickle.HIGHEST_PROTOCOL)
+            tmpKey = '{0}:{1}:{2}'.format(className,methodName,hashlib.sha1(tmpStr).hexdigest())
+            return tmpKey
         except:
             return None
 
+
+    # get value from cache. (False,None) is returned if not found
+    def getCachedValue(self,key,timeRange):
+        try:
+            valueStr = self.resultCache.get(key,timeRange)
+        except:
+            # treat as missing when the shared cache is unavailable
+            self.reconnectCache()
+            return False,None
+        if valueStr == None:
+            return False,None
+        return True,cPickle.loads(valueStr)
+
+
+    # put value to cache
+    def putCachedValue(self,key,value):
+        try:
+            valueStr = cPickle.dumps(value,cPickle.HIGHEST_PROTOCOL)
+        except:
+            return
+        try:
+            self.resultCache.put(key,valueStr)
+        except:
+            # skip when the shared cache is unavailable
+            self.reconnectCache()
+
+
+    # reconnect to the shared cache. attempts are made at most once per cacheReconnectInterval sec
+    def reconnectCache(self):
+        if self.cacheManagerInfo == None:
+            return
+        timeNow = time.time()
+        if self.cacheReconnectTime != None and timeNow-self.cacheReconnectTime < self.cacheReconnectInterval:
+            return
+        self.cacheReconnectTime = timeNow
+        # drop the broken connection which is shared by proxies to the same manager in the thread
+        try:
+            self.resultCache._tls.connection.close()
+        except:
+            pass
+        try:
+            del self.resultCache._tls.connection
+        except:
+            pass
+        try:
+            address,maxSize = self.cacheManagerInfo
+            cacheManager = ResultCache.ResultCacheManager(address=address)
+            cacheManager.connect()
+            self.resultCache = cacheManager.getSharedCache(maxSize)
+        except:
+            pass
+
                 
+    # read commands in a separate thread so that the client can send commands before responses come back
+    def readCommands(self,commandQueue):
+        while True:
+            try:
+                commandObj,payloadSize = recvObject(self.con)
+            except:
+                commandQueue.put(sys.exc_info()[:2])
+                return
+            commandQueue.put(commandObj)
+
+
     # main loop    
     def start(self):
+        # start reader
+        commandQueue = Queue.Queue()
+        thr = threading.Thread(target=self.readCommands,args=(commandQueue,))
+        thr.daemon = True
+        thr.start()
         while True:
-            # send ACK
-            self.con.send('ack')
             # get command
-            commandObj = self.con.recv()
-            # make return
-            retObj = ReturnObject()
-            # get class name
-            className = self.__class__.__name__
-            # check method name
-            if not hasattr(self,commandObj.methodName):
-                # method not found
-                retObj.statusCode = self.SC_FATAL
-                retObj.errorValue = 'type=AttributeError : %s instance has no attribute %s' % \
-                    (className,commandObj.methodName)
+            commandObj = commandQueue.get()
+            # connection was broken
+            if isinstance(commandObj,types.TupleType):
+                errtype,errvalue = commandObj
+                raise errtype,errvalue
+            # exit since the process is retired
+            if commandObj.methodName == 'exitChild':
+                return
+            # execute
+            retObj = self.processCommand(commandObj)
+            # return
+            if commandObj.chunkSize != None and retObj.statusCode == self.SC_SUCCEEDED and \
+                    isinstance(retObj.returnValue,(types.ListType,types.TupleType,types.GeneratorType)):
+                self.sendChunks(commandObj,retObj)
             else:
-                try:
-                    # use cache
-                    useCache = False
-                    doExec = True
-                    if commandObj.argMap.has_key('useResultCache'):
-                        # get time range
-                        timeRange = commandObj.argMap['useResultCache']
-                        # delete from args map
-                        del commandObj.argMap['useResultCache']
-                        # make key for cache
-                        tmpCacheKey = self.makeKey(className,commandObj.methodName,commandObj.argList,commandObj.argMap)
-                        if tmpCacheKey != None:
-                            useCache = True
-                            # cache is fresh
-                            if self.cacheMap.has_key(tmpCacheKey) and \
-                               self.cacheMap[tmpCacheKey]['utime']+datetime.timedelta(seconds=timeRange) > datetime.datetime.utcnow():
-                                tmpRet = self.cacheMap[tmpCacheKey]['value']
-                                doExec = False
+                sendObject(self.con,retObj,self.largePayloadSize)
+
+
+    # send return value in chunks
+    def sendChunks(self,commandObj,retObj):
+        startTime = time.time()
+        finalObj = ReturnObject(commandObj.requestID)
+        finalObj.isStreamed = True
+        try:
+            chunk = []
+            for item in retObj.returnValue:
+                chunk.append(item)
+                if len(chunk) >= commandObj.chunkSize:
+                    self.sendChunk(commandObj,chunk)
+                    chunk = []
+            if chunk != []:
+                self.sendChunk(commandObj,chunk)
+            finalObj.statusCode = self.SC_SUCCEEDED
+        except:
+            errtype,errvalue = sys.exc_info()[:2]
+            # failed in generator
+            finalObj.statusCode = self.SC_FATAL
+            finalObj.errorValue = 'type=%s : %s.%s : %s' % \
+                                  (errtype.__name__,self.__class__.__name__,
+                                   commandObj.methodName,errvalue)
+        finalObj.execTime = retObj.execTime+time.time()-startTime
+        sendObject(self.con,finalObj,self.largePayloadSize)
+
+
+    # send one chunk
+    def sendChunk(self,commandObj,chunk):
+        chunkObj = ReturnObject(commandObj.requestID)
+        chunkObj.statusCode = self.SC_SUCCEEDED
+        chunkObj.returnValue = chunk
+        chunkObj.hasMore = True
+        chunkObj.isStreamed = True
+        sendObject(self.con,chunkObj,self.largePayloadSize)
+
+
+    # execute one command
+    def processCommand(self,commandObj):
+        # make return
+        retObj = ReturnObject(commandObj.requestID)
+        startTime = time.time()
+        # get class name
+        className = self.__class__.__name__
+        # check method name
+        if not hasattr(self,commandObj.methodName):
+            # method not found
+            retObj.statusCode = self.SC_FATAL
+            retObj.errorValue = 'type=AttributeError : %s instance has no attribute %s' % \
+                (className,commandObj.methodName)
+        else:
+            try:
+                # use cache
+                useCache = False
+                doExec = True
+                if commandObj.argMap.has_key('useResultCache'):
+                    # get time range
+                    timeRange = commandObj.argMap['useResultCache']
+                    # delete from args map
+                    del commandObj.argMap['useResultCache']
+                    # make key for cache
+                    tmpCacheKey = self.makeKey(className,commandObj.methodName,commandObj.argList,commandObj.argMap)
+                    if tmpCacheKey != None:
+                        useCache = True
+                        # cache is fresh
+                        isCached,tmpRet = self.getCachedValue(tmpCacheKey,timeRange)
+                        if isCached:
+                            doExec = False
+                # exec
+                if doExec:
+                    # get function
+                    functionObj = getattr(self,commandObj.methodName)
                     # exec
-                    if doExec:
-                        # get function
-                        functionObj = getattr(self,commandObj.methodName)
-                        # exec
-                        tmpRet = apply(functionObj,commandObj.argList,commandObj.argMap)
-                    if isinstance(tmpRet,StatusCode):
-                        # only status code was returned
-                        retObj.statusCode = tmpRet
-                    elif (isinstance(tmpRet,types.TupleType) or isinstance(tmpRet,types.ListType)) \
-                       and len(tmpRet) > 0 and isinstance(tmpRet[0],StatusCode):
-                            retObj.statusCode = tmpRet[0]
-                            # status code + return values
-                            if len(tmpRet) > 1:
-                                if retObj.statusCode == self.SC_SUCCEEDED:
-                                    if len(tmpRet) == 2:
-                                        retObj.returnValue = tmpRet[1]
-                                    else:
-                                        retObj.returnValue = tmpRet[1:]
+                    tmpRet = apply(functionObj,commandObj.argList,commandObj.argMap)
+                    # expand generator unless streamed
+                    if isinstance(tmpRet,types.GeneratorType) and commandObj.chunkSize == None:
+                        tmpRet = list(tmpRet)
+                if isinstance(tmpRet,StatusCode):
+                    # only status code was returned
+                    retObj.statusCode = tmpRet
+                elif (isinstance(tmpRet,types.TupleType) or isinstance(tmpRet,types.ListType)) \
+                   and len(tmpRet) > 0 and isinstance(tmpRet[0],StatusCode):
+                        retObj.statusCode = tmpRet[0]
+                        # status code + return values
+                        if len(tmpRet) > 1:
+                            if retObj.statusCode == self.SC_SUCCEEDED:
+                                if len(tmpRet) == 2:
+                                    retObj.returnValue = tmpRet[1]
                                 else:
-                                    if len(tmpRet) == 2:
-                                        retObj.errorValue = tmpRet[1]
-                                    else:
-                                        retObj.errorValue = tmpRet[1:]
-                    else:        
-                        retObj.statusCode = self.SC_SUCCEEDED
-                        retObj.returnValue = tmpRet
-                except:
-                    errtype,errvalue = sys.exc_info()[:2]
-                    # failed
-                    retObj.statusCode = self.SC_FATAL
-                    retObj.errorValue = 'type=%s : %s.%s : %s' % \
-                                        (errtype.__name__,className,
-                                         commandObj.methodName,errvalue)
-                # cache
-                if useCache and doExec and retObj.statusCode == self.SC_SUCCEEDED:
-                    self.cacheMap[tmpCacheKey] = {'utime':datetime.datetime.utcnow(),
-                                                  'value':tmpRet}
-            # return
-            self.con.send(retObj)
+                                    retObj.returnValue = tmpRet[1:]
+                            else:
+                                if len(tmpRet) == 2:
+                                    retObj.errorValue = tmpRet[1]
+                                else:
+                                    retObj.errorValue = tmpRet[1:]
+                else:        
+                    retObj.statusCode = self.SC_SUCCEEDED
+                    retObj.returnValue = tmpRet
+            except:
+                errtype,errvalue = sys.exc_info()[:2]
+                # failed
+                retObj.statusCode = self.SC_FATAL
+                retObj.errorValue = 'type=%s : %s.%s : %s' % \
+                                    (errtype.__name__,className,
+                                     commandObj.methodName,errvalue)
+            # cache
+            if useCache and doExec and retObj.statusCode == self.SC_SUCCEEDED:
+                self.putCachedValue(tmpCacheKey,tmpRet)
+        retObj.execTime = time.time()-startTime
+        # return
+        return retObj
+
+
+    # execute commands sent by a batch and return the list of (statusCode,value)
+    def executeBatch(self,commandObjList):
+        retList = []
+        for commandObj in commandObjList:
+            retObj = self.processCommand(commandObj)
+            if retObj.statusCode == self.SC_SUCCEEDED:
+                retList.append((retObj.statusCode,retObj.returnValue))
+            else:
+                retList.append((retObj.statusCode,retObj.errorValue))
+        return retList
 
 
 # install SCs
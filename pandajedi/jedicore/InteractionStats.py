@@ -0,0 +1,148 @@
+import os
+import math
+import time
+import json
+import threading
+
+
+# histogram with logarithmic buckets
+class Histogram:
+
+    # constructor. buckets cover minValue to minValue*factor**nBuckets
+    def __init__(self,minValue,factor=2**0.25,nBuckets=160):
+        self.minValue = minValue
+        self.logFactor = math.log(factor)
+        self.factor = factor
+        self.nBuckets = nBuckets
+        self.buckets = [0]*nBuckets
+        self.count = 0
+        self.total = 0
+        self.maxValue = 0
+
+
+    # add value
+    def add(self,value):
+        if value <= self.minValue:
+            idx = 0
+        else:
+            idx = min(int(math.log(float(value)/self.minValue)/self.logFactor)+1,self.nBuckets-1)
+        self.buckets[idx] += 1
+        self.count += 1
+        self.total += value
+        if value > self.maxValue:
+            self.maxValue = value
+
+
+    # get upper edge of the bucket where the percentile falls
+    def getPercentile(self,percent):
+        if self.count == 0:
+            return None
+        threshold = math.ceil(self.count*percent/100.0)
+        nSum = 0
+        for idx,nEntries in enumerate(self.buckets):
+            nSum += nEntries
+            if nSum >= threshold:
+                return min(self.minValue*self.factor**idx,self.maxValue)
+        return self.maxValue
+
+
+    # get summary
+    def getSummary(self):
+        return {'count':self.count,
+                'mean':float(self.total)/self.count if self.count > 0 else None,
+                'p50':self.getPercentile(50),
+                'p95':self.getPercentile(95),
+                'p99':self.getPercentile(99),
+                'max':self.maxValue}
+
+
+
+# statistics of interaction with child processes
+class InteractionStats:
+
+    # minimum values of histograms. times are in sec and sizes are in bytes
+    minValueMap = {'time':1e-6,
+                   'size':1}
+
+    # constructor
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histMap = {}
+
+
+    # record value. metric is childWait, send, exec, recv, requestSize, replySize, etc
+    def record(self,vo,className,methodName,metric,value):
+        key = (vo,className,methodName)
+        self.lock.acquire()
+        try:
+            if not key in self.histMap:
+                self.histMap[key] = {}
+            if not metric in self.histMap[key]:
+                if metric.endswith('Size'):
+                    minValue = self.minValueMap['size']
+                else:
+                    minValue = self.minValueMap['time']
+                self.histMap[key][metric] = Histogram(minValue)
+            self.histMap[key][metric].add(value)
+        finally:
+            self.lock.release()
+
+
+    # get summary and reset histograms if required
+    def getSummary(self,reset=False):
+        self.lock.acquire()
+        try:
+            retList = []
+            for (vo,className,methodName),metricMap in self.histMap.iteritems():
+                tmpMap = {'vo':vo,
+                          'class':className,
+                          'method':methodName,
+                          'metrics':{}}
+                for metric,hist in metricMap.iteritems():
+                    tmpMap['metrics'][metric] = hist.getSummary()
+                retList.append(tmpMap)
+            if reset:
+                self.histMap = {}
+            return retList
+        finally:
+            self.lock.release()
+
+
+    # append summary to a JSON lines file
+    def dump(self,fileName,source,reset=True):
+        timeNow = time.strftime('%Y-%m-%d %H:%M:%S',time.gmtime())
+        summaryList = self.getSummary(reset)
+        with open(fileName,'a') as f:
+            for tmpMap in summaryList:
+                tmpMap['time'] = timeNow
+                tmpMap['source'] = source
+                tmpMap['pid'] = os.getpid()
+                f.write(json.dumps(tmpMap)+'\n')
+
+
+
+# thread to dump statistics periodically
+class StatsDumper(threading.Thread):
+
+    # constructor
+    def __init__(self,fileName,source,interval):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.fileName = fileName
+        self.source = source
+        self.interval = interval
+
+
+    # main
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                stats.dump(self.fileName,self.source)
+            except:
+                pass
+
+
+
+# statistics in this process
+stats = InteractionStats()
@@ -2249,267 +2249,27 @@ class DBProxy(taskbuffer.OraDBProxy.DBProxy):
         tmpLog.debug('isUnMerging={0} isPrePro={1} xmlConfigJob={2}'.format(isUnMerging,isPrePro,type(xmlConfigJob)))
         tmpLog.debug('middleName={0} registerDatasets={1} idPool={2}'.format(middleName,registerDatasets,len(fileIDPool)))
         try:
-            if instantiatedSites == None:
-                instantiatedSites = ''
             if siteDsMap == None:
                 siteDsMap = {}
             if parallelOutMap == None:
                 parallelOutMap = {}
-            outMap = {}
-            datasetToRegister = []
-            indexFileID = 0
-            # sql to get dataset
-            sqlD  = "SELECT "
-            sqlD += "datasetID,datasetName,vo,masterID,status,type FROM {0}.JEDI_Datasets ".format(jedi_config.db.schemaJEDI)
-            sqlD += "WHERE jediTaskID=:jediTaskID AND type IN (:type1,:type2) "
-            if provenanceID != None:
-                sqlD += "AND (provenanceID IS NULL OR provenanceID=:provenanceID) "
-            # sql to read template
-            sqlR  = "SELECT outTempID,datasetID,fileNameTemplate,serialNr,outType,streamName "
-            sqlR += "FROM {0}.JEDI_Output_Template ".format(jedi_config.db.schemaJEDI)
-            sqlR += "WHERE jediTaskID=:jediTaskID AND datasetID=:datasetID FOR UPDATE"
-            # sql to insert files
-            sqlI  = "INSERT INTO {0}.JEDI_Dataset_Contents ({1}) ".format(jedi_config.db.schemaJEDI,JediFileSpec.columnNames())
-            sqlI += JediFileSpec.bindValuesExpression()
-            sqlI += " RETURNING fileID INTO :newFileID"
-            # sql to insert files without fileID
-            sqlII  = "INSERT INTO {0}.JEDI_Dataset_Contents ({1}) ".format(jedi_config.db.schemaJEDI,JediFileSpec.columnNames())
-            sqlII += JediFileSpec.bindValuesExpression(useSeq=False)
-            # sql to increment SN
-            sqlU  = "UPDATE {0}.JEDI_Output_Template SET serialNr=serialNr+1 ".format(jedi_config.db.schemaJEDI)
-            sqlU += "WHERE jediTaskID=:jediTaskID AND outTempID=:outTempID "
-            # sql to instantiate template dataset
-            sqlT1  = "SELECT {0} FROM {1}.JEDI_Datasets ".format(JediDatasetSpec.columnNames(),
-                                                                 jedi_config.db.schemaJEDI)
-            sqlT1 += "WHERE jediTaskID=:jediTaskID AND datasetID=:datasetID "
-            sqlT2  = "INSERT INTO {0}.JEDI_Datasets ({1}) ".format(jedi_config.db.schemaJEDI,
-                                                                   JediDatasetSpec.columnNames())
-            sqlT2 += JediDatasetSpec.bindValuesExpression()
-            sqlT2 += "RETURNING datasetID INTO :newDatasetID "
-            # sql to change concrete dataset name
-            sqlCN  = "UPDATE {0}.JEDI_Datasets ".format(jedi_config.db.schemaJEDI)
-            sqlCN += "SET site=:site,datasetName=:datasetName,destination=:destination "
-            sqlCN += " WHERE jediTaskID=:jediTaskID AND datasetID=:datasetID "
-            # sql to set masterID to concrete datasets
-            sqlMC  = "UPDATE {0}.JEDI_Datasets ".format(jedi_config.db.schemaJEDI)
-            sqlMC += "SET masterID=:masterID "
-            sqlMC += " WHERE jediTaskID=:jediTaskID AND datasetID=:datasetID "
-            # current current date
-            timeNow = datetime.datetime.utcnow()
+            outCtx = self.makeOutputFilesContext(fileIDPool,False)
             # begin transaction
             self.conn.begin()
             self.cur.arraysize = 100
-            # get datasets
-            varMap = {}
-            varMap[':jediTaskID'] = jediTaskID
-            varMap[':type1'] = 'output'
-            varMap[':type2'] = 'log'
-            # unmerged datasets
-            if isUnMerging:
-                varMap[':type1'] = 'trn_' + varMap[':type1']
-                varMap[':type2'] = 'trn_' + varMap[':type2']
-            elif isPrePro:
-                varMap[':type1'] = 'pp_' + varMap[':type1']
-                varMap[':type2'] = 'pp_' + varMap[':type2']
-            # template datasets
-            if instantiateTmpl:
-                varMap[':type1'] = 'tmpl_' + varMap[':type1']
-                varMap[':type2'] = 'tmpl_' + varMap[':type2']
-            # keep dataset types
-            tmpl_VarMap = {}
-            tmpl_VarMap[':type1'] = varMap[':type1']
-            tmpl_VarMap[':type2'] = varMap[':type2']
-            if provenanceID != None:
-                varMap[':provenanceID'] = provenanceID
-            self.cur.execute(sqlD+comment,varMap)
-            resList = self.cur.fetchall()
-            tmpl_RelationMap = {}
-            mstr_RelationMap = {}
-            varMapsForInsert = []
-            varMapsForSN     = []
-            for datasetID,datasetName,vo,masterID,datsetStatus,datasetType in resList:
-                fileDatasetIDs = []
-                for instantiatedSite in instantiatedSites.split(','):
-                    fileDatasetID = datasetID
-                    if registerDatasets and datasetType in ['output','log'] and not fileDatasetID in datasetToRegister:
-                        datasetToRegister.append(fileDatasetID)
-                    # instantiate template datasets
-                    if instantiateTmpl:
-                        doInstantiate = False
-                        if isUnMerging:
-                            # instantiate new datasets in each submission for premerged 
-                            if siteDsMap.has_key(datasetID) and siteDsMap[datasetID].has_key(instantiatedSite):
-                                fileDatasetID = siteDsMap[datasetID][instantiatedSite]
-                                tmpLog.debug('found concrete premerged datasetID={0}'.format(fileDatasetID))
-                            else:
-                                doInstantiate = True
-                        else:
-                            # check if concrete dataset is already there
-                            varMap = {}
-                            varMap[':jediTaskID'] = jediTaskID
-                            varMap[':type1']    = re.sub('^tmpl_','',tmpl_VarMap[':type1'])
-                            varMap[':type2']    = re.sub('^tmpl_','',tmpl_VarMap[':type2'])
-                            varMap[':templateID'] = datasetID
-                            varMap[':closedState'] = 'closed'
-                            if provenanceID != None:
-                                varMap[':provenanceID'] = provenanceID
-                            if instantiatedSite != None:
-                                sqlDT = sqlD + "AND site=:site "
-                                varMap[':site'] = instantiatedSite
-                            else:
-                                sqlDT = sqlD
-                            sqlDT += "AND (state IS NULL OR state<>:closedState) "
-                            sqlDT += "AND templateID=:templateID "    
-                            self.cur.execute(sqlDT+comment,varMap)
-                            resDT = self.cur.fetchone()
-                            if resDT != None:
-                                fileDatasetID = resDT[0]
-                                # collect ID of dataset to be registered 
-                                if resDT[-1] == 'defined':
-                                    datasetToRegister.append(fileDatasetID)
-                                tmpLog.debug('found concrete datasetID={0}'.format(fileDatasetID))
-                            else:
-                                doInstantiate = True
-                        if doInstantiate:
-                            # read dataset template
-                            varMap = {}
-                            varMap[':jediTaskID'] = jediTaskID
-                            varMap[':datasetID']  = datasetID
-                            self.cur.execute(sqlT1+comment,varMap)
-                            resT1 = self.cur.fetchone()
-                            cDatasetSpec = JediDatasetSpec()
-                            cDatasetSpec.pack(resT1)
-                            # instantiate template dataset
-                            cDatasetSpec.type             = re.sub('^tmpl_','',cDatasetSpec.type)
-                            cDatasetSpec.templateID       = datasetID
-                            cDatasetSpec.creationTime     = timeNow
-                            cDatasetSpec.modificationTime = timeNow
-                            varMap = cDatasetSpec.valuesMap(useSeq=True)
-                            varMap[':newDatasetID'] = self.cur.var(cx_Oracle.NUMBER)
-                            self.cur.execute(sqlT2+comment,varMap)
-                            fileDatasetID = long(varMap[':newDatasetID'].getvalue())
-                            if instantiatedSite != None:
-                                # set concreate name
-                                cDatasetSpec.site = instantiatedSite
-                                cDatasetSpec.datasetName = re.sub('/*$','.{0}'.format(fileDatasetID),datasetName)
-                                # set destination
-                                if cDatasetSpec.destination in [None,'']:
-                                    cDatasetSpec.destination = cDatasetSpec.site
-                                varMap = {}
-                                varMap[':datasetName'] = cDatasetSpec.datasetName
-                                varMap[':jediTaskID'] = jediTaskID
-                                varMap[':datasetID'] = fileDatasetID
-                                varMap[':site'] = cDatasetSpec.site
-                                varMap[':destination'] = cDatasetSpec.destination
-                                self.cur.execute(sqlCN+comment,varMap)
-                            tmpLog.debug('instantiated {0} datasetID={1}'.format(cDatasetSpec.datasetName,fileDatasetID))
-                            if masterID != None:
-                                mstr_RelationMap[fileDatasetID] = (masterID,instantiatedSite)
-                            # collect ID of dataset to be registered 
-                            if not fileDatasetID in datasetToRegister: 
-                                datasetToRegister.append(fileDatasetID)
-                            # collect IDs for pre-merging
-                            if isUnMerging:
-                                if not siteDsMap.has_key(datasetID):
-                                    siteDsMap[datasetID] = {}
-                                if not siteDsMap[datasetID].has_key(instantiatedSite):
-                                    siteDsMap[datasetID][instantiatedSite] = fileDatasetID
-                        # keep relation between template and concrete    
-                        if not datasetID in tmpl_RelationMap:
-                            tmpl_RelationMap[datasetID] = {}
-                        tmpl_RelationMap[datasetID][instantiatedSite] = fileDatasetID
-                    fileDatasetIDs.append(fileDatasetID)
-                # get output templates
-                varMap = {}
-                varMap[':jediTaskID'] = jediTaskID
-                varMap[':datasetID']  = datasetID
-                self.cur.execute(sqlR+comment,varMap)
-                resTmpList = self.cur.fetchall()
-                maxSerialNr = None
-                for resR in resTmpList:
-                    # make FileSpec
-                    outTempID,datasetID,fileNameTemplate,serialNr,outType,streamName = resR
-                    if xmlConfigJob == None or outType.endswith('log'):
-                        fileNameTemplateList = [(fileNameTemplate,streamName)]
-                    else:
-                        fileNameTemplateList = []
-                        # get output filenames from XML config
-                        for tmpFileName in xmlConfigJob.outputs().split(','):
-                            # ignore empty
-                            if tmpFileName == '':
-                                continue
-                            newStreamName = tmpFileName
-                            newFileNameTemplate = fileNameTemplate + '.' + xmlConfigJob.prepend_string() + '.' + newStreamName
-                            fileNameTemplateList.append((newFileNameTemplate,newStreamName))
-                    # loop over all filename templates
-                    for fileNameTemplate,streamName in fileNameTemplateList:
-                        firstFileID = None
-                        for fileDatasetID in fileDatasetIDs:
-                            fileSpec = JediFileSpec()
-                            fileSpec.jediTaskID   = jediTaskID
-                            fileSpec.datasetID = fileDatasetID
-                            nameTemplate = fileNameTemplate.replace('${SN}','{SN:06d}')
-                            nameTemplate = nameTemplate.replace('${SN/P}','{SN:06d}')
-                            nameTemplate = nameTemplate.replace('${SN','{SN')
-                            nameTemplate = nameTemplate.replace('${MIDDLENAME}',middleName)
-                            fileSpec.lfn          = nameTemplate.format(SN=serialNr)
-                            fileSpec.status       = 'defined'
-                            fileSpec.creationDate = timeNow
-                            fileSpec.type         = outType
-                            fileSpec.keepTrack    = 1
-                            if maxSerialNr == None or maxSerialNr < serialNr:
-                                maxSerialNr = serialNr
-                            # scope
-                            if vo in jedi_config.ddm.voWithScope.split(','):
-                                fileSpec.scope = self.extractScope(datasetName)
-                            if not simul:    
-                                # insert
-                                if indexFileID < len(fileIDPool):
-                                    fileSpec.fileID = fileIDPool[indexFileID]
-                                    varMap = fileSpec.valuesMap()
-                                    varMapsForInsert.append(varMap)
-                                    indexFileID += 1
-                                else:
-                                    varMap = fileSpec.valuesMap(useSeq=True)
-                                    varMap[':newFileID'] = self.cur.var(cx_Oracle.NUMBER)
-                                    self.cur.execute(sqlI+comment,varMap)
-                                    fileSpec.fileID = long(varMap[':newFileID'].getvalue())
-                                # increment SN
-                                varMap = {}
-                                varMap[':jediTaskID'] = jediTaskID
-                                varMap[':outTempID']  = outTempID
-                                varMapsForSN.append(varMap)
-                            else:
-                                # set dummy for simulation
-                                fileSpec.fileID = fileSpec.datasetID
-                            # append
-                            if firstFileID == None:
-                                outMap[streamName] = fileSpec
-                                firstFileID = fileSpec.fileID
-                                parallelOutMap[firstFileID] = []
-                            parallelOutMap[firstFileID].append(fileSpec)
-            # bulk increment
-            if len(varMapsForSN) > 0:
-                tmpLog.debug('bulk increment {0} SNs'.format(len(varMapsForSN)))
-                self.cur.executemany(sqlU+comment,varMapsForSN)
-            # bulk insert
-            if len(varMapsForInsert) > 0:
-                tmpLog.debug('bulk insert {0} files'.format(len(varMapsForInsert)))
-                self.cur.executemany(sqlII+comment,varMapsForInsert)
-            # set masterID to concrete datasets 
-            for fileDatasetID,(masterID,instantiatedSite) in mstr_RelationMap.iteritems():
-                varMap = {}
-                varMap[':jediTaskID'] = jediTaskID
-                varMap[':datasetID']  = fileDatasetID
-                if masterID in tmpl_RelationMap and instantiatedSite in tmpl_RelationMap[masterID]:
-                    varMap[':masterID'] = tmpl_RelationMap[masterID][instantiatedSite]
-                else:
-                    varMap[':masterID'] = masterID
-                self.cur.execute(sqlMC+comment,varMap)
+            # make files
+            outMap,maxSerialNr,datasetToRegister,parallelGroups = self.makeOutputFiles(jediTaskID,provenanceID,simul,instantiateTmpl,
+                                                                                       instantiatedSites,isUnMerging,isPrePro,
+                                                                                       xmlConfigJob,siteDsMap,middleName,
+                                                                                       registerDatasets,outCtx,comment,tmpLog)
+            # insert files and increment SNs
+            self.flushOutputFiles(outCtx,comment,tmpLog)
+            for tmpFileSpecList in parallelGroups:
+                parallelOutMap[tmpFileSpecList[0].fileID] = tmpFileSpecList
             # commit
             if not self._commit():
                 raise RuntimeError, 'Commit error'
-            tmpLog.debug('done indexFileID={0}'.format(indexFileID))
+            tmpLog.debug('done indexFileID={0}'.format(outCtx['indexFileID']))
             return outMap,maxSerialNr,datasetToRegister,siteDsMap,parallelOutMap
         except:
             # roll back
@@ -2519,6 +2279,375 @@ class DBProxy(taskbuffer.OraDBProxy.DBProxy):
             return None,None,None,siteDsMap,parallelOutMap
 
 
+
+    # generate output files for multiple jobs in one transaction. outRequests is a list of
+    # (provenanceID,instantiateTmpl,instantiatedSites,isUnMerging,xmlConfigJob,middleName) for each job
+    def getOutputFilesBulk_JEDI(self,jediTaskID,outRequests,simul,siteDsMap,registerDatasets):
+        comment = ' /* JediDBProxy.getOutputFilesBulk_JEDI */'
+        methodName = self.getMethodName(comment)
+        methodName += ' <jediTaskID={0}>'.format(jediTaskID)
+        tmpLog = MsgWrapper(logger,methodName)
+        tmpLog.debug('start with {0} jobs simul={1} registerDatasets={2}'.format(len(outRequests),simul,
+                                                                                 registerDatasets))
+        try:
+            if siteDsMap == None:
+                siteDsMap = {}
+            outCtx = self.makeOutputFilesContext([],True)
+            # sql to get dataset
+            sqlDS  = "SELECT {0} ".format(JediDatasetSpec.columnNames())
+            sqlDS += "FROM {0}.JEDI_Datasets WHERE jediTaskID=:jediTaskID AND datasetID=:datasetID ".format(jedi_config.db.schemaJEDI)
+            # begin transaction
+            self.conn.begin()
+            self.cur.arraysize = 100
+            # make files
+            retList = []
+            datasetToRegister = []
+            for provenanceID,instantiateTmpl,instantiatedSites,isUnMerging,xmlConfigJob,middleName in outRequests:
+                outMap,maxSerialNr,tmpToRegister,parallelGroups = self.makeOutputFiles(jediTaskID,provenanceID,simul,instantiateTmpl,
+                                                                                       instantiatedSites,isUnMerging,False,
+                                                                                       xmlConfigJob,siteDsMap,middleName,
+                                                                                       registerDatasets,outCtx,comment,tmpLog)
+                for tmpDatasetID in tmpToRegister:
+                    if not tmpDatasetID in datasetToRegister:
+                        datasetToRegister.append(tmpDatasetID)
+                retList.append([outMap,maxSerialNr,parallelGroups])
+            # insert files and increment SNs
+            self.flushOutputFiles(outCtx,comment,tmpLog)
+            # get datasets of output files
+            datasetSpecMap = {}
+            for tmpItem in retList:
+                parallelOutMap = {}
+                for tmpFileSpecList in tmpItem[2]:
+                    parallelOutMap[tmpFileSpecList[0].fileID] = tmpFileSpecList
+                    for tmpFileSpec in tmpFileSpecList:
+                        if tmpFileSpec.datasetID in datasetSpecMap:
+                            continue
+                        varMap = {}
+                        varMap[':jediTaskID'] = jediTaskID
+                        varMap[':datasetID'] = tmpFileSpec.datasetID
+                        self.cur.execute(sqlDS+comment,varMap)
+                        resDS = self.cur.fetchone()
+                        if resDS == None:
+                            raise RuntimeError, 'datasetID={0} not found'.format(tmpFileSpec.datasetID)
+                        datasetSpec = JediDatasetSpec()
+                        datasetSpec.pack(resDS)
+                        datasetSpecMap[tmpFileSpec.datasetID] = datasetSpec
+                tmpItem[2] = parallelOutMap
+            # commit
+            if not self._commit():
+                raise RuntimeError, 'Commit error'
+            tmpLog.debug('done with {0} files'.format(len(outCtx['varMapsForInsert'])))
+            return retList,datasetToRegister,siteDsMap,datasetSpecMap
+        except:
+            # roll back
+            self._rollback()
+            # error
+            self.dumpErrorMessage(tmpLog)
+            return None,None,siteDsMap,None
+
+
+
+    # make context to accumulate output files in a transaction. fileIDs are taken from the
+    # sequence in bulk when the pool is exhausted if deferFileID=True
+    def makeOutputFilesContext(self,fileIDPool,deferFileID):
+        return {'timeNow':datetime.datetime.utcnow(),
+                'fileIDPool':fileIDPool,
+                'indexFileID':0,
+                'deferFileID':deferFileID,
+                'filesWithoutID':[],
+                'varMapsForInsert':[],
+                'varMapsForSN':[],
+                'serialNrOffset':{}}
+
+
+
+    # make output files in the current transaction, and instantiate template datasets if necessary
+    def makeOutputFiles(self,jediTaskID,provenanceID,simul,instantiateTmpl,instantiatedSites,isUnMerging,
+                        isPrePro,xmlConfigJob,siteDsMap,middleName,registerDatasets,outCtx,comment,tmpLog):
+        if instantiatedSites == None:
+            instantiatedSites = ''
+        outMap = {}
+        parallelGroups = []
+        datasetToRegister = []
+        fileIDPool = outCtx['fileIDPool']
+        # sql to get dataset
+        sqlD  = "SELECT "
+        sqlD += "datasetID,datasetName,vo,masterID,status,type FROM {0}.JEDI_Datasets ".format(jedi_config.db.schemaJEDI)
+        sqlD += "WHERE jediTaskID=:jediTaskID AND type IN (:type1,:type2) "
+        if provenanceID != None:
+            sqlD += "AND (provenanceID IS NULL OR provenanceID=:provenanceID) "
+        # sql to read template
+        sqlR  = "SELECT outTempID,datasetID,fileNameTemplate,serialNr,outType,streamName "
+        sqlR += "FROM {0}.JEDI_Output_Template ".format(jedi_config.db.schemaJEDI)
+        sqlR += "WHERE jediTaskID=:jediTaskID AND datasetID=:datasetID FOR UPDATE"
+        # sql to insert files
+        sqlI  = "INSERT INTO {0}.JEDI_Dataset_Contents ({1}) ".format(jedi_config.db.schemaJEDI,JediFileSpec.columnNames())
+        sqlI += JediFileSpec.bindValuesExpression()
+        sqlI += " RETURNING fileID INTO :newFileID"
+        # sql to instantiate template dataset
+        sqlT1  = "SELECT {0} FROM {1}.JEDI_Datasets ".format(JediDatasetSpec.columnNames(),
+                                                             jedi_config.db.schemaJEDI)
+        sqlT1 += "WHERE jediTaskID=:jediTaskID AND datasetID=:datasetID "
+        sqlT2  = "INSERT INTO {0}.JEDI_Datasets ({1}) ".format(jedi_config.db.schemaJEDI,
+                                                               JediDatasetSpec.columnNames())
+        sqlT2 += JediDatasetSpec.bindValuesExpression()
+        sqlT2 += "RETURNING datasetID INTO :newDatasetID "
+        # sql to change concrete dataset name
+        sqlCN  = "UPDATE {0}.JEDI_Datasets ".format(jedi_config.db.schemaJEDI)
+        sqlCN += "SET site=:site,datasetName=:datasetName,destination=:destination "
+        sqlCN += " WHERE jediTaskID=:jediTaskID AND datasetID=:datasetID "
+        # sql to set masterID to concrete datasets
+        sqlMC  = "UPDATE {0}.JEDI_Datasets ".format(jedi_config.db.schemaJEDI)
+        sqlMC += "SET masterID=:masterID "
+        sqlMC += " WHERE jediTaskID=:jediTaskID AND datasetID=:datasetID "
+        # current current date
+        timeNow = outCtx['timeNow']
+        # get datasets
+        varMap = {}
+        varMap[':jediTaskID'] = jediTaskID
+        varMap[':type1'] = 'output'
+        varMap[':type2'] = 'log'
+        # unmerged datasets
+        if isUnMerging:
+            varMap[':type1'] = 'trn_' + varMap[':type1']
+            varMap[':type2'] = 'trn_' + varMap[':type2']
+        elif isPrePro:
+            varMap[':type1'] = 'pp_' + varMap[':type1']
+            varMap[':type2'] = 'pp_' + varMap[':type2']
+        # template datasets
+        if instantiateTmpl:
+            varMap[':type1'] = 'tmpl_' + varMap[':type1']
+            varMap[':type2'] = 'tmpl_' + varMap[':type2']
+        # keep dataset types
+        tmpl_VarMap = {}
+        tmpl_VarMap[':type1'] = varMap[':type1']
+        tmpl_VarMap[':type2'] = varMap[':type2']
+        if provenanceID != None:
+            varMap[':provenanceID'] = provenanceID
+        self.cur.execute(sqlD+comment,varMap)
+        resList = self.cur.fetchall()
+        tmpl_RelationMap = {}
+        mstr_RelationMap = {}
+        for datasetID,datasetName,vo,masterID,datsetStatus,datasetType in resList:
+            fileDatasetIDs = []
+            for instantiatedSite in instantiatedSites.split(','):
+                fileDatasetID = datasetID
+                if registerDatasets and datasetType in ['output','log'] and not fileDatasetID in datasetToRegister:
+                    datasetToRegister.append(fileDatasetID)
+                # instantiate template datasets
+                if instantiateTmpl:
+                    doInstantiate = False
+                    if isUnMerging:
+                        # instantiate new datasets in each submission for premerged 
+                        if siteDsMap.has_key(datasetID) and siteDsMap[datasetID].has_key(instantiatedSite):
+                            fileDatasetID = siteDsMap[datasetID][instantiatedSite]
+                            tmpLog.debug('found concrete premerged datasetID={0}'.format(fileDatasetID))
+                        else:
+                            doInstantiate = True
+                    else:
+                        # check if concrete dataset is already there
+                        varMap = {}
+                        varMap[':jediTaskID'] = jediTaskID
+                        varMap[':type1']    = re.sub('^tmpl_','',tmpl_VarMap[':type1'])
+                        varMap[':type2']    = re.sub('^tmpl_','',tmpl_VarMap[':type2'])
+                        varMap[':templateID'] = datasetID
+                        varMap[':closedState'] = 'closed'
+                        if provenanceID != None:
+                            varMap[':provenanceID'] = provenanceID
+                        if instantiatedSite != None:
+                            sqlDT = sqlD + "AND site=:site "
+                            varMap[':site'] = instantiatedSite
+                        else:
+                            sqlDT = sqlD
+                        sqlDT += "AND (state IS NULL OR state<>:closedState) "
+                        sqlDT += "AND templateID=:templateID "    
+                        self.cur.execute(sqlDT+comment,varMap)
+                        resDT = self.cur.fetchone()
+                        if resDT != None:
+                            fileDatasetID = resDT[0]
+                            # collect ID of dataset to be registered 
+                            if resDT[-1] == 'defined':
+                                datasetToRegister.append(fileDatasetID)
+                            tmpLog.debug('found concrete datasetID={0}'.format(fileDatasetID))
+                        else:
+                            doInstantiate = True
+                    if doInstantiate:
+                        # read dataset template
+                        varMap = {}
+                        varMap[':jediTaskID'] = jediTaskID
+                        varMap[':datasetID']  = datasetID
+                        self.cur.execute(sqlT1+comment,varMap)
+                        resT1 = self.cur.fetchone()
+                        cDatasetSpec = JediDatasetSpec()
+                        cDatasetSpec.pack(resT1)
+                        # instantiate template dataset
+                        cDatasetSpec.type             = re.sub('^tmpl_','',cDatasetSpec.type)
+                        cDatasetSpec.templateID       = datasetID
+                        cDatasetSpec.creationTime     = timeNow
+                        cDatasetSpec.modificationTime = timeNow
+                        varMap = cDatasetSpec.valuesMap(useSeq=True)
+                        varMap[':newDatasetID'] = self.cur.var(cx_Oracle.NUMBER)
+                        self.cur.execute(sqlT2+comment,varMap)
+                        fileDatasetID = long(varMap[':newDatasetID'].getvalue())
+                        if instantiatedSite != None:
+                            # set concreate name
+                            cDatasetSpec.site = instantiatedSite
+                            cDatasetSpec.datasetName = re.sub('/*$','.{0}'.format(fileDatasetID),datasetName)
+                            # set destination
+                            if cDatasetSpec.destination in [None,'']:
+                                cDatasetSpec.destination = cDatasetSpec.site
+                            varMap = {}
+                            varMap[':datasetName'] = cDatasetSpec.datasetName
+                            varMap[':jediTaskID'] = jediTaskID
+                            varMap[':datasetID'] = fileDatasetID
+                            varMap[':site'] = cDatasetSpec.site
+                            varMap[':destination'] = cDatasetSpec.destination
+                            self.cur.execute(sqlCN+comment,varMap)
+                        tmpLog.debug('instantiated {0} datasetID={1}'.format(cDatasetSpec.datasetName,fileDatasetID))
+                        if masterID != None:
+                            mstr_RelationMap[fileDatasetID] = (masterID,instantiatedSite)
+                        # collect ID of dataset to be registered 
+                        if not fileDatasetID in datasetToRegister: 
+                            datasetToRegister.append(fileDatasetID)
+                        # collect IDs for pre-merging
+                        if isUnMerging:
+                            if not siteDsMap.has_key(datasetID):
+                                siteDsMap[datasetID] = {}
+                            if not siteDsMap[datasetID].has_key(instantiatedSite):
+                                siteDsMap[datasetID][instantiatedSite] = fileDatasetID
+                    # keep relation between template and concrete    
+                    if not datasetID in tmpl_RelationMap:
+                        tmpl_RelationMap[datasetID] = {}
+                    tmpl_RelationMap[datasetID][instantiatedSite] = fileDatasetID
+                fileDatasetIDs.append(fileDatasetID)
+            # get output templates
+            varMap = {}
+            varMap[':jediTaskID'] = jediTaskID
+            varMap[':datasetID']  = datasetID
+            self.cur.execute(sqlR+comment,varMap)
+            resTmpList = self.cur.fetchall()
+            maxSerialNr = None
+            for resR in resTmpList:
+                # make FileSpec
+                outTempID,datasetID,fileNameTemplate,serialNr,outType,streamName = resR
+                # add increments not yet written in this transaction
+                if outTempID in outCtx['serialNrOffset']:
+                    serialNr += outCtx['serialNrOffset'][outTempID]
+                if xmlConfigJob == None or outType.endswith('log'):
+                    fileNameTemplateList = [(fileNameTemplate,streamName)]
+                else:
+                    fileNameTemplateList = []
+                    # get output filenames from XML config
+                    for tmpFileName in xmlConfigJob.outputs().split(','):
+                        # ignore empty
+                        if tmpFileName == '':
+                            continue
+                        newStreamName = tmpFileName
+                        newFileNameTemplate = fileNameTemplate + '.' + xmlConfigJob.prepend_string() + '.' + newStreamName
+                        fileNameTemplateList.append((newFileNameTemplate,newStreamName))
+                # loop over all filename templates
+                for fileNameTemplate,streamName in fileNameTemplateList:
+                    firstFileSpec = None
+                    for fileDatasetID in fileDatasetIDs:
+                        fileSpec = JediFileSpec()
+                        fileSpec.jediTaskID   = jediTaskID
+                        fileSpec.datasetID = fileDatasetID
+                        nameTemplate = fileNameTemplate.replace('${SN}','{SN:06d}')
+                        nameTemplate = nameTemplate.replace('${SN/P}','{SN:06d}')
+                        nameTemplate = nameTemplate.replace('${SN','{SN')
+                        nameTemplate = nameTemplate.replace('${MIDDLENAME}',middleName)
+                        fileSpec.lfn          = nameTemplate.format(SN=serialNr)
+                        fileSpec.status       = 'defined'
+                        fileSpec.creationDate = timeNow
+                        fileSpec.type         = outType
+                        fileSpec.keepTrack    = 1
+                        if maxSerialNr == None or maxSerialNr < serialNr:
+                            maxSerialNr = serialNr
+                        # scope
+                        if vo in jedi_config.ddm.voWithScope.split(','):
+                            fileSpec.scope = self.extractScope(datasetName)
+                        if not simul:    
+                            # insert
+                            if outCtx['indexFileID'] < len(fileIDPool):
+                                fileSpec.fileID = fileIDPool[outCtx['indexFileID']]
+                                varMap = fileSpec.valuesMap()
+                                outCtx['varMapsForInsert'].append(varMap)
+                                outCtx['indexFileID'] += 1
+                            elif outCtx['deferFileID']:
+                                # fileID is set later
+                                outCtx['filesWithoutID'].append(fileSpec)
+                            else:
+                                varMap = fileSpec.valuesMap(useSeq=True)
+                                varMap[':newFileID'] = self.cur.var(cx_Oracle.NUMBER)
+                                self.cur.execute(sqlI+comment,varMap)
+                                fileSpec.fileID = long(varMap[':newFileID'].getvalue())
+                            # increment SN
+                            varMap = {}
+                            varMap[':jediTaskID'] = jediTaskID
+                            varMap[':outTempID']  = outTempID
+                            outCtx['varMapsForSN'].append(varMap)
+                            if not outTempID in outCtx['serialNrOffset']:
+                                outCtx['serialNrOffset'][outTempID] = 0
+                            outCtx['serialNrOffset'][outTempID] += 1
+                        else:
+                            # set dummy for simulation
+                            fileSpec.fileID = fileSpec.datasetID
+                        # append
+                        if firstFileSpec == None:
+                            outMap[streamName] = fileSpec
+                            firstFileSpec = fileSpec
+                            parallelGroups.append([])
+                        parallelGroups[-1].append(fileSpec)
+        # set masterID to concrete datasets 
+        for fileDatasetID,(masterID,instantiatedSite) in mstr_RelationMap.iteritems():
+            varMap = {}
+            varMap[':jediTaskID'] = jediTaskID
+            varMap[':datasetID']  = fileDatasetID
+            if masterID in tmpl_RelationMap and instantiatedSite in tmpl_RelationMap[masterID]:
+                varMap[':masterID'] = tmpl_RelationMap[masterID][instantiatedSite]
+            else:
+                varMap[':masterID'] = masterID
+            self.cur.execute(sqlMC+comment,varMap)
+        return outMap,maxSerialNr,datasetToRegister,parallelGroups
+
+
+
+    # insert output files and increment SNs accumulated in the context
+    def flushOutputFiles(self,outCtx,comment,tmpLog):
+        # sql to get fileID
+        sqlFID  = "SELECT {0}.JEDI_DATASET_CONT_FILEID_SEQ.nextval FROM ".format(jedi_config.db.schemaJEDI)
+        sqlFID += "(SELECT level FROM dual CONNECT BY level<=:nIDs) " 
+        # sql to increment SN
+        sqlU  = "UPDATE {0}.JEDI_Output_Template SET serialNr=serialNr+1 ".format(jedi_config.db.schemaJEDI)
+        sqlU += "WHERE jediTaskID=:jediTaskID AND outTempID=:outTempID "
+        # sql to insert files without fileID
+        sqlII  = "INSERT INTO {0}.JEDI_Dataset_Contents ({1}) ".format(jedi_config.db.schemaJEDI,JediFileSpec.columnNames())
+        sqlII += JediFileSpec.bindValuesExpression(useSeq=False)
+        # get fileIDs in bulk
+        if len(outCtx['filesWithoutID']) > 0:
+            varMap = {}
+            varMap[':nIDs'] = len(outCtx['filesWithoutID'])
+            self.cur.arraysize = 10000
+            self.cur.execute(sqlFID+comment,varMap)
+            resFID = self.cur.fetchall()
+            self.cur.arraysize = 100
+            if len(resFID) != len(outCtx['filesWithoutID']):
+                raise RuntimeError, 'got {0} fileIDs while {1} are required'.format(len(resFID),len(outCtx['filesWithoutID']))
+            for fileSpec,(fileID,) in zip(outCtx['filesWithoutID'],resFID):
+                fileSpec.fileID = fileID
+                outCtx['varMapsForInsert'].append(fileSpec.valuesMap())
+            outCtx['filesWithoutID'] = []
+        # bulk increment
+        if len(outCtx['varMapsForSN']) > 0:
+            tmpLog.debug('bulk increment {0} SNs'.format(len(outCtx['varMapsForSN'])))
+            self.cur.executemany(sqlU+comment,outCtx['varMapsForSN'])
+        # bulk insert
+        if len(outCtx['varMapsForInsert']) > 0:
+            tmpLog.debug('bulk insert {0} files'.format(len(outCtx['varMapsForInsert'])))
+            self.cur.executemany(sqlII+comment,outCtx['varMapsForInsert'])
+
+
+
     # insert output file templates
     def insertOutputTemplate_JEDI(self,templates):
         comment = ' /* JediDBProxy.insertOutputTemplate_JEDI */'
@@ -7619,6 +7748,177 @@ class DBProxy(taskbuffer.OraDBProxy.DBProxy):
 
 
 
+    # reserve random seeds for multiple jobs in one transaction
+    def reserveRandomSeeds_JEDI(self,jediTaskID,nSeeds,simul):
+        comment = ' /* JediDBProxy.reserveRandomSeeds_JEDI */'
+        methodName = self.getMethodName(comment)
+        methodName += " <jediTaskID={0} nSeeds={1}>".format(jediTaskID,nSeeds)
+        tmpLog = MsgWrapper(logger,methodName)
+        tmpLog.debug('start')
+        try:
+            # sql to get pseudo dataset for random seed
+            sqlDS  = "SELECT {0} ".format(JediDatasetSpec.columnNames())
+            sqlDS += "FROM {0}.JEDI_Datasets ".format(jedi_config.db.schemaJEDI)
+            sqlDS += "WHERE jediTaskID=:jediTaskID AND type=:type "
+            # sql to get min random seeds
+            sqlFR  = "SELECT * FROM (SELECT {0} ".format(JediFileSpec.columnNames())
+            sqlFR += "FROM {0}.JEDI_Dataset_Contents WHERE ".format(jedi_config.db.schemaJEDI)
+            sqlFR += "jediTaskID=:jediTaskID AND datasetID=:datasetID AND status=:status "
+            sqlFR += "ORDER BY firstEvent) "
+            sqlFR += "WHERE rownum<=:nSeeds "
+            # sql to update file status
+            sqlFU  = "UPDATE {0}.JEDI_Dataset_Contents ".format(jedi_config.db.schemaJEDI)
+            sqlFU += "SET status=:status "
+            sqlFU += "WHERE jediTaskID=:jediTaskID AND datasetID=:datasetID AND fileID=:fileID "
+            # sql to get max random seed
+            sqlLR  = "SELECT MAX(firstEvent) FROM {0}.JEDI_Dataset_Contents ".format(jedi_config.db.schemaJEDI)
+            sqlLR += "WHERE jediTaskID=:jediTaskID AND datasetID=:datasetID "
+            # sql to get fileIDs
+            sqlFID  = "SELECT {0}.JEDI_DATASET_CONT_FILEID_SEQ.nextval FROM ".format(jedi_config.db.schemaJEDI)
+            sqlFID += "(SELECT level FROM dual CONNECT BY level<=:nIDs) " 
+            # sql to insert files
+            sqlFI  = "INSERT INTO {0}.JEDI_Dataset_Contents ({1}) ".format(jedi_config.db.schemaJEDI,JediFileSpec.columnNames())
+            sqlFI += JediFileSpec.bindValuesExpression(useSeq=False)
+            # start transaction
+            self.conn.begin()
+            self.cur.arraysize = 10000
+            # get pseudo dataset for random seed
+            varMap = {}
+            varMap[':jediTaskID'] = jediTaskID
+            varMap[':type'] = 'random_seed'
+            self.cur.execute(sqlDS+comment,varMap)
+            resDS = self.cur.fetchone()
+            if resDS == None:
+                # no random seed
+                retVal = (None,None)
+                tmpLog.debug('no random seed')
+            else:
+                datasetSpec = JediDatasetSpec()
+                datasetSpec.pack(resDS)
+                fileSpecList = []
+                # get min random seeds
+                varMap = {}
+                varMap[':jediTaskID'] = jediTaskID
+                varMap[':datasetID']  = datasetSpec.datasetID
+                varMap[':status']     = 'ready'
+                varMap[':nSeeds']     = nSeeds
+                self.cur.execute(sqlFR+comment,varMap)
+                resFR = self.cur.fetchall()
+                varMaps = []
+                for tmpRes in resFR:
+                    # make FileSpec to reuse the row
+                    tmpFileSpec = JediFileSpec()
+                    tmpFileSpec.pack(tmpRes)
+                    fileSpecList.append(tmpFileSpec)
+                    varMap = {}
+                    varMap[':jediTaskID'] = jediTaskID
+                    varMap[':datasetID']  = datasetSpec.datasetID
+                    varMap[':fileID']     = tmpFileSpec.fileID
+                    varMap[':status']     = 'picked'
+                    varMaps.append(varMap)
+                # update status
+                if len(varMaps) > 0:
+                    self.cur.executemany(sqlFU+comment,varMaps)
+                    tmpLog.debug('reuse {0} rows'.format(len(varMaps)))
+                nNew = nSeeds - len(fileSpecList)
+                if nNew > 0:
+                    # get max random seed
+                    varMap = {}
+                    varMap[':jediTaskID'] = jediTaskID
+                    varMap[':datasetID']  = datasetSpec.datasetID
+                    self.cur.execute(sqlLR+comment,varMap)
+                    resLR = self.cur.fetchone()
+                    maxRndSeed = None
+                    if resLR != None:
+                        maxRndSeed, = resLR
+                    if maxRndSeed == None:
+                        # first row
+                        maxRndSeed = 0
+                    # get fileIDs
+                    if not simul:
+                        varMap = {}
+                        varMap[':nIDs'] = nNew
+                        self.cur.execute(sqlFID+comment,varMap)
+                        resFID = self.cur.fetchall()
+                    varMaps = []
+                    timeNow = datetime.datetime.utcnow()
+                    for iNew in range(nNew):
+                        maxRndSeed += 1
+                        tmpFileSpec = JediFileSpec()
+                        tmpFileSpec.jediTaskID   = jediTaskID
+                        tmpFileSpec.datasetID    = datasetSpec.datasetID
+                        tmpFileSpec.status       = 'picked'
+                        tmpFileSpec.creationDate = timeNow
+                        tmpFileSpec.keepTrack    = 1
+                        tmpFileSpec.type         = 'random_seed' 
+                        tmpFileSpec.lfn          = "{0}".format(maxRndSeed)
+                        tmpFileSpec.firstEvent   = maxRndSeed
+                        if not simul:
+                            tmpFileSpec.fileID = resFID[iNew][0]
+                            varMaps.append(tmpFileSpec.valuesMap())
+                        tmpFileSpec.status       = 'ready'
+                        fileSpecList.append(tmpFileSpec)
+                    # insert files
+                    if len(varMaps) > 0:
+                        self.cur.executemany(sqlFI+comment,varMaps)
+                        tmpLog.debug('insert {0} rows up to rndmSeed={1}'.format(len(varMaps),maxRndSeed))
+                # cannot return JobFileSpec due to owner.PandaID
+                retVal = (fileSpecList,datasetSpec)
+            # commit
+            if not self._commit():
+                raise RuntimeError, 'Commit error'
+            # return
+            tmpLog.debug("done")
+            return True,retVal
+        except:
+            # roll back
+            self._rollback()
+            # error
+            self.dumpErrorMessage(tmpLog)
+            return False,(None,None)
+
+
+
+    # release random seeds which were reserved but not used
+    def releaseRandomSeeds_JEDI(self,jediTaskID,datasetID,fileIDs):
+        comment = ' /* JediDBProxy.releaseRandomSeeds_JEDI */'
+        methodName = self.getMethodName(comment)
+        methodName += " <jediTaskID={0} datasetID={1}>".format(jediTaskID,datasetID)
+        tmpLog = MsgWrapper(logger,methodName)
+        tmpLog.debug('start with {0} seeds'.format(len(fileIDs)))
+        try:
+            # sql to update file status
+            sqlFU  = "UPDATE {0}.JEDI_Dataset_Contents ".format(jedi_config.db.schemaJEDI)
+            sqlFU += "SET status=:newStatus "
+            sqlFU += "WHERE jediTaskID=:jediTaskID AND datasetID=:datasetID AND fileID=:fileID AND status=:oldStatus "
+            # start transaction
+            self.conn.begin()
+            varMaps = []
+            for fileID in fileIDs:
+                varMap = {}
+                varMap[':jediTaskID'] = jediTaskID
+                varMap[':datasetID']  = datasetID
+                varMap[':fileID']     = fileID
+                varMap[':newStatus']  = 'ready'
+                varMap[':oldStatus']  = 'picked'
+                varMaps.append(varMap)
+            if len(varMaps) > 0:
+                self.cur.executemany(sqlFU+comment,varMaps)
+            # commit
+            if not self._commit():
+                raise RuntimeError, 'Commit error'
+            # return
+            tmpLog.debug("done")
+            return True
+        except:
+            # roll back
+            self._rollback()
+            # error
+            self.dumpErrorMessage(tmpLog)
+            return False
+
+
+
     # get preprocess metadata
     def getPreprocessMetadata_JEDI(self,jediTaskID):
         comment = ' /* JediDBProxy.getPreprocessMetadata_JEDI */'
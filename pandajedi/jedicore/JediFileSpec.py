@@ -20,6 +20,10 @@ class JediFileSpec(object):
     _zeroAttrs = ('fsize','attemptNr','failedAttempt','ramCount')
     # mapping between sequence and attr
     _seqAttrMap = {'fileID':'ATLAS_PANDA.JEDI_DATASET_CONT_FILEID_SEQ.nextval'}
+    # bit in the mask of changed attributes
+    _attrBitMap = dict((attr,1<<i) for i,attr in enumerate(_attributes))
+    # attributes are stored in slots without per-object dict since millions of files can be loaded
+    __slots__ = _attributes + ('_changedMask','_locality','sourceName')
 
 
     # constructor
@@ -30,27 +34,67 @@ class JediFileSpec(object):
                 object.__setattr__(self,attr,0)
             else:
                 object.__setattr__(self,attr,None)
-        # map of changed attributes
-        object.__setattr__(self,'_changedAttrs',{})
-        # locality
-        object.__setattr__(self,'locality',{})
+        # mask of changed attributes
+        object.__setattr__(self,'_changedMask',0)
+        # locality which is allocated when used
+        object.__setattr__(self,'_locality',None)
         # source name
         object.__setattr__(self,'sourceName',None)
 
 
     # override __setattr__ to collecte the changed attributes
     def __setattr__(self,name,value):
+        bit = self._attrBitMap.get(name)
+        if bit == None:
+            object.__setattr__(self,name,value)
+            return
         oldVal = getattr(self,name)
         object.__setattr__(self,name,value)
-        newVal = getattr(self,name)
         # collect changed attributes
-        if oldVal != newVal:
-            self._changedAttrs[name] = value
+        if oldVal != value:
+            object.__setattr__(self,'_changedMask',self._changedMask | bit)
+
+
+    # locality
+    def getLocality(self):
+        if self._locality == None:
+            object.__setattr__(self,'_locality',{})
+        return self._locality
+    def setLocality(self,value):
+        object.__setattr__(self,'_locality',value)
+    locality = property(getLocality,setLocality)
+
+
+    # get state for pickle and copy
+    def __getstate__(self):
+        return tuple([getattr(self,attr) for attr in self.__slots__])
+
+
+    # set state for unpickle and copy
+    def __setstate__(self,state):
+        # dict made before slots were used
+        if isinstance(state,types.DictType):
+            self.__init__()
+            for attr,val in state.iteritems():
+                if attr == '_changedAttrs':
+                    for tmpAttr in val:
+                        if tmpAttr in self._attrBitMap:
+                            object.__setattr__(self,'_changedMask',self._changedMask | self._attrBitMap[tmpAttr])
+                elif attr in self.__slots__ or attr == 'locality':
+                    object.__setattr__(self,attr,val)
+            return
+        for attr,val in zip(self.__slots__,state):
+            object.__setattr__(self,attr,val)
+
+
+    # check if an attribute was changed
+    def isChanged(self,attr):
+        return (self._changedMask & self._attrBitMap[attr]) != 0
 
 
     # reset changed attribute list
     def resetChangedList(self):
-        object.__setattr__(self,'_changedAttrs',{})
+        object.__setattr__(self,'_changedMask',0)
         
     
     # return map of values
@@ -62,7 +106,7 @@ class JediFileSpec(object):
                 continue
             # only changed attributes
             if onlyChanged:
-                if not self._changedAttrs.has_key(attr):
+                if not self.isChanged(attr):
                     continue
             val = getattr(self,attr)
             if val == None:
@@ -127,7 +171,7 @@ class JediFileSpec(object):
     def bindUpdateChangesExpression(self):
         ret = ""
         for attr in self._attributes:
-            if self._changedAttrs.has_key(attr):
+            if self.isChanged(attr):
                 ret += '%s=:%s,' % (attr,attr)
         ret  = ret[:-1]
         ret += ' '
@@ -1,6 +1,10 @@
 # DB API for JEDI
 
+import os
+import glob
+import cPickle
 import datetime
+import tempfile
 
 from pandajedi.jediconfig import jedi_config
 
@@ -42,6 +46,55 @@ class JediTaskBuffer(TaskBuffer.TaskBuffer,CommandReceiveInterface):
             self.dateTimeForSM = timeNow
         return self.siteMapper
 
+
+
+    # get versioned snapshot of SiteMapper shared by all children.
+    # (version,None) is returned if the caller has the latest version, or (version,path to snapshot) otherwise
+    def getSiteMapperSnapshot(self,version=None):
+        # directory and prefix for snapshots
+        if hasattr(jedi_config.db,'siteMapperDir'):
+            snapshotDir = jedi_config.db.siteMapperDir
+        elif os.path.isdir('/dev/shm'):
+            snapshotDir = '/dev/shm'
+        else:
+            snapshotDir = tempfile.gettempdir()
+        prefix = 'jedi_sitemapper_{0}_{1}.'.format(os.getuid(),jedi_config.db.dbhost)
+        timeNow = datetime.datetime.utcnow()
+        # look for the latest snapshot which is still fresh
+        latestVersion = None
+        snapshotList = glob.glob(os.path.join(snapshotDir,prefix+'*'))
+        snapshotList.sort()
+        for snapshotPath in snapshotList:
+            tmpVersion = snapshotPath.split(prefix)[-1]
+            try:
+                tmpTime = datetime.datetime.strptime(tmpVersion.split('_')[0],'%Y%m%d%H%M%S')
+            except:
+                continue
+            if timeNow-tmpTime < datetime.timedelta(minutes=10):
+                latestVersion = tmpVersion
+            elif timeNow-tmpTime > datetime.timedelta(minutes=30):
+                # delete old snapshot
+                try:
+                    os.remove(snapshotPath)
+                except:
+                    pass
+        # the caller has the latest
+        if latestVersion != None and latestVersion == version:
+            return latestVersion,None
+        # publish new snapshot
+        if latestVersion == None:
+            self.siteMapper = SiteMapper(self)
+            self.dateTimeForSM = timeNow
+            latestVersion = '{0}_{1}'.format(timeNow.strftime('%Y%m%d%H%M%S'),os.getpid())
+            tmpFD,tmpPath = tempfile.mkstemp(dir=snapshotDir,prefix=prefix+'tmp_')
+            tmpFile = os.fdopen(tmpFD,'wb')
+            cPickle.dump(self.siteMapper,tmpFile,cPickle.HIGHEST_PROTOCOL)
+            tmpFile.close()
+            os.chmod(tmpPath,0444)
+            os.rename(tmpPath,os.path.join(snapshotDir,prefix+latestVersion))
+            logger.debug('published SiteMapper snapshot version={0}'.format(latestVersion))
+        return latestVersion,os.path.join(snapshotDir,prefix+latestVersion)
+
     
 
     # get work queue map
@@ -417,6 +470,19 @@ class JediTaskBuffer(TaskBuffer.TaskBuffer,CommandReceiveInterface):
 
 
 
+    # generate output files for multiple jobs in one transaction
+    def getOutputFilesBulk_JEDI(self,jediTaskID,outRequests,simul,siteDsMap=None,registerDatasets=False):
+        # get DBproxy
+        proxy = self.proxyPool.getProxy()
+        # exec
+        retVal = proxy.getOutputFilesBulk_JEDI(jediTaskID,outRequests,simul,siteDsMap,registerDatasets)
+        # release proxy
+        self.proxyPool.putProxy(proxy)
+        # return
+        return retVal
+
+
+
     # insert output file templates
     def insertOutputTemplate_JEDI(self,templates):
         # get DBproxy
@@ -932,6 +998,32 @@ class JediTaskBuffer(TaskBuffer.TaskBuffer,CommandReceiveInterface):
 
 
 
+    # reserve random seeds for multiple jobs
+    def reserveRandomSeeds_JEDI(self,jediTaskID,nSeeds,simul):
+        # get DBproxy
+        proxy = self.proxyPool.getProxy()
+        # exec
+        retVal = proxy.reserveRandomSeeds_JEDI(jediTaskID,nSeeds,simul)
+        # release proxy
+        self.proxyPool.putProxy(proxy)
+        # return
+        return retVal
+
+
+
+    # release random seeds which were reserved but not used
+    def releaseRandomSeeds_JEDI(self,jediTaskID,datasetID,fileIDs):
+        # get DBproxy
+        proxy = self.proxyPool.getProxy()
+        # exec
+        retVal = proxy.releaseRandomSeeds_JEDI(jediTaskID,datasetID,fileIDs)
+        # release proxy
+        self.proxyPool.putProxy(proxy)
+        # return
+        return retVal
+
+
+
     # get preprocess metadata
     def getPreprocessMetadata_JEDI(self,jediTaskID):
         # get DBproxy
@@ -1,3 +1,7 @@
+import mmap
+import cPickle
+import threading
+
 from pandajedi.jediconfig import jedi_config
 
 from pandajedi.jedicore import Interaction
@@ -8,6 +12,10 @@ class JediTaskBufferInterface:
     # constructor
     def __init__(self):
         self.interface = None
+        # SiteMapper loaded from snapshot
+        self.siteMapper = None
+        self.siteMapperVersion = None
+        self.siteMapperLock = threading.Lock()
 
 
     # setup interface
@@ -16,12 +24,62 @@ class JediTaskBufferInterface:
         maxSize = jedi_config.db.nWorkers
         moduleName = 'pandajedi.jedicore.JediTaskBuffer'
         className  = 'JediTaskBuffer'
+        # max size of result cache in MB
+        if hasattr(jedi_config.db,'resultCacheSize'):
+            maxCacheSize = jedi_config.db.resultCacheSize
+        else:
+            maxCacheSize = 100
+        # lanes for slow or critical methods
+        if hasattr(jedi_config.db,'lanes'):
+            laneConfig = jedi_config.db.lanes
+        else:
+            laneConfig = None
         self.interface = Interaction.CommandSendInterface(vo,maxSize,
                                                           moduleName,
-                                                          className)
+                                                          className,
+                                                          maxCacheSize,
+                                                          laneConfig)
+        # policy to retire task buffer instances
+        retirementPolicy = {}
+        for attrName,argName in [('childMaxCalls','maxCalls'),
+                                 ('childMaxMemory','maxMemory'),
+                                 ('childMaxAge','maxAge'),
+                                 ('nSpares','nSpares')]:
+            if hasattr(jedi_config.db,attrName):
+                retirementPolicy[argName] = getattr(jedi_config.db,attrName)
+        self.interface.setRetirementPolicy(**retirementPolicy)
+        # payloads larger than this size in MB are passed through shared memory
+        if hasattr(jedi_config.db,'largePayloadSize'):
+            self.interface.largePayloadSize = jedi_config.db.largePayloadSize*1024*1024
         self.interface.initialize()
         
 
+    # get SiteMapper. snapshot is loaded only when it was updated
+    def getSiteMapper(self):
+        self.siteMapperLock.acquire()
+        try:
+            try:
+                version,snapshotPath = self.interface.getSiteMapperSnapshot(self.siteMapperVersion)
+                if snapshotPath != None:
+                    snapshotFile = open(snapshotPath,'rb')
+                    try:
+                        snapshotMap = mmap.mmap(snapshotFile.fileno(),0,access=mmap.ACCESS_READ)
+                        try:
+                            self.siteMapper = cPickle.load(snapshotMap)
+                        finally:
+                            snapshotMap.close()
+                    finally:
+                        snapshotFile.close()
+                    self.siteMapperVersion = version
+            except EnvironmentError:
+                # snapshot was deleted
+                self.siteMapper = self.interface.getSiteMapper()
+                self.siteMapperVersion = None
+            return self.siteMapper
+        finally:
+            self.siteMapperLock.release()
+
+
     # method emulation
     def __getattr__(self,attrName):
         return getattr(self.interface,attrName)
@@ -141,6 +141,8 @@ class JediTaskSpec(object):
         object.__setattr__(self,'jobParamsTemplate','')
         # associated datasets
         object.__setattr__(self,'datasetSpecList',[])
+        # cache of values in splitRule
+        object.__setattr__(self,'_splitRuleMap',{})
 
 
     # override __setattr__ to collecte the changed attributes
@@ -148,6 +150,9 @@ class JediTaskSpec(object):
         oldVal = getattr(self,name)
         object.__setattr__(self,name,value)
         newVal = getattr(self,name)
+        # reset cache of splitRule. a new map is given since the old one may be shared with copies
+        if name == 'splitRule':
+            object.__setattr__(self,'_splitRuleMap',{})
         # collect changed attributes
         if oldVal != newVal or name in self._forceUpdateAttrs:
             self._changedAttrs[name] = value
@@ -216,6 +221,8 @@ class JediTaskSpec(object):
             attr= self.attributes[i]
             val = values[i]
             object.__setattr__(self,attr,val)
+        # reset cache of splitRule
+        object.__setattr__(self,'_splitRuleMap',{})
 
 
     # return column names for INSERT
@@ -256,12 +263,30 @@ class JediTaskSpec(object):
 
 
 
+    # get value of a rule in splitRule. values are cached until splitRule is changed
+    def getSplitRuleValue(self,ruleName,valuePattern='\d+'):
+        key = (ruleName,valuePattern)
+        try:
+            return self._splitRuleMap[key]
+        except KeyError:
+            pass
+        if self.splitRule == None:
+            return None
+        tmpMatch = re.search(self.splitRuleToken[ruleName]+'=('+valuePattern+')',self.splitRule)
+        if tmpMatch != None:
+            self._splitRuleMap[key] = tmpMatch.group(1)
+        else:
+            self._splitRuleMap[key] = None
+        return self._splitRuleMap[key]
+
+
+
     # get the max size per job if defined
     def getMaxSizePerJob(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['nGBPerJob']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                nGBPerJob = int(tmpMatch.group(1)) * 1024 * 1024 * 1024
+            tmpVal = self.getSplitRuleValue('nGBPerJob')
+            if tmpVal != None:
+                nGBPerJob = int(tmpVal) * 1024 * 1024 * 1024
                 return nGBPerJob
         return None    
 
@@ -270,9 +295,9 @@ class JediTaskSpec(object):
     # get the max size per merge job if defined
     def getMaxSizePerMergeJob(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['nGBPerMergeJob']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                nGBPerJob = int(tmpMatch.group(1)) * 1024 * 1024 * 1024
+            tmpVal = self.getSplitRuleValue('nGBPerMergeJob')
+            if tmpVal != None:
+                nGBPerJob = int(tmpVal) * 1024 * 1024 * 1024
                 return nGBPerJob
         return None    
 
@@ -281,9 +306,9 @@ class JediTaskSpec(object):
     # get the maxnumber of files per job if defined
     def getMaxNumFilesPerJob(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['nMaxFilesPerJob']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return int(tmpMatch.group(1))
+            tmpVal = self.getSplitRuleValue('nMaxFilesPerJob')
+            if tmpVal != None:
+                return int(tmpVal)
         return None    
 
 
@@ -291,9 +316,9 @@ class JediTaskSpec(object):
     # get the maxnumber of files per merge job if defined
     def getMaxNumFilesPerMergeJob(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['nMaxFilesPerMergeJob']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return int(tmpMatch.group(1))
+            tmpVal = self.getSplitRuleValue('nMaxFilesPerMergeJob')
+            if tmpVal != None:
+                return int(tmpVal)
         return None
 
 
@@ -301,9 +326,9 @@ class JediTaskSpec(object):
     # get the number of events per merge job if defined
     def getNumEventsPerMergeJob(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['nEventsPerMergeJob']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return int(tmpMatch.group(1))
+            tmpVal = self.getSplitRuleValue('nEventsPerMergeJob')
+            if tmpVal != None:
+                return int(tmpVal)
         return None
 
 
@@ -311,9 +336,9 @@ class JediTaskSpec(object):
     # get the max number of event ranges per job if defined
     def getMaxEventRangesPerJob(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['maxEventRangesPerJob']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return int(tmpMatch.group(1))
+            tmpVal = self.getSplitRuleValue('maxEventRangesPerJob')
+            if tmpVal != None:
+                return int(tmpVal)
         return None
 
 
@@ -321,9 +346,9 @@ class JediTaskSpec(object):
     # get the number of jumbo jobs if defined
     def getNumJumboJobs(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['nJumboJobs']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return int(tmpMatch.group(1))
+            tmpVal = self.getSplitRuleValue('nJumboJobs')
+            if tmpVal != None:
+                return int(tmpVal)
         return None
 
 
@@ -331,9 +356,9 @@ class JediTaskSpec(object):
     # get the number of sites per job
     def getNumSitesPerJob(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['nSitesPerJob']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return int(tmpMatch.group(1))
+            tmpVal = self.getSplitRuleValue('nSitesPerJob')
+            if tmpVal != None:
+                return int(tmpVal)
         return 1
 
 
@@ -341,9 +366,9 @@ class JediTaskSpec(object):
     # get the number of files per job if defined
     def getNumFilesPerJob(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['nFilesPerJob']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return int(tmpMatch.group(1))
+            tmpVal = self.getSplitRuleValue('nFilesPerJob')
+            if tmpVal != None:
+                return int(tmpVal)
         return None    
 
 
@@ -351,9 +376,9 @@ class JediTaskSpec(object):
     # get the number of files per merge job if defined
     def getNumFilesPerMergeJob(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['nFilesPerMergeJob']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return int(tmpMatch.group(1))
+            tmpVal = self.getSplitRuleValue('nFilesPerMergeJob')
+            if tmpVal != None:
+                return int(tmpVal)
         return None    
         
 
@@ -361,9 +386,9 @@ class JediTaskSpec(object):
     # get the number of events per job if defined
     def getNumEventsPerJob(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['nEventsPerJob']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return int(tmpMatch.group(1))
+            tmpVal = self.getSplitRuleValue('nEventsPerJob')
+            if tmpVal != None:
+                return int(tmpVal)
         return None    
 
 
@@ -371,9 +396,9 @@ class JediTaskSpec(object):
     # get offset for random seed
     def getRndmSeedOffset(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['randomSeed']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return int(tmpMatch.group(1))
+            tmpVal = self.getSplitRuleValue('randomSeed')
+            if tmpVal != None:
+                return int(tmpVal)
         return 0
 
 
@@ -381,9 +406,9 @@ class JediTaskSpec(object):
     # get offset for first event
     def getFirstEventOffset(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['firstEvent']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return int(tmpMatch.group(1))
+            tmpVal = self.getSplitRuleValue('firstEvent')
+            if tmpVal != None:
+                return int(tmpVal)
         return 0
 
 
@@ -391,9 +416,9 @@ class JediTaskSpec(object):
     # grouping with boundaryID
     def useGroupWithBoundaryID(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['groupBoundaryID']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                gbID = int(tmpMatch.group(1))
+            tmpVal = self.getSplitRuleValue('groupBoundaryID')
+            if tmpVal != None:
+                gbID = int(tmpVal)
                 # 1 : input - can split,    output - free
                 # 2 : input - can split,    output - mapped with provenanceID
                 # 3 : input - cannot split, output - free
@@ -425,8 +450,8 @@ class JediTaskSpec(object):
     # use build 
     def useBuild(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['useBuild']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('useBuild')
+            if tmpVal != None:
                 return True
         return False
 
@@ -435,8 +460,8 @@ class JediTaskSpec(object):
     # use sjob cloning
     def useJobCloning(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['useJobCloning']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('useJobCloning')
+            if tmpVal != None:
                 return True
         return False
 
@@ -445,9 +470,9 @@ class JediTaskSpec(object):
     # get job cloning type
     def getJobCloningType(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['useJobCloning']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return tmpMatch.group(1)
+            tmpVal = self.getSplitRuleValue('useJobCloning')
+            if tmpVal != None:
+                return tmpVal
         return ''
 
 
@@ -455,8 +480,8 @@ class JediTaskSpec(object):
     # reuse secondary on demand
     def reuseSecOnDemand(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['reuseSecOnDemand']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('reuseSecOnDemand')
+            if tmpVal != None:
                 return True
         return False
 
@@ -465,8 +490,8 @@ class JediTaskSpec(object):
     # not wait for completion of parent 
     def noWaitParent(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['noWaitParent']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('noWaitParent')
+            if tmpVal != None:
                 return True
         return False
 
@@ -486,8 +511,8 @@ class JediTaskSpec(object):
     # use only limited sites
     def useLimitedSites(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['limitedSites']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('limitedSites')
+            if tmpVal != None:
                 return True
         return False
 
@@ -508,8 +533,8 @@ class JediTaskSpec(object):
             # new
             self.splitRule = self.splitRuleToken['limitedSites']+'='+tag
         else:
-            tmpMatch = re.search(self.splitRuleToken['limitedSites']+'=(\d+)',self.splitRule)
-            if tmpMatch == None:
+            tmpVal = self.getSplitRuleValue('limitedSites')
+            if tmpVal == None:
                 # append
                 self.splitRule += ','+self.splitRuleToken['limitedSites']+'='+tag
             else:
@@ -523,8 +548,8 @@ class JediTaskSpec(object):
     # use local IO
     def useLocalIO(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['useLocalIO']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('useLocalIO')
+            if tmpVal != None:
                 return True
         return False
 
@@ -544,9 +569,9 @@ class JediTaskSpec(object):
     # get the number of events per worker for Event Service
     def getNumEventsPerWorker(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['nEventsPerWorker']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return int(tmpMatch.group(1))
+            tmpVal = self.getSplitRuleValue('nEventsPerWorker')
+            if tmpVal != None:
+                return int(tmpVal)
         return None    
 
 
@@ -555,9 +580,9 @@ class JediTaskSpec(object):
     # get the number of event service consumers
     def getNumEventServiceConsumer(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['nEsConsumers']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return int(tmpMatch.group(1))
+            tmpVal = self.getSplitRuleValue('nEsConsumers')
+            if tmpVal != None:
+                return int(tmpVal)
         return None    
 
 
@@ -565,8 +590,8 @@ class JediTaskSpec(object):
     # disable automatic retry
     def disableAutoRetry(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['disableAutoRetry']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('disableAutoRetry')
+            if tmpVal != None:
                 return True
         return False
 
@@ -575,8 +600,8 @@ class JediTaskSpec(object):
     # disable reassign
     def disableReassign(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['disableReassign']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('disableReassign')
+            if tmpVal != None:
                 return True
         return False
 
@@ -585,8 +610,8 @@ class JediTaskSpec(object):
     # allow empty input
     def allowEmptyInput(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['allowEmptyInput']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('allowEmptyInput')
+            if tmpVal != None:
                 return True
         return False
 
@@ -595,8 +620,8 @@ class JediTaskSpec(object):
     # use PFN list
     def useListPFN(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['pfnList']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('pfnList')
+            if tmpVal != None:
                 return True
         return False
 
@@ -616,8 +641,8 @@ class JediTaskSpec(object):
     # use preprocessing
     def usePrePro(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['usePrePro']+'=(\d+)',self.splitRule)
-            if tmpMatch != None and tmpMatch.group(1) == self.enum_toPreProcess:
+            tmpVal = self.getSplitRuleValue('usePrePro')
+            if tmpVal != None and tmpVal == self.enum_toPreProcess:
                 return True
         return False
 
@@ -629,8 +654,8 @@ class JediTaskSpec(object):
             # new
             self.splitRule = self.splitRuleToken['usePrePro']+'='+self.enum_preProcessed
         else:
-            tmpMatch = re.search(self.splitRuleToken['usePrePro']+'=(\d+)',self.splitRule)
-            if tmpMatch == None:
+            tmpVal = self.getSplitRuleValue('usePrePro')
+            if tmpVal == None:
                 # append
                 self.splitRule += ','+self.splitRuleToken['usePrePro']+'='+self.enum_preProcessed
             else:
@@ -645,8 +670,8 @@ class JediTaskSpec(object):
     # check preprocessed
     def checkPreProcessed(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['usePrePro']+'=(\d+)',self.splitRule)
-            if tmpMatch != None and tmpMatch.group(1) == self.enum_preProcessed:
+            tmpVal = self.getSplitRuleValue('usePrePro')
+            if tmpVal != None and tmpVal == self.enum_preProcessed:
                 return True
         return False
 
@@ -658,8 +683,8 @@ class JediTaskSpec(object):
             # new
             self.splitRule = self.splitRuleToken['usePrePro']+'='+self.enum_postPProcess
         else:
-            tmpMatch = re.search(self.splitRuleToken['usePrePro']+'=(\d+)',self.splitRule)
-            if tmpMatch == None:
+            tmpVal = self.getSplitRuleValue('usePrePro')
+            if tmpVal == None:
                 # append
                 self.splitRule += ','+self.splitRuleToken['usePrePro']+'='+self.enum_postPProcess
             else:
@@ -674,8 +699,8 @@ class JediTaskSpec(object):
     # instantiate template datasets
     def instantiateTmpl(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['instantiateTmpl']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('instantiateTmpl')
+            if tmpVal != None:
                 return True
         return False
 
@@ -684,8 +709,8 @@ class JediTaskSpec(object):
     # instantiate template datasets at site
     def instantiateTmplSite(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['instantiateTmplSite']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('instantiateTmplSite')
+            if tmpVal != None:
                 return True
         return False
 
@@ -694,8 +719,8 @@ class JediTaskSpec(object):
     # merge output
     def mergeOutput(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['mergeOutput']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('mergeOutput')
+            if tmpVal != None:
                 return True
         return False
 
@@ -704,8 +729,8 @@ class JediTaskSpec(object):
     # use random seed
     def useRandomSeed(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['randomSeed']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('randomSeed')
+            if tmpVal != None:
                 return True
         return False
 
@@ -864,8 +889,8 @@ class JediTaskSpec(object):
     # use loadXML
     def useLoadXML(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['loadXML']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('loadXML')
+            if tmpVal != None:
                 return True
         return False
 
@@ -937,11 +962,10 @@ class JediTaskSpec(object):
     # use scout
     def useScout(self,splitRule=None):
         if splitRule is None:
-            splitRule = self.splitRule
-        if splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['useScout']+'=(\d+)',splitRule)
-            if tmpMatch != None and tmpMatch.group(1) == self.enum_useScout:
-                return True
+            return self.getSplitRuleValue('useScout') == self.enum_useScout
+        tmpMatch = re.search(self.splitRuleToken['useScout']+'=(\d+)',splitRule)
+        if tmpMatch != None and tmpMatch.group(1) == self.enum_useScout:
+            return True
         return False
 
 
@@ -949,8 +973,8 @@ class JediTaskSpec(object):
     # use exhausted
     def useExhausted(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['useExhausted']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('useExhausted')
+            if tmpVal != None:
                 return True
         return False
 
@@ -959,8 +983,8 @@ class JediTaskSpec(object):
     # use real number of events
     def useRealNumEvents(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['useRealNumEvents']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('useRealNumEvents')
+            if tmpVal != None:
                 return True
         return False
 
@@ -969,8 +993,8 @@ class JediTaskSpec(object):
     # use input LFN as source for output LFN
     def useFileAsSourceLFN(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['useFileAsSourceLFN']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('useFileAsSourceLFN')
+            if tmpVal != None:
                 return True
         return False
 
@@ -979,8 +1003,8 @@ class JediTaskSpec(object):
     # post scout
     def isPostScout(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['useScout']+'=(\d+)',self.splitRule)
-            if tmpMatch != None and tmpMatch.group(1) == self.enum_postScout:
+            tmpVal = self.getSplitRuleValue('useScout')
+            if tmpVal != None and tmpVal == self.enum_postScout:
                 return True
         return False
 
@@ -989,8 +1013,8 @@ class JediTaskSpec(object):
     # wait until input shows up
     def waitInput(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['waitInput']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('waitInput')
+            if tmpVal != None:
                 return True
         return False
 
@@ -1002,8 +1026,8 @@ class JediTaskSpec(object):
             # new
             self.splitRule = self.splitRuleToken['ddmBackEnd']+'='+backEnd
         else:
-            tmpMatch = re.search(self.splitRuleToken['ddmBackEnd']+'=([^,$]+)',self.splitRule)
-            if tmpMatch == None:
+            tmpVal = self.getSplitRuleValue('ddmBackEnd','[^,$]+')
+            if tmpVal == None:
                 # append
                 self.splitRule += ','+self.splitRuleToken['ddmBackEnd']+'='+backEnd
             else:
@@ -1017,9 +1041,9 @@ class JediTaskSpec(object):
     # get DDM backend
     def getDdmBackEnd(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['ddmBackEnd']+'=([^,$]+)',self.splitRule)
-            if tmpMatch != None:
-                return tmpMatch.group(1)
+            tmpVal = self.getSplitRuleValue('ddmBackEnd','[^,$]+')
+            if tmpVal != None:
+                return tmpVal
         return None    
 
 
@@ -1028,9 +1052,9 @@ class JediTaskSpec(object):
     def getFieldNumToLFN(self):
         try:
             if self.splitRule != None:
-                tmpMatch = re.search(self.splitRuleToken['addNthFieldToLFN']+'=([,\d]+)',self.splitRule)
-                if tmpMatch != None:
-                    tmpList = tmpMatch.group(1).split(',')
+                tmpVal = self.getSplitRuleValue('addNthFieldToLFN','[,\d]+')
+                if tmpVal != None:
+                    tmpList = tmpVal.split(',')
                     try:
                         tmpList.remove('')
                     except:
@@ -1045,9 +1069,9 @@ class JediTaskSpec(object):
     # get required success rate for scout jobs
     def getScoutSuccessRate(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['scoutSuccessRate']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return int(tmpMatch.group(1))
+            tmpVal = self.getSplitRuleValue('scoutSuccessRate')
+            if tmpVal != None:
+                return int(tmpVal)
         return None    
 
 
@@ -1055,9 +1079,9 @@ class JediTaskSpec(object):
     # get T1 weight
     def getT1Weight(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['t1Weight']+'=(-*\d+)',self.splitRule)
-            if tmpMatch != None:
-                return int(tmpMatch.group(1))
+            tmpVal = self.getSplitRuleValue('t1Weight','-*\d+')
+            if tmpVal != None:
+                return int(tmpVal)
         return 0
 
 
@@ -1065,8 +1089,8 @@ class JediTaskSpec(object):
     # respect Lumiblock boundaries
     def respectLumiblock(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['respectLB']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('respectLB')
+            if tmpVal != None:
                 return True
         return False
 
@@ -1075,8 +1099,8 @@ class JediTaskSpec(object):
     # allow partial finish
     def allowPartialFinish(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['allowPartialFinish']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('allowPartialFinish')
+            if tmpVal != None:
                 return True
         return False
 
@@ -1085,8 +1109,8 @@ class JediTaskSpec(object):
     # check if datasets should be registered
     def toRegisterDatasets(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['registerDatasets']+'=(\d+)',self.splitRule)
-            if tmpMatch != None and tmpMatch.group(1) == self.enum_toRegisterDS:
+            tmpVal = self.getSplitRuleValue('registerDatasets')
+            if tmpVal != None and tmpVal == self.enum_toRegisterDS:
                 return True
         return False
 
@@ -1107,9 +1131,9 @@ class JediTaskSpec(object):
     # get the max number of attempts for ES
     def getMaxAttemptES(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['maxAttemptES']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return int(tmpMatch.group(1))
+            tmpVal = self.getSplitRuleValue('maxAttemptES')
+            if tmpVal != None:
+                return int(tmpVal)
         return None    
 
 
@@ -1141,9 +1165,9 @@ class JediTaskSpec(object):
     # get IP connectivity
     def getIpConnectivity(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['ipConnectivity']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return self.enum_ipConnectivity[tmpMatch.group(1)]
+            tmpVal = self.getSplitRuleValue('ipConnectivity')
+            if tmpVal != None:
+                return self.enum_ipConnectivity[tmpVal]
         return None
 
 
@@ -1163,8 +1187,8 @@ class JediTaskSpec(object):
     # run until input is closed
     def runUntilClosed(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['runUntilClosed']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('runUntilClosed')
+            if tmpVal != None:
                 return True
         return False
 
@@ -1173,8 +1197,8 @@ class JediTaskSpec(object):
     # stay output on site
     def stayOutputOnSite(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['stayOutputOnSite']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('stayOutputOnSite')
+            if tmpVal != None:
                 return True
         return False
 
@@ -1183,8 +1207,8 @@ class JediTaskSpec(object):
     # fail when goal unreached
     def failGoalUnreached(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['failGoalUnreached']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('failGoalUnreached')
+            if tmpVal != None:
                 return True
         return False
 
@@ -1199,8 +1223,8 @@ class JediTaskSpec(object):
     # switch ES to normal when jobs land at normal sites
     def switchEStoNormal(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['switchEStoNormal']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('switchEStoNormal')
+            if tmpVal != None:
                 return True
         return False
 
@@ -1215,8 +1239,8 @@ class JediTaskSpec(object):
     # dynamic number of events
     def dynamicNumEvents(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['dynamicNumEvents']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('dynamicNumEvents')
+            if tmpVal != None:
                 return True
         return False
 
@@ -1235,9 +1259,9 @@ class JediTaskSpec(object):
     # get alternative stage-out
     def getAltStageOut(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['altStageOut']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return self.enum_altStageOut[tmpMatch.group(1)]
+            tmpVal = self.getSplitRuleValue('altStageOut')
+            if tmpVal != None:
+                return self.enum_altStageOut[tmpVal]
         return None
 
 
@@ -1245,8 +1269,8 @@ class JediTaskSpec(object):
     # allow WAN for input access 
     def allowInputWAN(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['allowInputWAN']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('allowInputWAN')
+            if tmpVal != None:
                 return True
         return False
 
@@ -1265,9 +1289,9 @@ class JediTaskSpec(object):
     # check if LAN is used for input access 
     def allowInputLAN(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['allowInputLAN']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
-                return self.enum_inputLAN[tmpMatch.group(1)]
+            tmpVal = self.getSplitRuleValue('allowInputLAN')
+            if tmpVal != None:
+                return self.enum_inputLAN[tmpVal]
         return None
 
 
@@ -1275,8 +1299,8 @@ class JediTaskSpec(object):
     # put log files to OS
     def putLogToOS(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['putLogToOS']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('putLogToOS')
+            if tmpVal != None:
                 return True
         return False
 
@@ -1285,8 +1309,8 @@ class JediTaskSpec(object):
     # merge ES on Object Store
     def mergeEsOnOS(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['mergeEsOnOS']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('mergeEsOnOS')
+            if tmpVal != None:
                 return True
         return False
 
@@ -1295,8 +1319,8 @@ class JediTaskSpec(object):
     # write input to file
     def writeInputToFile(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['writeInputToFile']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('writeInputToFile')
+            if tmpVal != None:
                 return True
         return False
 
@@ -1305,8 +1329,8 @@ class JediTaskSpec(object):
     # ignore missing input datasets
     def ignoreMissingInDS(self):
         if self.splitRule != None:
-            tmpMatch = re.search(self.splitRuleToken['ignoreMissingInDS']+'=(\d+)',self.splitRule)
-            if tmpMatch != None:
+            tmpVal = self.getSplitRuleValue('ignoreMissingInDS')
+            if tmpVal != None:
                 return True
         return False
 
@@ -0,0 +1,109 @@
+import time
+import threading
+import collections
+import multiprocessing.managers
+
+
+# cache for results of methods called via CommandSendInterface with LRU and TTL eviction
+class ResultCache(object):
+
+    # constructor. maxSize is in bytes
+    def __init__(self,maxSize):
+        self.maxSize = maxSize
+        self.cacheMap = collections.OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        # counters
+        self.nHits = 0
+        self.nMisses = 0
+        self.nEvictions = 0
+        self.nExpired = 0
+
+
+    # remove an entry
+    def removeEntry(self,key):
+        valueStr,updateTime = self.cacheMap.pop(key)
+        self.size -= len(key)+len(valueStr)
+
+
+    # get pickled value which was updated less than timeRange sec ago. None is returned if not found
+    def get(self,key,timeRange):
+        self.lock.acquire()
+        try:
+            if not key in self.cacheMap:
+                self.nMisses += 1
+                return None
+            valueStr,updateTime = self.cacheMap[key]
+            # expired
+            if updateTime+timeRange <= time.time():
+                self.removeEntry(key)
+                self.nExpired += 1
+                self.nMisses += 1
+                return None
+            # move to the end as the most recently used
+            del self.cacheMap[key]
+            self.cacheMap[key] = (valueStr,updateTime)
+            self.nHits += 1
+            return valueStr
+        finally:
+            self.lock.release()
+
+
+    # put pickled value
+    def put(self,key,valueStr):
+        entrySize = len(key)+len(valueStr)
+        # too large to be cached
+        if entrySize > self.maxSize:
+            return
+        self.lock.acquire()
+        try:
+            if key in self.cacheMap:
+                self.removeEntry(key)
+            # evict the least recently used entries
+            while self.size+entrySize > self.maxSize and len(self.cacheMap) > 0:
+                self.removeEntry(self.cacheMap.iterkeys().next())
+                self.nEvictions += 1
+            self.cacheMap[key] = (valueStr,time.time())
+            self.size += entrySize
+        finally:
+            self.lock.release()
+
+
+    # get statistics
+    def getStats(self):
+        self.lock.acquire()
+        try:
+            return {'hits':self.nHits,
+                    'misses':self.nMisses,
+                    'evictions':self.nEvictions,
+                    'expired':self.nExpired,
+                    'entries':len(self.cacheMap),
+                    'size':self.size,
+                    'maxSize':self.maxSize}
+        finally:
+            self.lock.release()
+
+
+
+# cache instance in the manager process
+_sharedCache = None
+_sharedCacheLock = threading.Lock()
+
+# get the cache shared by all clients of the manager
+def getSharedCache(maxSize):
+    global _sharedCache
+    _sharedCacheLock.acquire()
+    try:
+        if _sharedCache == None:
+            _sharedCache = ResultCache(maxSize)
+        return _sharedCache
+    finally:
+        _sharedCacheLock.release()
+
+
+
+# manager to share the cache among child processes
+class ResultCacheManager(multiprocessing.managers.BaseManager):
+    pass
+
+ResultCacheManager.register('getSharedCache',callable=getSharedCache)
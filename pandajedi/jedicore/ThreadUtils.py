@@ -4,12 +4,15 @@ import threading
 import multiprocessing
 
 
-# list with lock
+# list with lock. items can be fed while other threads get them if feeding=True
 class ListWithLock:
-    def __init__(self,dataList):
+    def __init__(self,dataList,feeding=False):
         self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
         self.dataList  = dataList
         self.dataIndex = 0
+        self.isFeeding = feeding
+        self.feedError = None
 
     def __iter__(self):
         return self
@@ -39,6 +42,9 @@ class ListWithLock:
 
     def get(self,num):
         self.lock.acquire()
+        # wait until items are fed
+        while self.isFeeding and len(self.dataList) <= self.dataIndex:
+            self.cond.wait()
         retList = self.dataList[self.dataIndex:self.dataIndex+num]
         self.dataIndex += len(retList)
         self.lock.release()
@@ -65,6 +71,40 @@ class ListWithLock:
             ret = 'None'
         self.lock.release()
         return ret
+
+    # add items while feeding
+    def extend(self,items):
+        self.lock.acquire()
+        self.dataList.extend(items)
+        self.cond.notifyAll()
+        self.lock.release()
+
+    # finish feeding
+    def close(self):
+        self.lock.acquire()
+        self.isFeeding = False
+        self.cond.notifyAll()
+        self.lock.release()
+
+    # wait until some items are fed or feeding is finished
+    def waitForData(self):
+        self.lock.acquire()
+        while self.isFeeding and len(self.dataList) <= self.dataIndex:
+            self.cond.wait()
+        self.lock.release()
+
+    # feed chunks of items from an iterator in a thread
+    def feedInThread(self,chunkIterator):
+        def feed():
+            try:
+                for chunk in chunkIterator:
+                    self.extend(chunk)
+            except:
+                self.feedError = sys.exc_info()[:2]
+            self.close()
+        thr = threading.Thread(target=feed)
+        thr.daemon = True
+        thr.start()
         
 
 
@@ -108,6 +148,41 @@ class MapWithLock:
 
 
 
+# budget of worker threads shared by multiple thread pools
+class WorkerBudget:
+    def __init__(self,nTotal):
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.nTotal = nTotal
+        self.nUsed = 0
+
+    # get slots. capped at the total number of slots and blocked until they become available
+    def acquire(self,num):
+        num = min(num,self.nTotal)
+        self.cond.acquire()
+        try:
+            while self.nUsed+num > self.nTotal:
+                self.cond.wait()
+            self.nUsed += num
+            return num
+        finally:
+            self.cond.release()
+
+    # release slots
+    def release(self,num):
+        self.cond.acquire()
+        try:
+            self.nUsed -= num
+            self.cond.notifyAll()
+        finally:
+            self.cond.release()
+
+    # dump contents
+    def dump(self):
+        return 'nUsed={0} nTotal={1}'.format(self.nUsed,self.nTotal)
+
+
+
 # thread pool
 class ThreadPool:
     def __init__(self):
@@ -190,6 +265,303 @@ class WorkerThread (threading.Thread):
             
 
 
+# items processed by workers of WorkerPool in one call
+class WorkerPoolTask:
+    def __init__(self,itemList):
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.itemList = itemList
+        # the number of workers dispatched and not finished
+        self.nRunning = 0
+        # the number of workers to be retired
+        self.nRetire = 0
+        # the number of items each worker gets at once
+        self.chunkSize = 1
+        # item lists of running workers
+        self.workerItemLists = []
+
+    # get items for a worker. None is returned to retire the worker
+    def getItems(self,num):
+        self.lock.acquire()
+        try:
+            self.chunkSize = max(num,1)
+            if self.nRetire > 0:
+                self.nRetire -= 1
+                return None
+        finally:
+            self.lock.release()
+        return self.itemList.get(num)
+
+    # add worker
+    def addWorker(self,workerItemList):
+        self.lock.acquire()
+        self.nRunning += 1
+        self.workerItemLists.append(workerItemList)
+        self.lock.release()
+
+    # finish worker
+    def finishWorker(self,workerItemList):
+        self.lock.acquire()
+        self.nRunning -= 1
+        self.workerItemLists.remove(workerItemList)
+        self.cond.notifyAll()
+        self.lock.release()
+
+    # get items which running workers got last
+    def getItemsInHand(self):
+        self.lock.acquire()
+        ret = [workerItemList.lastItems for workerItemList in self.workerItemLists]
+        self.lock.release()
+        return ret
+
+    # retire workers
+    def retireWorkers(self,num):
+        self.lock.acquire()
+        self.nRetire += num
+        self.lock.release()
+
+    # retire all workers once they finish items in hand
+    def retireAll(self):
+        self.lock.acquire()
+        self.nRetire = self.nRunning
+        self.lock.release()
+
+    # get the number of active workers which are not to be retired
+    def getNumActive(self):
+        self.lock.acquire()
+        ret = self.nRunning-self.nRetire
+        self.lock.release()
+        return ret
+
+    # wait until all workers are finished or the interval passes
+    def wait(self,interval):
+        self.lock.acquire()
+        try:
+            if self.nRunning > 0:
+                self.cond.wait(interval)
+            return self.nRunning == 0
+        finally:
+            self.lock.release()
+
+
+
+# list given to each worker of WorkerPool instead of the list of items
+class WorkerItemList:
+    def __init__(self,task):
+        self.task = task
+        self.retired = False
+        self.lastItems = []
+
+    def get(self,num):
+        if self.retired:
+            return []
+        retList = self.task.getItems(num)
+        if retList == None:
+            self.retired = True
+            retList = []
+        self.lastItems = retList
+        return retList
+
+    def __getattr__(self,name):
+        return getattr(self.task.itemList,name)
+
+
+
+# long-lived pool of worker threads. the number of workers is adjusted between minWorkers and maxWorkers
+# based on the number of remaining items and availability of RPC children
+class WorkerPool:
+    def __init__(self,minWorkers,maxWorkers,logger,nInitial=None,childCounter=None,
+                 idleTimeout=300,interval=1):
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.minWorkers = max(minWorkers,1)
+        self.maxWorkers = max(maxWorkers,self.minWorkers)
+        if nInitial == None:
+            nInitial = self.minWorkers
+        self.nInitial = nInitial
+        self.logger = logger
+        # function to get the number of idle RPC children
+        self.childCounter = childCounter
+        self.idleTimeout = idleTimeout
+        self.interval = interval
+        self.bodyQueue = []
+        self.nThreads = 0
+        self.nBusy = 0
+        self.nIdle = 0
+        # thread-seconds for utilisation
+        self.busyTime = 0
+        self.aliveTime = 0
+        self.lastUpdate = time.time()
+
+    # update thread-seconds. must be called with lock
+    def updateUsage(self):
+        timeNow = time.time()
+        timeDelta = timeNow-self.lastUpdate
+        self.busyTime += self.nBusy*timeDelta
+        self.aliveTime += self.nThreads*timeDelta
+        self.lastUpdate = timeNow
+
+    # main loop of threads
+    def runThread(self):
+        self.cond.acquire()
+        try:
+            while True:
+                # wait for body
+                waitStart = time.time()
+                while len(self.bodyQueue) == 0:
+                    self.nIdle += 1
+                    self.cond.wait(self.idleTimeout)
+                    self.nIdle -= 1
+                    # terminate since idle for long time
+                    if len(self.bodyQueue) == 0 and time.time()-waitStart >= self.idleTimeout \
+                            and self.nThreads > self.minWorkers:
+                        self.updateUsage()
+                        self.nThreads -= 1
+                        return
+                body = self.bodyQueue.pop(0)
+                self.updateUsage()
+                self.nBusy += 1
+                self.cond.release()
+                try:
+                    body()
+                except:
+                    errtype,errvalue = sys.exc_info()[:2]
+                    self.logger.error("body crashed in WorkerPool.runThread() with %s:%s" % \
+                                      (errtype.__name__,errvalue))
+                self.cond.acquire()
+                self.updateUsage()
+                self.nBusy -= 1
+        finally:
+            self.cond.release()
+
+    # submit body. a new thread is started if no thread is idle
+    def submit(self,body):
+        self.cond.acquire()
+        try:
+            self.bodyQueue.append(body)
+            if self.nIdle < len(self.bodyQueue) and self.nThreads < self.maxWorkers:
+                self.updateUsage()
+                self.nThreads += 1
+                thr = threading.Thread(target=self.runThread)
+                thr.daemon = True
+                thr.start()
+            self.cond.notify()
+        finally:
+            self.cond.release()
+
+    # check if a body can run without waiting
+    def hasCapacity(self):
+        self.cond.acquire()
+        try:
+            return self.nIdle > len(self.bodyQueue) or self.nThreads < self.maxWorkers
+        finally:
+            self.cond.release()
+
+    # dispatch a worker
+    def dispatch(self,task,workerClass,argList):
+        workerItemList = WorkerItemList(task)
+        worker = workerClass(workerItemList,*argList)
+        task.addWorker(workerItemList)
+        def body():
+            try:
+                worker.run()
+            finally:
+                task.finishWorker(workerItemList)
+        self.submit(body)
+
+    # get the number of idle RPC children
+    def getNumIdleChildren(self):
+        if self.childCounter == None:
+            return None
+        try:
+            return self.childCounter()
+        except:
+            return None
+
+    # get the target number of workers for a task
+    def getTargetSize(self,task,maxWorkers):
+        nActive = task.getNumActive()
+        nTarget = nActive
+        total,index = task.itemList.stat()
+        nRemaining = total-index
+        # more items than active workers take at once
+        if nRemaining > nActive*task.chunkSize and self.hasCapacity():
+            nIdleChildren = self.getNumIdleChildren()
+            if nIdleChildren == None or nIdleChildren > 0:
+                nTarget += 1
+        return max(min(nTarget,maxWorkers),min(self.minWorkers,maxWorkers),1)
+
+    # process items with workers which are instances of workerClass(itemList,*argList) with run().
+    # workers stop taking new items after timeout, and this method waits for them to finish items
+    # in hand up to graceTime sec, which is the same as timeout by default. False is returned if
+    # some workers are still running
+    def process(self,itemList,workerClass,argList,timeout=None,maxWorkers=None,graceTime=None):
+        if maxWorkers == None or maxWorkers > self.maxWorkers:
+            maxWorkers = self.maxWorkers
+        task = WorkerPoolTask(itemList)
+        for iWorker in range(min(self.nInitial,maxWorkers)):
+            self.dispatch(task,workerClass,argList)
+        startTime = time.time()
+        while not task.wait(self.interval):
+            if timeout != None and time.time()-startTime > timeout:
+                self.logger.warning("timeout in WorkerPool.process(). waiting for %s workers to finish items in hand" % \
+                                    task.getNumActive())
+                task.retireAll()
+                if graceTime == None:
+                    graceTime = timeout
+                graceStart = time.time()
+                while not task.wait(self.interval):
+                    if time.time()-graceStart > graceTime:
+                        itemsInHand = task.getItemsInHand()
+                        self.logger.error("WorkerPool.process() gave up waiting for %s workers stuck with %s" % \
+                                          (len(itemsInHand),str(itemsInHand)[:1024]))
+                        return False
+                break
+            nActive = task.getNumActive()
+            nTarget = self.getTargetSize(task,maxWorkers)
+            if nTarget > nActive:
+                for iWorker in range(nTarget-nActive):
+                    self.dispatch(task,workerClass,argList)
+            elif nTarget < nActive:
+                task.retireWorkers(nActive-nTarget)
+        return True
+
+    # get the number of threads
+    def getSize(self):
+        return self.nThreads
+
+    # get the fraction of time when threads were busy
+    def getUtilisation(self,reset=False):
+        self.cond.acquire()
+        try:
+            self.updateUsage()
+            if self.aliveTime > 0:
+                ret = float(self.busyTime)/self.aliveTime
+            else:
+                ret = 0.
+            if reset:
+                self.busyTime = 0
+                self.aliveTime = 0
+            return ret
+        finally:
+            self.cond.release()
+
+    # wait until all bodies are done
+    def join(self,timeOut=None):
+        startTime = time.time()
+        while self.nBusy > 0 or len(self.bodyQueue) > 0:
+            if timeOut != None and time.time()-startTime > timeOut:
+                break
+            time.sleep(1)
+
+    # dump contents
+    def dump(self):
+        return 'nThreads={0} nBusy={1} nQueued={2} utilisation={3:.2f}'.format(self.nThreads,self.nBusy,
+                                                                              len(self.bodyQueue),
+                                                                              self.getUtilisation(True))
+
+
+
 # thread class to cleanup zombi processes
 class ZombiCleaner (threading.Thread):
 
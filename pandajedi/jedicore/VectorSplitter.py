@@ -0,0 +1,273 @@
+import copy
+import bisect
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import JediCoreUtils
+
+
+# the minimum number of unused files to use the vectorized splitter
+minNumFiles = 100
+
+# default output size 2G + 500MB (safety merging), the same as in InputChunk.getSubChunk
+minOutSize = 2500 * 1024 * 1024
+
+# default max size when neither nFilesPerJob nor nEventsPerJob is used
+defaultMaxSize = 20 * 1024 * 1024 * 1024
+
+
+# get vectorized splitter for homogeneous input chunk. None is returned if the chunk is not applicable
+def getSplitter(inputChunk,maxNumFiles=None,sizeGradients=0,sizeIntercepts=0,
+                nFilesPerJob=None,walltimeGradient=0,nEventsPerJob=None,useBoundary=None,
+                sizeGradientsPerInSize=None,maxOutSize=None,respectLB=False,dynNumEvents=False,
+                maxNumEventRanges=None,multiplicity=None,splitByFields=None):
+    # numpy is optional. InputChunk.getSubChunk is used without it
+    if numpy == None:
+        return None
+    # only file-level splitting without boundaries, fields, secondaries and distributed datasets
+    if inputChunk.isMerging or inputChunk.masterDataset == None or inputChunk.secondaryDatasetList != []:
+        return None
+    if useBoundary != None or respectLB or dynNumEvents or splitByFields != None \
+            or sizeGradientsPerInSize != None or maxOutSize != None:
+        return None
+    datasetSpec = inputChunk.masterDataset
+    if datasetSpec.isDistributed() or datasetSpec.isRepeated():
+        return None
+    datasetUsage = inputChunk.datasetMap[datasetSpec.datasetID]
+    if len(datasetSpec.Files) - datasetUsage['used'] < minNumFiles:
+        return None
+    try:
+        return VectorSplitter(inputChunk,maxNumFiles,sizeGradients,sizeIntercepts,nFilesPerJob,
+                              walltimeGradient,nEventsPerJob,maxNumEventRanges,multiplicity)
+    except NotApplicable:
+        return None
+
+
+
+# exception when the chunk cannot be split with cumulative sums
+class NotApplicable (Exception):
+    pass
+
+
+
+# splitter to get subchunks with cumulative sums of file attributes instead of the per-file loop.
+# results are identical to InputChunk.getSubChunk
+class VectorSplitter:
+
+    # constructor
+    def __init__(self,inputChunk,maxNumFiles,sizeGradients,sizeIntercepts,nFilesPerJob,
+                 walltimeGradient,nEventsPerJob,maxNumEventRanges,multiplicity):
+        self.inputChunk = inputChunk
+        self.datasetSpec = inputChunk.masterDataset
+        self.taskSpec = inputChunk.taskSpec
+        # parameters to fall back to InputChunk.getSubChunk
+        self.splitParams = {'maxNumFiles':maxNumFiles,
+                            'sizeGradients':sizeGradients,
+                            'sizeIntercepts':sizeIntercepts,
+                            'nFilesPerJob':nFilesPerJob,
+                            'walltimeGradient':walltimeGradient,
+                            'nEventsPerJob':nEventsPerJob,
+                            'maxNumEventRanges':maxNumEventRanges,
+                            'multiplicity':multiplicity}
+        # protection against unreasonable values
+        if nFilesPerJob == 0:
+            nFilesPerJob = None
+        if nEventsPerJob == 0:
+            nEventsPerJob = None
+        if maxNumFiles == None:
+            maxNumFiles = 20
+        if walltimeGradient < 0:
+            walltimeGradient = 0
+        if nFilesPerJob != None:
+            maxNumFiles = nFilesPerJob
+        # integers are required to compare cumulative sums exactly
+        if not isinstance(sizeIntercepts,(int,long)):
+            raise NotApplicable
+        self.nFilesPerJob = nFilesPerJob
+        self.nEventsPerJob = nEventsPerJob
+        self.maxNumFiles = maxNumFiles
+        self.sizeIntercepts = sizeIntercepts
+        self.walltimeGradient = walltimeGradient
+        self.multiplicity = multiplicity
+        self.nFiles = len(self.datasetSpec.Files)
+        # sizes and output sizes
+        sizeList = []
+        outSizeList = []
+        eventList = []
+        nextStartList = []
+        for tmpFileSpec in self.datasetSpec.Files:
+            if tmpFileSpec.fsize == None:
+                raise NotApplicable
+            effectiveFsize = JediCoreUtils.getEffectiveFileSize(tmpFileSpec.fsize,tmpFileSpec.startEvent,
+                                                                tmpFileSpec.endEvent,tmpFileSpec.nEvents)
+            if self.taskSpec.outputScaleWithEvents():
+                effectiveNumEvents = tmpFileSpec.getEffectiveNumEvents()
+                sizeList.append(long(tmpFileSpec.fsize + sizeGradients * effectiveNumEvents))
+                outSizeList.append(long(sizeGradients * effectiveNumEvents))
+            else:
+                sizeList.append(long(tmpFileSpec.fsize + sizeGradients * effectiveFsize))
+                outSizeList.append(long(sizeGradients * effectiveFsize))
+            # events are counted only with event ranges
+            if nEventsPerJob != None:
+                if tmpFileSpec.startEvent == None or tmpFileSpec.endEvent == None:
+                    raise NotApplicable
+                eventList.append(tmpFileSpec.endEvent - tmpFileSpec.startEvent + 1)
+                nextStartEvent = tmpFileSpec.endEvent + 1
+                if nextStartEvent == tmpFileSpec.nEvents:
+                    nextStartEvent = 0
+                nextStartList.append(nextStartEvent)
+        self.sizeSums = self.makeCumulativeSums(sizeList)
+        self.outSizeSums = self.makeCumulativeSums(outSizeList)
+        self.inSizeSums = [tmpSize - tmpOutSize for tmpSize,tmpOutSize in zip(self.sizeSums,self.outSizeSums)]
+        if numpy.any(numpy.diff(self.inSizeSums) < 0):
+            raise NotApplicable
+        if nEventsPerJob != None:
+            self.eventSums = self.makeCumulativeSums(eventList)
+            # indexes of files which don't start from the next event of the previous file
+            startList = [tmpFileSpec.startEvent for tmpFileSpec in self.datasetSpec.Files]
+            self.eventJumps = (numpy.flatnonzero(numpy.array(nextStartList[:-1]) != numpy.array(startList[1:])) + 1).tolist()
+        # cumulative walltime per set of site parameters
+        self.walltimeSumsMap = {}
+        # locality of files per site
+        self.localityMap = {}
+
+
+
+    # make cumulative sums starting with 0. converted to list since bisect is faster than numpy for scalar lookup
+    def makeCumulativeSums(self,valueList):
+        # non-negative values are required for monotonic sums, and the total must fit in int64
+        if len(valueList) > 0 and (min(valueList) < 0 or sum(valueList) >= 2**62):
+            raise NotApplicable
+        sums = numpy.zeros(len(valueList)+1,dtype=numpy.int64)
+        numpy.cumsum(valueList,out=sums[1:])
+        return sums.tolist()
+
+
+
+    # get cumulative walltime for a site
+    def getWalltimeSums(self,coreCount,corePower):
+        key = (coreCount,corePower)
+        if not key in self.walltimeSumsMap:
+            walltimeList = []
+            for tmpFileSpec in self.datasetSpec.Files:
+                if self.taskSpec.useHS06():
+                    effectiveNumEvents = tmpFileSpec.getEffectiveNumEvents()
+                    tmpExpWalltime = self.walltimeGradient * effectiveNumEvents / float(coreCount)
+                    if not corePower in [None,0]:
+                        tmpExpWalltime /= corePower
+                    if self.taskSpec.cpuEfficiency == 0:
+                        tmpExpWalltime = 0
+                    else:
+                        tmpExpWalltime /= float(self.taskSpec.cpuEfficiency)/100.0
+                else:
+                    effectiveFsize = JediCoreUtils.getEffectiveFileSize(tmpFileSpec.fsize,tmpFileSpec.startEvent,
+                                                                        tmpFileSpec.endEvent,tmpFileSpec.nEvents)
+                    tmpExpWalltime = self.walltimeGradient * effectiveFsize / float(coreCount)
+                if self.multiplicity != None:
+                    tmpExpWalltime /= float(self.multiplicity)
+                walltimeList.append(long(tmpExpWalltime))
+            self.walltimeSumsMap[key] = self.makeCumulativeSums(walltimeList)
+        return self.walltimeSumsMap[key]
+
+
+
+    # get locality of a file with a map instead of scanning file lists of the site candidate for each file.
+    # the same as SiteCandidate.getFileLocality
+    def getFileLocality(self,siteCandidate,fileSpec):
+        if not siteCandidate.siteName in self.localityMap:
+            tmpMap = {}
+            # lists with higher priority are filled later to overwrite
+            for locality,fileList in [('remote',siteCandidate.remoteFiles),
+                                      ('cache',siteCandidate.cacheFiles),
+                                      ('localtape',siteCandidate.localTapeFiles),
+                                      ('localdisk',siteCandidate.localDiskFiles)]:
+                for tmpFileSpec in fileList:
+                    tmpMap[tmpFileSpec.fileID] = locality
+            self.localityMap[siteCandidate.siteName] = tmpMap
+        return self.localityMap[siteCandidate.siteName].get(fileSpec.fileID)
+
+
+
+    # get the index of the first file which exceeds the limit when files from startIdx are used.
+    # the file at startIdx is always used
+    def getLimitIndex(self,sums,startIdx,limit):
+        idx = bisect.bisect_right(sums,limit+sums[startIdx]) - 1
+        return max(idx,startIdx+1)
+
+
+
+    # get subchunk. the same as InputChunk.getSubChunk with parameters given to the constructor
+    def getSubChunk(self,siteName,maxSize=None,maxWalltime=0,coreCount=1,corePower=None,tmpLog=None):
+        datasetUsage = self.inputChunk.datasetMap[self.datasetSpec.datasetID]
+        startIdx = datasetUsage['used']
+        # no unused files
+        if startIdx >= self.nFiles:
+            return None
+        # set default max size
+        if maxSize == None and self.nFilesPerJob == None and self.nEventsPerJob == None:
+            maxSize = defaultMaxSize
+        # use the per-file loop if limits cannot be compared with integers
+        try:
+            endIdx = self.getEndIndex(startIdx,maxSize,maxWalltime,coreCount,corePower)
+        except NotApplicable:
+            return self.inputChunk.getSubChunk(siteName,maxSize=maxSize,maxWalltime=maxWalltime,
+                                               coreCount=coreCount,corePower=corePower,tmpLog=tmpLog,
+                                               **self.splitParams)
+        # make copy to individually set locality
+        siteCandidate = self.inputChunk.siteCandidates[siteName]
+        fileList = []
+        for tmpFileSpec in self.datasetSpec.Files[startIdx:endIdx]:
+            newFileSpec = copy.copy(tmpFileSpec)
+            newFileSpec.locality = self.getFileLocality(siteCandidate,tmpFileSpec)
+            if newFileSpec.locality == 'remote':
+                newFileSpec.sourceName = siteCandidate.remoteSource
+            fileList.append(newFileSpec)
+        datasetUsage['used'] = endIdx
+        return [(self.datasetSpec,fileList)]
+
+
+
+    # get the index next to the last file of the subchunk starting from startIdx
+    def getEndIndex(self,startIdx,maxSize,maxWalltime,coreCount,corePower):
+        # no file is used with negative limits
+        if (maxSize != None and maxSize < 0) or self.maxNumFiles < 0:
+            raise NotApplicable
+        endIdx = self.nFiles
+        if self.nFilesPerJob != None:
+            # files are used as multiplicand
+            endIdx = min(endIdx,startIdx+self.nFilesPerJob)
+        else:
+            # the number of files
+            endIdx = min(endIdx,startIdx+max(self.maxNumFiles,1))
+            # size
+            if maxSize != None:
+                if not isinstance(maxSize,(int,long)) or maxSize >= 2**62:
+                    raise NotApplicable
+                endIdx = min(endIdx,self.getLimitIndex(self.sizeSums,startIdx,maxSize-self.sizeIntercepts))
+                # too small output compared to input
+                tmpIdx = self.getLimitIndex(self.inSizeSums,startIdx,maxSize-minOutSize-self.sizeIntercepts)
+                if tmpIdx < endIdx and self.outSizeSums[tmpIdx+1]-self.outSizeSums[startIdx] < minOutSize:
+                    endIdx = tmpIdx
+            # walltime
+            if maxWalltime > 0:
+                if self.taskSpec.useHS06():
+                    baseWalltime = self.taskSpec.baseWalltime
+                else:
+                    baseWalltime = 0
+                if not isinstance(maxWalltime,(int,long)) or not isinstance(baseWalltime,(int,long)) \
+                        or maxWalltime >= 2**62:
+                    raise NotApplicable
+                endIdx = min(endIdx,self.getLimitIndex(self.getWalltimeSums(coreCount,corePower),startIdx,
+                                                       maxWalltime-baseWalltime))
+            # events
+            if self.nEventsPerJob != None:
+                endIdx = min(endIdx,self.getLimitIndex(self.eventSums,startIdx,self.nEventsPerJob))
+        # continuity of events
+        if self.nEventsPerJob != None:
+            tmpIdx = bisect.bisect_right(self.eventJumps,startIdx)
+            if tmpIdx < len(self.eventJumps):
+                endIdx = min(endIdx,self.eventJumps[tmpIdx])
+        return endIdx
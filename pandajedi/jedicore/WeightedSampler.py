@@ -0,0 +1,91 @@
+import random
+
+
+# weighted random sampling over a fixed list of items using a segment tree of weight sums.
+# draw, weight update, and exclusion of a few items take O(log n) each. Each node is
+# recomputed from its children rather than shifted by deltas, so that the tree doesn't
+# accumulate errors of float and becomes exactly zero when all remaining weights are zero
+class WeightedSampler(object):
+
+    # constructor. items and weights are in the same order
+    def __init__(self,itemList,weightList):
+        self.itemList = list(itemList)
+        self.weightList = list(weightList)
+        # the number of leaves is a power of 2
+        self.nLeaves = 1
+        while self.nLeaves < len(self.itemList):
+            self.nLeaves *= 2
+        self.tree = [0] * (2*self.nLeaves)
+        for idx,weight in enumerate(self.weightList):
+            self.tree[self.nLeaves+idx] = weight
+        for pos in range(self.nLeaves-1,0,-1):
+            self.tree[pos] = self.tree[2*pos] + self.tree[2*pos+1]
+
+
+    # the number of items
+    def __len__(self):
+        return len(self.itemList)
+
+
+    # set weight of the leaf for the item at idx and recompute its ancestors
+    def setLeaf(self,idx,weight):
+        pos = self.nLeaves + idx
+        self.tree[pos] = weight
+        pos /= 2
+        while pos > 0:
+            self.tree[pos] = self.tree[2*pos] + self.tree[2*pos+1]
+            pos /= 2
+
+
+    # set weight of the item at idx
+    def update(self,idx,weight):
+        self.weightList[idx] = weight
+        self.setLeaf(idx,weight)
+
+
+    # total weight
+    def getTotalWeight(self):
+        return self.tree[1]
+
+
+    # index of the first item where the cumulative weight reaches value. len(self) if not found
+    def findIndex(self,value):
+        pos = 1
+        while pos < self.nLeaves:
+            if self.tree[2*pos] >= value:
+                pos = 2*pos
+            else:
+                value -= self.tree[2*pos]
+                pos = 2*pos+1
+        # not found
+        if self.tree[pos] < value:
+            return len(self.itemList)
+        return pos - self.nLeaves
+
+
+    # draw one item with probability proportional to weight, skipping items at ngIndexes.
+    # gives the same result as subtracting weights in order from random.random()*totalWeight
+    # until it becomes non-positive, with random.choice as a protection against precision of float
+    def draw(self,ngIndexes=None):
+        if ngIndexes == None:
+            ngIndexes = set()
+        if len(ngIndexes) >= len(self.itemList):
+            return None
+        # exclude NG items temporarily
+        for idx in ngIndexes:
+            self.setLeaf(idx,0)
+        try:
+            # get random number
+            rNumber = random.random() * self.getTotalWeight()
+            idx = self.findIndex(rNumber)
+            # the first item is taken for zero, which may be excluded
+            while idx in ngIndexes:
+                idx += 1
+            if idx < len(self.itemList):
+                return idx
+            # return something as a protection against precision of float
+            okIndexes = [tmpIdx for tmpIdx in range(len(self.itemList)) if not tmpIdx in ngIndexes]
+            return random.choice(okIndexes)
+        finally:
+            for idx in ngIndexes:
+                self.setLeaf(idx,self.weightList[idx])
@@ -37,6 +37,8 @@ class ContentsFeeder (JediKnight):
     def start(self):
         # start base class
         JediKnight.start(self)
+        # long-lived pool of workers
+        workerPool = self.makeWorkerPool(jedi_config.confeeder)
         # go into main loop
         while True:
             startTime = datetime.datetime.utcnow()
@@ -56,15 +58,10 @@ class ContentsFeeder (JediKnight):
                             dsList = ListWithLock(tmpList)
                             # make thread pool
                             threadPool = ThreadPool() 
-                            # make workers
-                            nWorker = jedi_config.confeeder.nWorkers
-                            for iWorker in range(nWorker):
-                                thr = ContentsFeederThread(dsList,threadPool,
-                                                           self.taskBufferIF,self.ddmIF,
-                                                           self.pid)
-                                thr.start()
-                            # join
-                            threadPool.join()
+                            # run workers in the pool
+                            workerPool.process(dsList,ContentsFeederThread,
+                                               (threadPool,self.taskBufferIF,self.ddmIF,self.pid))
+                            logger.debug('worker pool : %s' % workerPool.dump())
             except:
                 errtype,errvalue = sys.exc_info()[:2]
                 logger.error('failed in %s.start() with %s %s' % (self.__class__.__name__,errtype.__name__,errvalue))
@@ -1,9 +1,12 @@
+import os
 import sys
 import time
 import random
 
+from pandajedi.jediconfig import jedi_config
 from pandajedi.jedicore import Interaction
-from pandajedi.jedicore.ThreadUtils import ZombiCleaner
+from pandajedi.jedicore.ThreadUtils import ZombiCleaner,WorkerPool
+from pandajedi.jedicore.InteractionStats import StatsDumper
 
 
 class JediKnight (Interaction.CommandReceiveInterface):
@@ -15,6 +18,15 @@ class JediKnight (Interaction.CommandReceiveInterface):
         self.logger       = logger 
         # start zombi cleaner
         ZombiCleaner().start()
+        # dump statistics of interaction with task buffer and DDM
+        if hasattr(jedi_config.master,'ipcStatsDir'):
+            if hasattr(jedi_config.master,'ipcStatsInterval'):
+                statsInterval = jedi_config.master.ipcStatsInterval
+            else:
+                statsInterval = 600
+            statsFile = os.path.join(jedi_config.master.ipcStatsDir,
+                                     'ipc_stats_{0}_{1}.jsonl'.format(self.__class__.__name__,os.getpid()))
+            StatsDumper(statsFile,self.__class__.__name__,statsInterval).start()
 
 
     # start communication channel in a thread
@@ -44,6 +56,27 @@ class JediKnight (Interaction.CommandReceiveInterface):
             return [par]
 
 
+    # make pool of workers. the number of workers is adjusted between minWorkers and maxWorkers
+    # if they are defined in the config section, otherwise fixed to nWorkers
+    def makeWorkerPool(self,configSection):
+        nWorkers = configSection.nWorkers
+        if hasattr(configSection,'minWorkers'):
+            minWorkers = configSection.minWorkers
+        else:
+            minWorkers = nWorkers
+        if hasattr(configSection,'maxWorkers'):
+            maxWorkers = configSection.maxWorkers
+        else:
+            maxWorkers = nWorkers
+        return WorkerPool(minWorkers,maxWorkers,self.logger,nWorkers,
+                          childCounter=self.getNumIdleChildren)
+
+
+    # get the number of idle task buffer instances
+    def getNumIdleChildren(self):
+        return self.taskBufferIF.getNumIdleChildren()
+
+
     # sleep to avoid synchronization of loop
     def randomSleep(self,minVal=0,maxVal=30):
         time.sleep(random.randint(minVal,maxVal))
@@ -15,31 +15,39 @@ class JobBroker (FactoryBase):
                              jedi_config.jobbroker.modConfig)
 
 
-    # main
-    def doBrokerage(self,taskSpec,cloudName,inputChunk,taskParamMap):
-        return self.getImpl(taskSpec.vo,taskSpec.prodSourceLabel).doBrokerage(taskSpec,cloudName,
-                                                                              inputChunk,taskParamMap)
+    # main. liveCounter and lockIDs are given per task since the implementation may be shared
+    def doBrokerage(self,taskSpec,cloudName,inputChunk,taskParamMap,liveCounter=None,lockIDs=None):
+        return self.getImpl(taskSpec.vo,taskSpec.prodSourceLabel,doRefresh=False).doBrokerage(taskSpec,cloudName,
+                                                                                              inputChunk,taskParamMap,
+                                                                                              liveCounter=liveCounter,
+                                                                                              lockIDs=lockIDs)
 
 
     # set live counter
     def setLiveCounter(self,vo,sourceLabel,liveCounter):
-        self.getImpl(vo,sourceLabel).setLiveCounter(liveCounter)
+        self.getImpl(vo,sourceLabel,doRefresh=False).setLiveCounter(liveCounter)
 
 
 
     # set lock ID
     def setLockID(self,vo,sourceLabel,pid,tid):
-        self.getImpl(vo,sourceLabel).setLockID(pid,tid)
+        self.getImpl(vo,sourceLabel,doRefresh=False).setLockID(pid,tid)
+
+
+
+    # make lock IDs to be given to doBrokerage
+    def makeLockIDs(self,vo,sourceLabel,pid,tid):
+        return self.getImpl(vo,sourceLabel,doRefresh=False).makeLockIDs(pid,tid)
 
 
 
     # get base lock ID
-    def getBaseLockID(self,vo,sourceLabel):
-        return self.getImpl(vo,sourceLabel).getBaseLockID()
+    def getBaseLockID(self,vo,sourceLabel,lockIDs=None):
+        return self.getImpl(vo,sourceLabel,doRefresh=False).getBaseLockID(lockIDs)
 
 
 
     # set test mode
     def setTestMode(self,vo,sourceLabel):
-        self.getImpl(vo,sourceLabel).setTestMode()
+        self.getImpl(vo,sourceLabel,doRefresh=False).setTestMode()
         
@@ -6,12 +6,16 @@ import copy
 import signal
 import urllib
 import socket
+import Queue
 import random
 import datetime
+import threading
 import traceback
 
-from pandajedi.jedicore.ThreadUtils import ListWithLock,ThreadPool,WorkerThread,MapWithLock
+from pandajedi.jedicore.ThreadUtils import ListWithLock,ThreadPool,WorkerThread,MapWithLock,WorkerBudget
 from pandajedi.jedicore import Interaction
+from pandajedi.jedicore import FactoryBase
+from pandajedi.jedicore.InteractionStats import stats
 from pandajedi.jedicore.MsgWrapper import MsgWrapper
 from pandajedi.jedicore.JediTaskSpec import JediTaskSpec
 from pandajedi.jedicore import ParseJobXML
@@ -51,6 +55,10 @@ class JobGenerator (JediKnight):
         self.withThrottle = withThrottle
         self.execJobs = execJobs
         self.paramsToGetTasks = None
+        if hasattr(jedi_config.jobgen,'factoryRefreshInterval'):
+            self.factoryRefreshInterval = jedi_config.jobgen.factoryRefreshInterval
+        else:
+            self.factoryRefreshInterval = 600
         
 
 
@@ -60,6 +68,11 @@ class JobGenerator (JediKnight):
         #JediKnight.start(self)
         # global thread pool
         globalThreadPool = ThreadPool()
+        # long-lived pool of workers
+        self.workerPool = self.makeWorkerPool(jedi_config.jobgen)
+        nParallelUnits = self.getNumParallelUnits()
+        if nParallelUnits > 1:
+            self.workerPool.maxWorkers = max(self.workerPool.maxWorkers,self.getNumWorkersTotal(nParallelUnits))
         # go into main loop
         while True:
             startTime = datetime.datetime.utcnow()
@@ -70,18 +83,23 @@ class JobGenerator (JediKnight):
                 # get SiteMapper
                 siteMapper = self.taskBufferIF.getSiteMapper()
                 tmpLog.debug('got siteMapper')
+                # refresh implementations shared in this process
+                if FactoryBase.registry.refresh(self.taskBufferIF.siteMapperVersion,self.factoryRefreshInterval):
+                    tmpLog.debug('refreshed shared implementations')
                 # get work queue mapper
                 workQueueMapper = self.taskBufferIF.getWorkQueueMap()
                 tmpLog.debug('got workQueueMapper')
                 # get Throttle
                 throttle = JobThrottler(self.vos,self.prodSourceLabels)
-                throttle.initializeMods(self.taskBufferIF)
+                throttle.initializeSharedMods(self.taskBufferIF)
                 tmpLog.debug('got Throttle')
                 # get TaskSetupper
                 taskSetupper = TaskSetupper(self.vos,self.prodSourceLabels)
-                taskSetupper.initializeMods(self.taskBufferIF,self.ddmIF)
+                taskSetupper.initializeSharedMods(self.taskBufferIF,self.ddmIF)
                 # loop over all vos
                 tmpLog.debug('go into loop')
+                nParallelUnits = self.getNumParallelUnits()
+                unitList = []
                 for vo in self.vos:
                     # loop over all sourceLabels
                     for prodSourceLabel in self.prodSourceLabels:
@@ -92,128 +110,15 @@ class JobGenerator (JediKnight):
                             workQueueList = workQueueMapper.getQueueListWithVoType(vo,prodSourceLabel)
                             tmpLog.debug("{0} workqueues for vo:{1} label:{2}".format(len(workQueueList),vo,prodSourceLabel))
                             for workQueue in workQueueList:
-                                cycleStr = 'pid={5} vo={0} cloud={1} queue={2}(id={3}) label={4}'.format(vo,cloudName,
-                                                                                                         workQueue.queue_name,
-                                                                                                         workQueue.queue_id,
-                                                                                                         workQueue.queue_type,
-                                                                                                         self.pid)
-                                tmpLog.debug('start {0}'.format(cycleStr))
-                                # check if to lock
-                                lockFlag = self.toLockProcess(vo,prodSourceLabel,workQueue.queue_name,cloudName)
-                                flagLocked = False
-                                if lockFlag:
-                                    tmpLog.debug('check if to lock')
-                                    # lock
-                                    flagLocked = self.taskBufferIF.lockProcess_JEDI(vo,prodSourceLabel,cloudName,workQueue.queue_id,self.pid)
-                                    if not flagLocked:
-                                        tmpLog.debug('skip since locked by another process')    
-                                        continue
-                                # get job statistics
-                                tmpSt,jobStat = self.taskBufferIF.getJobStatWithWorkQueuePerCloud_JEDI(vo,prodSourceLabel,cloudName)
-                                if not tmpSt:
-                                    raise RuntimeError,'failed to get job statistics'
-                                # throttle
-                                tmpLog.debug('check throttle with {0}'.format(throttle.getClassName(vo,workQueue.queue_type)))
-                                try:
-                                    tmpSt,thrFlag = throttle.toBeThrottled(vo,workQueue.queue_type,cloudName,workQueue,jobStat)
-                                except:
-                                    errtype,errvalue = sys.exc_info()[:2]
-                                    tmpLog.error('throttler failed with {0} {1}'.format(errtype,errvalue))
-                                    raise RuntimeError,'crashed when checking throttle'
-                                if tmpSt != self.SC_SUCCEEDED:
-                                    raise RuntimeError,'failed to check throttle'
-                                mergeUnThrottled = None
-                                if thrFlag == True:
-                                    if flagLocked:
-                                        tmpLog.debug('throttled')
-                                        self.taskBufferIF.unlockProcess_JEDI(vo,prodSourceLabel,cloudName,workQueue.queue_id,self.pid)
-                                        continue
-                                elif thrFlag == False:
-                                    pass
-                                else:
-                                    # leveled flag
-                                    mergeUnThrottled = not throttle.mergeThrottled(vo,workQueue.queue_type,thrFlag)
-                                    if not mergeUnThrottled:
-                                        tmpLog.debug('throttled including merge')
-                                        if flagLocked:
-                                            self.taskBufferIF.unlockProcess_JEDI(vo,prodSourceLabel,cloudName,workQueue.queue_id,self.pid)
-                                            continue
-                                    else:
-                                        tmpLog.debug('only merge is unthrottled')
-                                tmpLog.debug('minPriority={0} maxNumJobs={1}'.format(throttle.minPriority,throttle.maxNumJobs))
-                                # get typical number of files
-                                typicalNumFilesMap = self.taskBufferIF.getTypicalNumInput_JEDI(vo,workQueue.queue_type,workQueue,
-                                                                                               useResultCache=600)
-                                if typicalNumFilesMap == None:
-                                    raise RuntimeError,'failed to get typical number of files'
-                                # get params
-                                tmpParamsToGetTasks = self.getParamsToGetTasks(vo,prodSourceLabel,workQueue.queue_name,cloudName)
-                                nTasksToGetTasks = tmpParamsToGetTasks['nTasks']
-                                nFilesToGetTasks = tmpParamsToGetTasks['nFiles']
-                                tmpLog.debug('nTasks={0} nFiles={1} to get tasks'.format(nTasksToGetTasks,nFilesToGetTasks))
-                                # release lock when lack of jobs
-                                lackOfJobs = False
-                                if thrFlag == False:
-                                    if flagLocked and throttle.lackOfJobs:
-                                        tmpLog.debug('unlock {0} for multiple processes to quickly fill the queue until nQueueLimit is reached'.format(cycleStr))
-                                        self.taskBufferIF.unlockProcess_JEDI(vo,prodSourceLabel,cloudName,workQueue.queue_id,self.pid)
-                                        lackOfJobs = True
-                                        flagLocked = True
-                                # get the list of input 
-                                tmpList = self.taskBufferIF.getTasksToBeProcessed_JEDI(self.pid,vo,
-                                                                                       workQueue,
-                                                                                       workQueue.queue_type,
-                                                                                       cloudName,
-                                                                                       nTasks=nTasksToGetTasks,
-                                                                                       nFiles=nFilesToGetTasks,
-                                                                                       minPriority=throttle.minPriority,
-                                                                                       maxNumJobs=throttle.maxNumJobs,
-                                                                                       typicalNumFilesMap=typicalNumFilesMap,
-                                                                                       mergeUnThrottled=mergeUnThrottled
-                                                                                       )
-                                if tmpList == None:
-                                    # failed
-                                    tmpLog.error('failed to get the list of input chunks to generate jobs')
-                                else:
-                                    tmpLog.debug('got {0} input tasks'.format(len(tmpList)))
-                                    if len(tmpList) != 0: 
-                                        # put to a locked list
-                                        inputList = ListWithLock(tmpList)
-                                        # make thread pool
-                                        threadPool = ThreadPool() 
-                                        # make lock if nessesary
-                                        if lockFlag:
-                                            liveCounter = MapWithLock()
-                                        else:
-                                            liveCounter = None
-                                        # make list for brokerage lock
-                                        brokerageLockIDs = ListWithLock([])
-                                        # make workers
-                                        nWorker = jedi_config.jobgen.nWorkers
-                                        for iWorker in range(nWorker):
-                                            thr = JobGeneratorThread(inputList,threadPool,
-                                                                     self.taskBufferIF,self.ddmIF,
-                                                                     siteMapper,self.execJobs,
-                                                                     taskSetupper,
-                                                                     self.pid,
-                                                                     workQueue,
-                                                                     cloudName,
-                                                                     liveCounter,
-                                                                     brokerageLockIDs,
-                                                                     lackOfJobs)
-                                            globalThreadPool.add(thr)
-                                            thr.start()
-                                        # join
-                                        tmpLog.debug('try to join')
-                                        threadPool.join(60*10)
-                                        # unlock locks made by brokerage
-                                        for brokeragelockID in brokerageLockIDs:
-                                            self.taskBufferIF.unlockProcessWithPID_JEDI(vo,prodSourceLabel,workQueue.queue_id,
-                                                                                        brokeragelockID,True)
-                                        # dump
-                                        tmpLog.debug('dump one-time pool : {0} remTasks={1}'.format(threadPool.dump(),inputList.dump()))
-                                # unlock
-                                self.taskBufferIF.unlockProcess_JEDI(vo,prodSourceLabel,cloudName,workQueue.queue_id,self.pid)
+                                if nParallelUnits > 1:
+                                    unitList.append((vo,prodSourceLabel,cloudName,workQueue))
+                                    continue
+                                self.runUnit(vo,prodSourceLabel,cloudName,workQueue,siteMapper,throttle,taskSetupper,
+                                             globalThreadPool,None,tmpLog)
+                # process multiple units in parallel
+                if unitList != []:
+                    self.runUnitsInParallel(unitList,nParallelUnits,siteMapper,throttle,taskSetupper,
+                                            globalThreadPool,tmpLog)
             except:
                 errtype,errvalue = sys.exc_info()[:2]
                 tmpLog.error('failed in {0}.start() with {1}:{2} {3}'.format(self.__class__.__name__,
@@ -247,6 +152,7 @@ class JobGenerator (JediKnight):
                                                                                       os.getpid()))
                     tmpLog.debug('join')
                     globalThreadPool.join()
+                    self.workerPool.join()
                     tmpLog.debug('kill')
                     os.kill(os.getpid(),signal.SIGKILL)
             except:
@@ -262,6 +168,255 @@ class JobGenerator (JediKnight):
 
 
 
+    # generate jobs for a pair of cloud and work queue
+    def runUnit(self,vo,prodSourceLabel,cloudName,workQueue,siteMapper,throttle,taskSetupper,
+                globalThreadPool,workerBudget,tmpLog):
+        cycleStr = 'pid={5} vo={0} cloud={1} queue={2}(id={3}) label={4}'.format(vo,cloudName,
+                                                                                 workQueue.queue_name,
+                                                                                 workQueue.queue_id,
+                                                                                 workQueue.queue_type,
+                                                                                 self.pid)
+        tmpLog.debug('start {0}'.format(cycleStr))
+        # check if to lock
+        lockFlag = self.toLockProcess(vo,prodSourceLabel,workQueue.queue_name,cloudName)
+        flagLocked = False
+        if lockFlag:
+            tmpLog.debug('check if to lock')
+            # lock
+            flagLocked = self.taskBufferIF.lockProcess_JEDI(vo,prodSourceLabel,cloudName,workQueue.queue_id,self.pid)
+            if not flagLocked:
+                tmpLog.debug('skip since locked by another process')    
+                return
+        # get job statistics
+        tmpSt,jobStat = self.taskBufferIF.getJobStatWithWorkQueuePerCloud_JEDI(vo,prodSourceLabel,cloudName)
+        if not tmpSt:
+            raise RuntimeError,'failed to get job statistics'
+        # throttle
+        tmpLog.debug('check throttle with {0}'.format(throttle.getClassName(vo,workQueue.queue_type)))
+        try:
+            tmpSt,thrFlag = throttle.toBeThrottled(vo,workQueue.queue_type,cloudName,workQueue,jobStat)
+        except:
+            errtype,errvalue = sys.exc_info()[:2]
+            tmpLog.error('throttler failed with {0} {1}'.format(errtype,errvalue))
+            raise RuntimeError,'crashed when checking throttle'
+        if tmpSt != self.SC_SUCCEEDED:
+            raise RuntimeError,'failed to check throttle'
+        mergeUnThrottled = None
+        if thrFlag == True:
+            if flagLocked:
+                tmpLog.debug('throttled')
+                self.taskBufferIF.unlockProcess_JEDI(vo,prodSourceLabel,cloudName,workQueue.queue_id,self.pid)
+                return
+        elif thrFlag == False:
+            pass
+        else:
+            # leveled flag
+            mergeUnThrottled = not throttle.mergeThrottled(vo,workQueue.queue_type,thrFlag)
+            if not mergeUnThrottled:
+                tmpLog.debug('throttled including merge')
+                if flagLocked:
+                    self.taskBufferIF.unlockProcess_JEDI(vo,prodSourceLabel,cloudName,workQueue.queue_id,self.pid)
+                    return
+            else:
+                tmpLog.debug('only merge is unthrottled')
+        tmpLog.debug('minPriority={0} maxNumJobs={1}'.format(throttle.minPriority,throttle.maxNumJobs))
+        # get typical number of files
+        typicalNumFilesMap = self.taskBufferIF.getTypicalNumInput_JEDI(vo,workQueue.queue_type,workQueue,
+                                                                       useResultCache=600)
+        if typicalNumFilesMap == None:
+            raise RuntimeError,'failed to get typical number of files'
+        # get params
+        tmpParamsToGetTasks = self.getParamsToGetTasks(vo,prodSourceLabel,workQueue.queue_name,cloudName)
+        nTasksToGetTasks = tmpParamsToGetTasks['nTasks']
+        nFilesToGetTasks = tmpParamsToGetTasks['nFiles']
+        tmpLog.debug('nTasks={0} nFiles={1} to get tasks'.format(nTasksToGetTasks,nFilesToGetTasks))
+        # release lock when lack of jobs
+        lackOfJobs = False
+        if thrFlag == False:
+            if flagLocked and throttle.lackOfJobs:
+                tmpLog.debug('unlock {0} for multiple processes to quickly fill the queue until nQueueLimit is reached'.format(cycleStr))
+                self.taskBufferIF.unlockProcess_JEDI(vo,prodSourceLabel,cloudName,workQueue.queue_id,self.pid)
+                lackOfJobs = True
+                flagLocked = True
+        # get the list of input which is streamed to a locked list
+        tmpStream = self.taskBufferIF.stream(1).getTasksToBeProcessed_JEDI(self.pid,vo,
+                                                                           workQueue,
+                                                                           workQueue.queue_type,
+                                                                           cloudName,
+                                                                           nTasks=nTasksToGetTasks,
+                                                                           nFiles=nFilesToGetTasks,
+                                                                           minPriority=throttle.minPriority,
+                                                                           maxNumJobs=throttle.maxNumJobs,
+                                                                           typicalNumFilesMap=typicalNumFilesMap,
+                                                                           mergeUnThrottled=mergeUnThrottled
+                                                                           )
+        inputList = ListWithLock([],feeding=True)
+        inputList.feedInThread(tmpStream)
+        # wait for the first input
+        inputList.waitForData()
+        if inputList.feedError != None:
+            raise inputList.feedError[0],inputList.feedError[1]
+        if len(inputList) == 0 and not tmpStream.isStreamed:
+            # failed
+            tmpLog.error('failed to get the list of input chunks to generate jobs')
+        else:
+            tmpLog.debug('got first input tasks')
+            if len(inputList) != 0: 
+                # make thread pool
+                threadPool = ThreadPool() 
+                nUsedWorkers = 0
+                # make lock if nessesary
+                if lockFlag:
+                    liveCounter = MapWithLock()
+                else:
+                    liveCounter = None
+                # make list for brokerage lock
+                brokerageLockIDs = ListWithLock([])
+                # make accumulator for bulk submission
+                submitAccumulator = self.makeSubmissionAccumulator()
+                # arguments for workers
+                thrArgs = (inputList,threadPool,
+                           self.taskBufferIF,self.ddmIF,
+                           siteMapper,self.execJobs,
+                           taskSetupper,
+                           self.pid,
+                           workQueue,
+                           cloudName,
+                           liveCounter,
+                           brokerageLockIDs,
+                           lackOfJobs,
+                           submitAccumulator)
+                pipeline = self.makePipeline(vo,liveCounter != None)
+                if pipeline == None:
+                    # make workers to run all stages
+                    nWorker = jedi_config.jobgen.nWorkers
+                    if workerBudget != None:
+                        nWorker = workerBudget.acquire(nWorker)
+                        nUsedWorkers += nWorker
+                    # run workers in the long-lived pool
+                    self.workerPool.process(inputList,JobGeneratorThread,thrArgs[1:],
+                                            timeout=60*10,maxWorkers=nWorker)
+                    tmpLog.debug('worker pool : {0}'.format(self.workerPool.dump()))
+                else:
+                    # make workers for each stage
+                    if workerBudget != None:
+                        nUsedWorkers += workerBudget.acquire(sum(pipeline.nWorkers))
+                    for stageIndex,nWorker in enumerate(pipeline.nWorkers):
+                        for iWorker in range(nWorker):
+                            thr = JobGeneratorStageThread(pipeline,stageIndex,iWorker,*thrArgs)
+                            globalThreadPool.add(thr)
+                            thr.start()
+                # join
+                tmpLog.debug('try to join')
+                threadPool.join(60*10)
+                if workerBudget != None:
+                    workerBudget.release(nUsedWorkers)
+                tmpLog.debug('got {0} input tasks'.format(len(inputList)))
+                if pipeline != None:
+                    tmpLog.debug('pipeline stages : {0}'.format(pipeline.dump()))
+                # unlock locks made by brokerage
+                for brokeragelockID in brokerageLockIDs:
+                    self.taskBufferIF.unlockProcessWithPID_JEDI(vo,prodSourceLabel,workQueue.queue_id,
+                                                                brokeragelockID,True)
+                # dump
+                tmpLog.debug('dump one-time pool : {0} remTasks={1}'.format(threadPool.dump(),inputList.dump()))
+            # feeding failed after the first input
+            if inputList.feedError != None:
+                errtype,errvalue = inputList.feedError
+                tmpLog.error('failed to get the complete list of input chunks to generate jobs with {0}:{1}'.format(errtype.__name__,
+                                                                                                                  errvalue))
+        # unlock
+        self.taskBufferIF.unlockProcess_JEDI(vo,prodSourceLabel,cloudName,workQueue.queue_id,self.pid)
+
+
+
+    # get the number of units of cloud and work queue processed in parallel
+    def getNumParallelUnits(self):
+        if not hasattr(jedi_config.jobgen,'nParallelUnits') or jedi_config.jobgen.nParallelUnits in ['',None]:
+            return 1
+        return jedi_config.jobgen.nParallelUnits
+
+
+
+    # get the total number of workers for units processed in parallel
+    def getNumWorkersTotal(self,nParallelUnits):
+        if hasattr(jedi_config.jobgen,'nWorkersTotal') and not jedi_config.jobgen.nWorkersTotal in ['',None,0]:
+            return jedi_config.jobgen.nWorkersTotal
+        return nParallelUnits*jedi_config.jobgen.nWorkers
+
+
+
+    # sort units of cloud and work queue by throttle results and the number of jobs to be generated.
+    # the results are used only for ordering since runUnit checks the throttle again with the process lock
+    def sortUnits(self,unitList,throttle,tmpLog):
+        jobStatMap = {}
+        rankedList = []
+        for vo,prodSourceLabel,cloudName,workQueue in unitList:
+            # units which failed to be checked are processed after unthrottled ones
+            thrRank = 2
+            maxNumJobs = 0
+            try:
+                # get job statistics
+                jobStatKey = (vo,prodSourceLabel,cloudName)
+                if not jobStatKey in jobStatMap:
+                    tmpSt,jobStat = self.taskBufferIF.getJobStatWithWorkQueuePerCloud_JEDI(vo,prodSourceLabel,cloudName)
+                    if not tmpSt:
+                        jobStat = None
+                    jobStatMap[jobStatKey] = jobStat
+                jobStat = jobStatMap[jobStatKey]
+                # check throttle
+                if jobStat != None:
+                    tmpSt,thrFlag = throttle.toBeThrottled(vo,workQueue.queue_type,cloudName,workQueue,jobStat)
+                    if tmpSt == self.SC_SUCCEEDED:
+                        if thrFlag == True:
+                            thrRank = 4
+                        elif thrFlag == False:
+                            if throttle.lackOfJobs:
+                                thrRank = 0
+                            else:
+                                thrRank = 1
+                        elif not throttle.mergeThrottled(vo,workQueue.queue_type,thrFlag):
+                            thrRank = 3
+                        else:
+                            thrRank = 4
+                        if throttle.maxNumJobs != None:
+                            maxNumJobs = throttle.maxNumJobs
+            except:
+                errtype,errvalue = sys.exc_info()[:2]
+                tmpLog.warning('failed to check throttle for cloud={0} queue={1} with {2}:{3}'.format(cloudName,
+                                                                                                    workQueue.queue_name,
+                                                                                                    errtype.__name__,
+                                                                                                    errvalue))
+            rankedList.append(((thrRank,-maxNumJobs),(vo,prodSourceLabel,cloudName,workQueue)))
+        # stable sort to keep the shuffled order of clouds for ties
+        rankedList.sort(key=lambda x: x[0])
+        return [unit for rank,unit in rankedList]
+
+
+
+    # process units of cloud and work queue in parallel with the global budget of workers
+    def runUnitsInParallel(self,unitList,nParallelUnits,siteMapper,throttle,taskSetupper,
+                           globalThreadPool,tmpLog):
+        # sort units
+        unitList = self.sortUnits(unitList,throttle,tmpLog)
+        # budget of workers
+        workerBudget = WorkerBudget(self.getNumWorkersTotal(nParallelUnits))
+        tmpLog.debug('process {0} units with nParallel={1} budget={2}'.format(len(unitList),nParallelUnits,
+                                                                               workerBudget.dump()))
+        unitSemaphore = threading.Semaphore(nParallelUnits)
+        unitPool = ThreadPool()
+        for vo,prodSourceLabel,cloudName,workQueue in unitList:
+            # start units in the sorted order
+            unitSemaphore.acquire()
+            thr = JobGeneratorUnitThread(self,unitSemaphore,unitPool,
+                                         (vo,prodSourceLabel,cloudName,workQueue,siteMapper,None,taskSetupper,
+                                          globalThreadPool,workerBudget))
+            thr.start()
+        unitPool.join()
+        tmpLog.debug('done {0} units'.format(len(unitList)))
+
+
+
     # get parameters to get tasks
     def getParamsToGetTasks(self,vo,prodSourceLabel,queueName,cloudName):
         paramsList = ['nFiles','nTasks']
@@ -340,6 +495,42 @@ class JobGenerator (JediKnight):
 
 
 
+    # make pipeline if stages are configured. None is returned to run all stages in each worker.
+    # brokerage and splitting run in the same stage with the live counter since the counter is
+    # locked in brokerage and released after splitting by the same thread
+    def makePipeline(self,vo,useLiveCounter):
+        if not hasattr(jedi_config.jobgen,'pipelineStages') or jedi_config.jobgen.pipelineStages in ['',None]:
+            return None
+        try:
+            stageWorkers = JobGeneratorPipeline.parseStageConfig(jedi_config.jobgen.pipelineStages)
+        except:
+            errtype,errvalue = sys.exc_info()[:2]
+            logger.error('failed to parse pipelineStages with {0}:{1}'.format(errtype.__name__,errvalue))
+            return None
+        if hasattr(jedi_config.jobgen,'pipelineQueueSize'):
+            queueSize = jedi_config.jobgen.pipelineQueueSize
+        else:
+            queueSize = 10
+        if useLiveCounter:
+            fusedStages = [('broker','split')]
+        else:
+            fusedStages = []
+        return JobGeneratorPipeline(vo,stageWorkers,queueSize,fusedStages)
+
+
+
+    # make accumulator if bulk submission is enabled
+    def makeSubmissionAccumulator(self):
+        if not hasattr(jedi_config.jobgen,'bulkSubmitJobs') or jedi_config.jobgen.bulkSubmitJobs in ['',None,0]:
+            return None
+        if hasattr(jedi_config.jobgen,'bulkSubmitWait'):
+            maxWait = float(jedi_config.jobgen.bulkSubmitWait)
+        else:
+            maxWait = 2
+        return SubmissionAccumulator(self.taskBufferIF,jedi_config.jobgen.bulkSubmitJobs,maxWait)
+
+
+
     # check if lock process
     def toLockProcess(self,vo,prodSourceLabel,queueName,cloudName):
         try:
@@ -370,7 +561,8 @@ class JobGeneratorThread (WorkerThread):
     def __init__(self,inputList,threadPool,taskbufferIF,ddmIF,siteMapper,
                  execJobs,taskSetupper,pid,workQueue,cloud,liveCounter,
                  brokerageLockIDs,
-                 lackOfJobs):
+                 lackOfJobs,
+                 submitAccumulator=None):
         # initialize woker with no semaphore
         WorkerThread.__init__(self,None,threadPool,logger)
         # attributres
@@ -384,11 +576,23 @@ class JobGeneratorThread (WorkerThread):
         self.msgType      = 'jobgenerator'
         self.pid          = pid
         self.buildSpecMap = {}
+        self.randomSeedAllocator = None
+        self.jobParamsTemplateMap = {}
         self.workQueue    = workQueue
         self.cloud        = cloud
         self.liveCounter  = liveCounter
         self.brokerageLockIDs = brokerageLockIDs
         self.lackOfJobs   = lackOfJobs
+        self.submitAccumulator = submitAccumulator
+
+
+
+    # stages of job generation. each stage is processed by a method taking a work item
+    stageList = [('broker','runBrokerage'),
+                 ('split','runSplitter'),
+                 ('generate','runGenerator'),
+                 ('setup','runSetupper'),
+                 ('store','runSubmission')]
 
 
 
@@ -397,277 +601,20 @@ class JobGeneratorThread (WorkerThread):
         while True:
             try:
                 lastJediTaskID = None
-                # get a part of list
-                nInput = 1
-                taskInputList = self.inputList.get(nInput)
+                # get work items for a task
+                workItemList = self.getWorkItems()
                 # no more datasets
-                if len(taskInputList) == 0:
-                    self.logger.debug('{0} terminating after generating {1} jobs since no more inputs '.format(self.__class__.__name__,
-                                                                                                               self.numGenJobs))
-                    if self.numGenJobs > 0:
-                        prefix = '<VO={0} queue_type={1} cloud={2} queue={3}>'.format(self.workQueue.VO,
-                                                                                      self.workQueue.queue_type,
-                                                                                      self.cloud,
-                                                                                      self.workQueue.queue_name)
-                        tmpMsg = ": submitted {0} jobs".format(self.numGenJobs)
-                        tmpLog = MsgWrapper(self.logger,monToken=prefix)
-                        tmpLog.info(prefix + tmpMsg)
-                        tmpLog.sendMsg(tmpMsg,self.msgType)
+                if workItemList == None:
+                    self.sendSummary()
                     return
-                # loop over all tasks
-                for tmpJediTaskID,inputList in taskInputList:
-                    lastJediTaskID = tmpJediTaskID
-                    # loop over all inputs
-                    for idxInputList,tmpInputItem in enumerate(inputList):
-                        taskSpec,cloudName,inputChunk = tmpInputItem
-                        # reset error dialog
-                        taskSpec.errorDialog = None
-                        # reset map of buildSpec
-                        self.buildSpecMap = {}
-                        # make logger
-                        tmpLog = MsgWrapper(self.logger,'<jediTaskID={0} datasetID={1}>'.format(taskSpec.jediTaskID,
-                                                                                                inputChunk.masterIndexName),
-                                            monToken='<jediTaskID={0}>'.format(taskSpec.jediTaskID))
-                        tmpLog.info('start to generate with VO={0} cloud={1} queue={2}'.format(taskSpec.vo,cloudName,
-                                                                                               self.workQueue.queue_name))
-                        tmpLog.sendMsg('start to generate jobs',self.msgType)
-                        readyToSubmitJob = False
-                        jobsSubmitted = False
-                        goForward = True
-                        taskParamMap = None
-                        oldStatus = taskSpec.status
-                        # initialize brokerage
-                        if goForward:        
-                            jobBroker = JobBroker(taskSpec.vo,taskSpec.prodSourceLabel)
-                            tmpStat = jobBroker.initializeMods(self.ddmIF.getInterface(taskSpec.vo),
-                                                               self.taskBufferIF)
-                            if not tmpStat:
-                                tmpErrStr = 'failed to initialize JobBroker'
-                                tmpLog.error(tmpErrStr)
-                                taskSpec.setOnHold()
-                                taskSpec.setErrDiag(tmpErrStr)                        
-                                goForward = False
-                            # set live counter
-                            jobBroker.setLiveCounter(taskSpec.vo,taskSpec.prodSourceLabel,self.liveCounter)
-                            # set lock ID
-                            jobBroker.setLockID(taskSpec.vo,taskSpec.prodSourceLabel,self.pid,self.ident)
-                        # read task params if nessesary
-                        if taskSpec.useLimitedSites():
-                            tmpStat,taskParamMap = self.readTaskParams(taskSpec,taskParamMap,tmpLog)
-                            if not tmpStat:
-                                tmpErrStr = 'failed to read task params'
-                                tmpLog.error(tmpErrStr)
-                                taskSpec.setOnHold()
-                                taskSpec.setErrDiag(tmpErrStr)                        
-                                goForward = False
-                        # run brokerage
-                        lockCounter = False
-                        if goForward:
-                            if self.liveCounter != None and not inputChunk.isMerging and not self.lackOfJobs:
-                                tmpLog.debug('trying to lock counter')
-                                self.liveCounter.acquire() 
-                                tmpLog.debug('locked counter')
-                                lockCounter = True
-                            tmpLog.debug('run brokerage with {0}'.format(jobBroker.getClassName(taskSpec.vo,
-                                                                                               taskSpec.prodSourceLabel)))
-                            try:
-                                tmpStat,inputChunk = jobBroker.doBrokerage(taskSpec,cloudName,inputChunk,taskParamMap)
-                            except:
-                                errtype,errvalue = sys.exc_info()[:2]
-                                tmpLog.error('brokerage crashed with {0}:{1} {2}'.format(errtype.__name__,errvalue,traceback.format_exc()))
-                                tmpStat = Interaction.SC_FAILED
-                            if tmpStat != Interaction.SC_SUCCEEDED:
-                                tmpErrStr = 'brokerage failed'
-                                tmpLog.error(tmpErrStr)
-                                taskSpec.setOnHold()
-                                taskSpec.setErrDiag(tmpErrStr,True)
-                                goForward = False
-                            else:
-                                # collect brokerage lock ID
-                                brokerageLockID = jobBroker.getBaseLockID(taskSpec.vo,taskSpec.prodSourceLabel)
-                                if brokerageLockID != None:
-                                    self.brokerageLockIDs.append(brokerageLockID)
-                        # run splitter
-                        if goForward:
-                            tmpLog.debug('run splitter')
-                            splitter = JobSplitter()
-                            try:
-                                tmpStat,subChunks = splitter.doSplit(taskSpec,inputChunk,self.siteMapper)
-                                # * remove the last sub-chunk when inputChunk is read in a block 
-                                #   since alignment could be broken in the last sub-chunk 
-                                #    e.g., inputChunk=10 -> subChunks=4,4,2 and remove 2
-                                # * don't remove it for the last inputChunk
-                                # e.g., inputChunks = 10(remove),10(remove),3(not remove)
-                                if len(subChunks[-1]['subChunks']) > 1 and inputChunk.masterDataset != None \
-                                        and inputChunk.readBlock == True:
-                                    subChunks[-1]['subChunks'] = subChunks[-1]['subChunks'][:-1]
-                                # update counter
-                                if self.liveCounter != None and not inputChunk.isMerging:
-                                    if not lockCounter:
-                                        tmpLog.debug('trying to lock counter')
-                                        self.liveCounter.acquire()
-                                        tmpLog.debug('locked counter')
-                                        lockCounter = True
-                                    for tmpSubChunk in subChunks:
-                                        self.liveCounter.add(tmpSubChunk['siteName'],len(tmpSubChunk['subChunks']))
-                            except:
-                                errtype,errvalue = sys.exc_info()[:2]
-                                tmpLog.error('splitter crashed with {0}:{1}'.format(errtype.__name__,errvalue))
-                                tmpStat = Interaction.SC_FAILED
-                            if tmpStat != Interaction.SC_SUCCEEDED:
-                                tmpErrStr = 'splitting failed'
-                                tmpLog.error(tmpErrStr)
-                                taskSpec.setOnHold()
-                                taskSpec.setErrDiag(tmpErrStr)                                
-                                goForward = False
-                        # release lock
-                        if lockCounter:
-                            tmpLog.debug('release counter')
-                            self.liveCounter.release() 
-                        # lock task
-                        if goForward:
-                            tmpLog.debug('lock task')
-                            tmpStat = self.taskBufferIF.lockTask_JEDI(taskSpec.jediTaskID,self.pid)
-                            if tmpStat == False:
-                                tmpLog.debug('skip due to lock failure')
-                                continue
-                        # generate jobs
-                        if goForward:
-                            tmpLog.debug('run job generator')
-                            try:
-                                tmpStat,pandaJobs,datasetToRegister,oldPandaIDs,parallelOutMap,outDsMap = self.doGenerate(taskSpec,cloudName,subChunks,
-                                                                                                                          inputChunk,tmpLog,
-                                                                                                                          taskParamMap=taskParamMap,
-                                                                                                                          splitter=splitter)
-                            except:
-                                errtype,errvalue = sys.exc_info()[:2]
-                                tmpLog.error('generator crashed with {0}:{1}'.format(errtype.__name__,errvalue))
-                                tmpStat = Interaction.SC_FAILED
-                            if tmpStat != Interaction.SC_SUCCEEDED:
-                                tmpErrStr = 'job generation failed'
-                                tmpLog.error(tmpErrStr)
-                                taskSpec.setOnHold()
-                                taskSpec.setErrDiag(tmpErrStr)
-                                goForward = False
-                        # lock task
-                        if goForward:
-                            tmpLog.debug('lock task')
-                            tmpStat = self.taskBufferIF.lockTask_JEDI(taskSpec.jediTaskID,self.pid)
-                            if tmpStat == False:
-                                tmpLog.debug('skip due to lock failure')
-                                continue
-                        # setup task
-                        if goForward:
-                            tmpLog.debug('run setupper with {0}'.format(self.taskSetupper.getClassName(taskSpec.vo,
-                                                                                                      taskSpec.prodSourceLabel)))
-                            tmpStat = self.taskSetupper.doSetup(taskSpec,datasetToRegister,pandaJobs)
-                            if tmpStat != Interaction.SC_SUCCEEDED:
-                                tmpErrStr = 'failed to setup task'
-                                tmpLog.error(tmpErrStr)
-                                taskSpec.setOnHold()
-                                taskSpec.setErrDiag(tmpErrStr,True)
-                            else:
-                                readyToSubmitJob = True
-                                if taskSpec.toRegisterDatasets() and (not taskSpec.mergeOutput() or inputChunk.isMerging):
-                                    taskSpec.registeredDatasets()
-                        # lock task
-                        if goForward:
-                            tmpLog.debug('lock task')
-                            tmpStat = self.taskBufferIF.lockTask_JEDI(taskSpec.jediTaskID,self.pid)
-                            if tmpStat == False:
-                                tmpLog.debug('skip due to lock failure')
-                                continue
-                        # submit
-                        if readyToSubmitJob:
-                            # check if first submission
-                            if oldStatus == 'ready' and inputChunk.useScout():
-                                firstSubmission = True
-                            else:
-                                firstSubmission = False
-                            # type of relation
-                            if inputChunk.isMerging:
-                                relationType = 'merge'
-                            else:
-                                relationType = 'retry'
-                            # submit
-                            fqans = taskSpec.makeFQANs()
-                            tmpLog.info('submit njobs={0} jobs with FQAN={1}'.format(len(pandaJobs),','.join(str(fqan) for fqan in fqans)))
-                            resSubmit = self.taskBufferIF.storeJobs(pandaJobs,taskSpec.userName,
-                                                                    fqans=fqans,toPending=True,
-                                                                    oldPandaIDs=oldPandaIDs,
-                                                                    relationType=relationType)
-                            pandaIDs = []
-                            for idxItem,items in enumerate(resSubmit):
-                                if items[0] != 'NULL':
-                                    pandaIDs.append(items[0])
-                            # check if submission was successful
-                            if len(pandaIDs) == len(pandaJobs):
-                                tmpMsg = 'successfully submitted '
-                                tmpMsg += 'jobs_submitted={0}/jobs_possible={1} for VO={2} cloud={3} queue={4} status={5} nucleus={6}'.format(len(pandaIDs),
-                                                                                                                                              len(pandaJobs),
-                                                                                                                                              taskSpec.vo,cloudName,
-                                                                                                                                              self.workQueue.queue_name,
-                                                                                                                                              oldStatus,
-                                                                                                                                              taskSpec.nucleus)
-                                if inputChunk.isMerging:
-                                    tmpMsg += ' pmerge=Y'
-                                else:
-                                    tmpMsg += ' pmerge=N'
-                                tmpLog.info(tmpMsg)
-                                tmpLog.sendMsg(tmpMsg,self.msgType)
-                                if self.execJobs:
-                                    statExe,retExe = PandaClient.reassignJobs(pandaIDs,forPending=True,
-                                                                              firstSubmission=firstSubmission)
-                                    tmpLog.info('exec {0} jobs with status={1}'.format(len(pandaIDs),retExe))
-                                jobsSubmitted = True
-                                if inputChunk.isMerging:
-                                    # don't change task status by merging
-                                    pass
-                                elif taskSpec.usePrePro():
-                                    taskSpec.status = 'preprocessing'
-                                elif inputChunk.useScout():
-                                    taskSpec.status = 'scouting'
-                                else:
-                                    taskSpec.status = 'running'
-                                    # scout was skipped
-                                    if taskSpec.useScout():
-                                        taskSpec.setUseScout(False)
-                            else:
-                                tmpErrStr = 'submitted only {0}/{1}'.format(len(pandaIDs),len(pandaJobs))
-                                tmpLog.error(tmpErrStr)
-                                taskSpec.setOnHold()
-                                taskSpec.setErrDiag(tmpErrStr)
-                            # the number of generated jobs     
-                            self.numGenJobs += len(pandaIDs)    
-                        # lock task
-                        tmpLog.debug('lock task')
-                        tmpStat = self.taskBufferIF.lockTask_JEDI(taskSpec.jediTaskID,self.pid)
-                        if tmpStat == False:
-                            tmpLog.debug('skip due to lock failure')
-                            continue
-                        # reset unused files
-                        nFileReset = self.taskBufferIF.resetUnusedFiles_JEDI(taskSpec.jediTaskID,inputChunk)
-                        # unset lockedBy when all inputs are done for a task
-                        setOldModTime = False
-                        if idxInputList+1 == len(inputList):
-                            taskSpec.lockedBy = None
-                            taskSpec.lockedTime = None
-                            if taskSpec.status == 'running' and nFileReset > 0 and taskSpec.currentPriority > 900:
-                                setOldModTime = True
-                        else:
-                            taskSpec.lockedBy = self.pid
-                            taskSpec.lockedTime = datetime.datetime.utcnow()
-                        # update task
-                        retDB = self.taskBufferIF.updateTask_JEDI(taskSpec,{'jediTaskID':taskSpec.jediTaskID},
-                                                                  oldStatus=JediTaskSpec.statusForJobGenerator()+['pending'],
-                                                                  setOldModTime=setOldModTime)
-                        tmpMsg = 'set task.status={0} oldTask={2} with {1}'.format(taskSpec.status,str(retDB),setOldModTime)
-                        tmpLog.info(tmpMsg)
-                        if not taskSpec.errorDialog in ['',None]:
-                            tmpMsg += ' ' + taskSpec.errorDialog
-                        tmpLog.sendMsg(tmpMsg,self.msgType)
-                        tmpLog.info(tmpMsg)
-                        tmpLog.debug('done')
+                # loop over all inputs
+                for workItem in workItemList:
+                    lastJediTaskID = workItem.taskSpec.jediTaskID
+                    # run all stages
+                    for stageName,methodName in self.stageList:
+                        getattr(self,methodName)(workItem)
+                        if workItem.skipped:
+                            break
             except:
                 errtype,errvalue = sys.exc_info()[:2]
                 logger.error('%s.runImpl() failed with %s %s lastJediTaskID=%s' % (self.__class__.__name__,errtype.__name__,errvalue,
@@ -675,6 +622,346 @@ class JobGeneratorThread (WorkerThread):
 
 
 
+    # get work items for inputs of a task. None is returned if no more input
+    def getWorkItems(self):
+        # get a part of list
+        nInput = 1
+        taskInputList = self.inputList.get(nInput)
+        if len(taskInputList) == 0:
+            return None
+        workItemList = []
+        for tmpJediTaskID,inputList in taskInputList:
+            for idxInputList,tmpInputItem in enumerate(inputList):
+                taskSpec,cloudName,inputChunk = tmpInputItem
+                workItemList.append(JobGeneratorWorkItem(taskSpec,cloudName,inputChunk,
+                                                         idxInputList+1 == len(inputList)))
+        return workItemList
+
+
+
+    # send the number of generated jobs when terminating
+    def sendSummary(self):
+        self.logger.debug('{0} terminating after generating {1} jobs since no more inputs '.format(self.__class__.__name__,
+                                                                                                   self.numGenJobs))
+        if self.numGenJobs > 0:
+            prefix = '<VO={0} queue_type={1} cloud={2} queue={3}>'.format(self.workQueue.VO,
+                                                                          self.workQueue.queue_type,
+                                                                          self.cloud,
+                                                                          self.workQueue.queue_name)
+            tmpMsg = ": submitted {0} jobs".format(self.numGenJobs)
+            tmpLog = MsgWrapper(self.logger,monToken=prefix)
+            tmpLog.info(prefix + tmpMsg)
+            tmpLog.sendMsg(tmpMsg,self.msgType)
+
+
+
+    # lock task. False is returned if the work item is skipped due to lock failure
+    def lockTask(self,workItem):
+        workItem.tmpLog.debug('lock task')
+        tmpStat = self.taskBufferIF.lockTask_JEDI(workItem.taskSpec.jediTaskID,self.pid)
+        if tmpStat == False:
+            workItem.tmpLog.debug('skip due to lock failure')
+            workItem.skipped = True
+            return False
+        return True
+
+
+
+    # release live counter
+    def releaseCounter(self,workItem):
+        if workItem.lockCounter:
+            workItem.tmpLog.debug('release counter')
+            self.liveCounter.release()
+            workItem.lockCounter = False
+
+
+
+    # run brokerage
+    def runBrokerage(self,workItem):
+        taskSpec = workItem.taskSpec
+        inputChunk = workItem.inputChunk
+        # reset error dialog
+        taskSpec.errorDialog = None
+        # make logger
+        tmpLog = MsgWrapper(self.logger,'<jediTaskID={0} datasetID={1}>'.format(taskSpec.jediTaskID,
+                                                                                inputChunk.masterIndexName),
+                            monToken='<jediTaskID={0}>'.format(taskSpec.jediTaskID))
+        workItem.tmpLog = tmpLog
+        tmpLog.info('start to generate with VO={0} cloud={1} queue={2}'.format(taskSpec.vo,workItem.cloudName,
+                                                                               self.workQueue.queue_name))
+        tmpLog.sendMsg('start to generate jobs',self.msgType)
+        # initialize brokerage
+        if workItem.goForward:
+            jobBroker = JobBroker(taskSpec.vo,taskSpec.prodSourceLabel)
+            tmpStat = jobBroker.initializeSharedMods(self.ddmIF.getInterface(taskSpec.vo),
+                                                     self.taskBufferIF)
+            if not tmpStat:
+                tmpErrStr = 'failed to initialize JobBroker'
+                tmpLog.error(tmpErrStr)
+                taskSpec.setOnHold()
+                taskSpec.setErrDiag(tmpErrStr)
+                workItem.goForward = False
+            # lock ID
+            lockIDs = jobBroker.makeLockIDs(taskSpec.vo,taskSpec.prodSourceLabel,self.pid,self.ident)
+        # read task params if nessesary
+        if taskSpec.useLimitedSites():
+            tmpStat,workItem.taskParamMap = self.readTaskParams(taskSpec,workItem.taskParamMap,tmpLog)
+            if not tmpStat:
+                tmpErrStr = 'failed to read task params'
+                tmpLog.error(tmpErrStr)
+                taskSpec.setOnHold()
+                taskSpec.setErrDiag(tmpErrStr)
+                workItem.goForward = False
+        # run brokerage
+        if workItem.goForward:
+            if self.liveCounter != None and not inputChunk.isMerging and not self.lackOfJobs:
+                tmpLog.debug('trying to lock counter')
+                self.liveCounter.acquire()
+                tmpLog.debug('locked counter')
+                workItem.lockCounter = True
+            tmpLog.debug('run brokerage with {0}'.format(jobBroker.getClassName(taskSpec.vo,
+                                                                               taskSpec.prodSourceLabel)))
+            try:
+                tmpStat,workItem.inputChunk = jobBroker.doBrokerage(taskSpec,workItem.cloudName,inputChunk,
+                                                                    workItem.taskParamMap,
+                                                                    liveCounter=self.liveCounter,
+                                                                    lockIDs=lockIDs)
+            except:
+                errtype,errvalue = sys.exc_info()[:2]
+                tmpLog.error('brokerage crashed with {0}:{1} {2}'.format(errtype.__name__,errvalue,traceback.format_exc()))
+                tmpStat = Interaction.SC_FAILED
+            if tmpStat != Interaction.SC_SUCCEEDED:
+                tmpErrStr = 'brokerage failed'
+                tmpLog.error(tmpErrStr)
+                taskSpec.setOnHold()
+                taskSpec.setErrDiag(tmpErrStr,True)
+                workItem.goForward = False
+            else:
+                # collect brokerage lock ID
+                brokerageLockID = jobBroker.getBaseLockID(taskSpec.vo,taskSpec.prodSourceLabel,lockIDs)
+                if brokerageLockID != None:
+                    self.brokerageLockIDs.append(brokerageLockID)
+
+
+
+    # run splitter
+    def runSplitter(self,workItem):
+        taskSpec = workItem.taskSpec
+        inputChunk = workItem.inputChunk
+        tmpLog = workItem.tmpLog
+        if workItem.goForward:
+            tmpLog.debug('run splitter')
+            splitter = JobSplitter()
+            try:
+                tmpStat,subChunks = splitter.doSplit(taskSpec,inputChunk,self.siteMapper)
+                # * remove the last sub-chunk when inputChunk is read in a block 
+                #   since alignment could be broken in the last sub-chunk 
+                #    e.g., inputChunk=10 -> subChunks=4,4,2 and remove 2
+                # * don't remove it for the last inputChunk
+                # e.g., inputChunks = 10(remove),10(remove),3(not remove)
+                if len(subChunks[-1]['subChunks']) > 1 and inputChunk.masterDataset != None \
+                        and inputChunk.readBlock == True:
+                    subChunks[-1]['subChunks'] = subChunks[-1]['subChunks'][:-1]
+                # update counter
+                if self.liveCounter != None and not inputChunk.isMerging:
+                    if not workItem.lockCounter:
+                        tmpLog.debug('trying to lock counter')
+                        self.liveCounter.acquire()
+                        tmpLog.debug('locked counter')
+                        workItem.lockCounter = True
+                    for tmpSubChunk in subChunks:
+                        self.liveCounter.add(tmpSubChunk['siteName'],len(tmpSubChunk['subChunks']))
+                workItem.splitter = splitter
+                workItem.subChunks = subChunks
+            except:
+                errtype,errvalue = sys.exc_info()[:2]
+                tmpLog.error('splitter crashed with {0}:{1}'.format(errtype.__name__,errvalue))
+                tmpStat = Interaction.SC_FAILED
+            if tmpStat != Interaction.SC_SUCCEEDED:
+                tmpErrStr = 'splitting failed'
+                tmpLog.error(tmpErrStr)
+                taskSpec.setOnHold()
+                taskSpec.setErrDiag(tmpErrStr)
+                workItem.goForward = False
+        # release lock
+        self.releaseCounter(workItem)
+
+
+
+    # run job generator
+    def runGenerator(self,workItem):
+        taskSpec = workItem.taskSpec
+        tmpLog = workItem.tmpLog
+        # lock task
+        if workItem.goForward:
+            if not self.lockTask(workItem):
+                return
+        # generate jobs
+        if workItem.goForward:
+            tmpLog.debug('run job generator')
+            # reset map of buildSpec and compiled templates
+            self.buildSpecMap = {}
+            self.jobParamsTemplateMap = {}
+            try:
+                tmpStat,pandaJobs,datasetToRegister,oldPandaIDs,parallelOutMap,outDsMap = self.doGenerate(taskSpec,workItem.cloudName,
+                                                                                                          workItem.subChunks,
+                                                                                                          workItem.inputChunk,tmpLog,
+                                                                                                          taskParamMap=workItem.taskParamMap,
+                                                                                                          splitter=workItem.splitter)
+                workItem.pandaJobs = pandaJobs
+                workItem.datasetToRegister = datasetToRegister
+                workItem.oldPandaIDs = oldPandaIDs
+            except:
+                errtype,errvalue = sys.exc_info()[:2]
+                tmpLog.error('generator crashed with {0}:{1}'.format(errtype.__name__,errvalue))
+                tmpStat = Interaction.SC_FAILED
+            # return unused random seeds
+            if self.randomSeedAllocator != None:
+                self.randomSeedAllocator.release()
+                self.randomSeedAllocator = None
+            if tmpStat != Interaction.SC_SUCCEEDED:
+                tmpErrStr = 'job generation failed'
+                tmpLog.error(tmpErrStr)
+                taskSpec.setOnHold()
+                taskSpec.setErrDiag(tmpErrStr)
+                workItem.goForward = False
+
+
+
+    # setup task
+    def runSetupper(self,workItem):
+        taskSpec = workItem.taskSpec
+        tmpLog = workItem.tmpLog
+        # lock task
+        if workItem.goForward:
+            if not self.lockTask(workItem):
+                return
+        # setup task
+        if workItem.goForward:
+            tmpLog.debug('run setupper with {0}'.format(self.taskSetupper.getClassName(taskSpec.vo,
+                                                                                      taskSpec.prodSourceLabel)))
+            tmpStat = self.taskSetupper.doSetup(taskSpec,workItem.datasetToRegister,workItem.pandaJobs)
+            if tmpStat != Interaction.SC_SUCCEEDED:
+                tmpErrStr = 'failed to setup task'
+                tmpLog.error(tmpErrStr)
+                taskSpec.setOnHold()
+                taskSpec.setErrDiag(tmpErrStr,True)
+            else:
+                workItem.readyToSubmitJob = True
+                if taskSpec.toRegisterDatasets() and (not taskSpec.mergeOutput() or workItem.inputChunk.isMerging):
+                    taskSpec.registeredDatasets()
+
+
+
+    # submit jobs and update task
+    def runSubmission(self,workItem):
+        taskSpec = workItem.taskSpec
+        inputChunk = workItem.inputChunk
+        cloudName = workItem.cloudName
+        oldStatus = workItem.oldStatus
+        pandaJobs = workItem.pandaJobs
+        tmpLog = workItem.tmpLog
+        # lock task
+        if workItem.goForward:
+            if not self.lockTask(workItem):
+                return
+        # submit
+        if workItem.readyToSubmitJob:
+            # check if first submission
+            if oldStatus == 'ready' and inputChunk.useScout():
+                firstSubmission = True
+            else:
+                firstSubmission = False
+            # type of relation
+            if inputChunk.isMerging:
+                relationType = 'merge'
+            else:
+                relationType = 'retry'
+            # submit
+            fqans = taskSpec.makeFQANs()
+            tmpLog.info('submit njobs={0} jobs with FQAN={1}'.format(len(pandaJobs),','.join(str(fqan) for fqan in fqans)))
+            if self.submitAccumulator != None and workItem.oldPandaIDs != None \
+                    and not taskSpec.useEventService():
+                # submit together with jobs of other tasks. not for event service since the index
+                # in jobsetID headers is valid only within the jobs of a task
+                resSubmit = self.submitAccumulator.storeJobs(pandaJobs,taskSpec.userName,fqans,True,
+                                                             workItem.oldPandaIDs,relationType)
+            else:
+                resSubmit = self.taskBufferIF.storeJobs(pandaJobs,taskSpec.userName,
+                                                        fqans=fqans,toPending=True,
+                                                        oldPandaIDs=workItem.oldPandaIDs,
+                                                        relationType=relationType)
+            pandaIDs = []
+            for idxItem,items in enumerate(resSubmit):
+                if items[0] != 'NULL':
+                    pandaIDs.append(items[0])
+            # check if submission was successful
+            if len(pandaIDs) == len(pandaJobs):
+                tmpMsg = 'successfully submitted '
+                tmpMsg += 'jobs_submitted={0}/jobs_possible={1} for VO={2} cloud={3} queue={4} status={5} nucleus={6}'.format(len(pandaIDs),
+                                                                                                                              len(pandaJobs),
+                                                                                                                              taskSpec.vo,cloudName,
+                                                                                                                              self.workQueue.queue_name,
+                                                                                                                              oldStatus,
+                                                                                                                              taskSpec.nucleus)
+                if inputChunk.isMerging:
+                    tmpMsg += ' pmerge=Y'
+                else:
+                    tmpMsg += ' pmerge=N'
+                tmpLog.info(tmpMsg)
+                tmpLog.sendMsg(tmpMsg,self.msgType)
+                if self.execJobs:
+                    statExe,retExe = PandaClient.reassignJobs(pandaIDs,forPending=True,
+                                                              firstSubmission=firstSubmission)
+                    tmpLog.info('exec {0} jobs with status={1}'.format(len(pandaIDs),retExe))
+                if inputChunk.isMerging:
+                    # don't change task status by merging
+                    pass
+                elif taskSpec.usePrePro():
+                    taskSpec.status = 'preprocessing'
+                elif inputChunk.useScout():
+                    taskSpec.status = 'scouting'
+                else:
+                    taskSpec.status = 'running'
+                    # scout was skipped
+                    if taskSpec.useScout():
+                        taskSpec.setUseScout(False)
+            else:
+                tmpErrStr = 'submitted only {0}/{1}'.format(len(pandaIDs),len(pandaJobs))
+                tmpLog.error(tmpErrStr)
+                taskSpec.setOnHold()
+                taskSpec.setErrDiag(tmpErrStr)
+            # the number of generated jobs     
+            self.numGenJobs += len(pandaIDs)    
+        # lock task
+        if not self.lockTask(workItem):
+            return
+        # reset unused files
+        nFileReset = self.taskBufferIF.resetUnusedFiles_JEDI(taskSpec.jediTaskID,inputChunk)
+        # unset lockedBy when all inputs are done for a task
+        setOldModTime = False
+        if workItem.isLastInput:
+            taskSpec.lockedBy = None
+            taskSpec.lockedTime = None
+            if taskSpec.status == 'running' and nFileReset > 0 and taskSpec.currentPriority > 900:
+                setOldModTime = True
+        else:
+            taskSpec.lockedBy = self.pid
+            taskSpec.lockedTime = datetime.datetime.utcnow()
+        # update task
+        retDB = self.taskBufferIF.updateTask_JEDI(taskSpec,{'jediTaskID':taskSpec.jediTaskID},
+                                                  oldStatus=JediTaskSpec.statusForJobGenerator()+['pending'],
+                                                  setOldModTime=setOldModTime)
+        tmpMsg = 'set task.status={0} oldTask={2} with {1}'.format(taskSpec.status,str(retDB),setOldModTime)
+        tmpLog.info(tmpMsg)
+        if not taskSpec.errorDialog in ['',None]:
+            tmpMsg += ' ' + taskSpec.errorDialog
+        tmpLog.sendMsg(tmpMsg,self.msgType)
+        tmpLog.info(tmpMsg)
+        tmpLog.debug('done')
+
+
+
     # read task parameters
     def readTaskParams(self,taskSpec,taskParamMap,tmpLog):
         # already read
@@ -728,13 +1015,27 @@ class JobGeneratorThread (WorkerThread):
             totalNormalJobs = 0
             for tmpInChunk in inSubChunkList:
                 totalNormalJobs += len(tmpInChunk['subChunks'])
-            # loop over all sub chunks
+            # reserve random seeds for all jobs
+            if taskSpec.useRandomSeed() and not inputChunk.isMerging and totalNormalJobs > 1 and \
+                    hasattr(jedi_config.jobgen,'reserveRandomSeeds') and jedi_config.jobgen.reserveRandomSeeds == True:
+                self.randomSeedAllocator = RandomSeedAllocator(self.taskBufferIF,taskSpec.jediTaskID,simul)
+                if not self.randomSeedAllocator.reserve(totalNormalJobs):
+                    tmpLog.warning('failed to reserve random seeds. fall back to job-by-job')
+            # use bulk generation of output files
+            useBulkOutput = False
+            if hasattr(jedi_config.jobgen,'bulkOutputFiles') and jedi_config.jobgen.bulkOutputFiles == True \
+                    and totalNormalJobs > 1:
+                useBulkOutput = True
+            # loop over all sub chunks to make jobs without outputs
+            siteJobList = []
             for tmpInChunk in inSubChunkList:
                 siteName      = tmpInChunk['siteName']
                 inSubChunks   = tmpInChunk['subChunks']
                 siteCandidate = tmpInChunk['siteCandidate']
                 siteSpec      = self.siteMapper.getSite(siteName.split(',')[0])
                 buildFileSpec = None
+                preJobSpecList = []
+                preOldPandaIDs = []
                 # make preprocessing job
                 if taskSpec.usePrePro():
                     tmpStat,preproJobSpec,tmpToRegister = self.doGeneratePrePro(taskSpec,cloudName,siteName,siteSpec,
@@ -743,12 +1044,13 @@ class JobGeneratorThread (WorkerThread):
                         tmpLog.error('failed to generate prepro job')
                         return failedRet
                     # append
-                    jobSpecList.append(preproJobSpec)
-                    oldPandaIDs.append([])
+                    preJobSpecList.append(preproJobSpec)
+                    preOldPandaIDs.append([])
                     # append datasets
                     for tmpToRegisterItem in tmpToRegister:
                         if not tmpToRegisterItem in datasetToRegister:
                             datasetToRegister.append(tmpToRegisterItem)
+                    siteJobList.append((tmpInChunk,buildFileSpec,preJobSpecList,preOldPandaIDs,[]))
                     break
                 # make build job
                 elif taskSpec.useBuild():
@@ -759,14 +1061,14 @@ class JobGeneratorThread (WorkerThread):
                         return failedRet
                     # append
                     if buildJobSpec != None:
-                        jobSpecList.append(buildJobSpec)
-                        oldPandaIDs.append([])
+                        preJobSpecList.append(buildJobSpec)
+                        preOldPandaIDs.append([])
                     # append datasets
                     for tmpToRegisterItem in tmpToRegister:
                         if not tmpToRegisterItem in datasetToRegister:
                             datasetToRegister.append(tmpToRegisterItem)
                 # make normal jobs
-                tmpJobSpecList = []
+                normalJobList = []
                 for inSubChunk in inSubChunks:
                     subOldPandaIDs = []
                     jobSpec = JobSpec()
@@ -1125,44 +1427,85 @@ class JobGeneratorThread (WorkerThread):
                         except:
                             tmpLog.error('failed to get XML config for N={0}'.format(boundaryID))
                             return failedRet
+                    # keep job and parameters to get outputs
+                    outRequest = (provenanceID,instantiateTmpl,instantiatedSite,isUnMerging,xmlConfigJob,middleName)
+                    normalJobList.append((jobSpec,inSubChunk,subOldPandaIDs,outRequest))
+                    # incremet index of event service job
+                    if taskSpec.useEventService(siteSpec) and not inputChunk.isMerging:
+                        esIndex += 1
+                siteJobList.append((tmpInChunk,buildFileSpec,preJobSpecList,preOldPandaIDs,normalJobList))
+            # get outputs for all jobs in bulk
+            outRetList = None
+            if useBulkOutput:
+                outRequests = []
+                for tmpSiteItem in siteJobList:
+                    for tmpJobItem in tmpSiteItem[-1]:
+                        outRequests.append(tmpJobItem[-1])
+                outRetList,tmpToRegister,tmpSiteDsMap,tmpDsSpecMap = self.taskBufferIF.getOutputFilesBulk_JEDI(taskSpec.jediTaskID,
+                                                                                                               outRequests,
+                                                                                                               simul,
+                                                                                                               copy.deepcopy(siteDsMap),
+                                                                                                               registerDatasets)
+                if outRetList == None:
+                    tmpLog.warning('failed to get OutputFiles in bulk. fall back to job-by-job')
+                else:
+                    siteDsMap = tmpSiteDsMap
+                    outDsMap.update(tmpDsSpecMap)
+                    for tmpToRegisterItem in tmpToRegister:
+                        if not tmpToRegisterItem in datasetToRegister:
+                            datasetToRegister.append(tmpToRegisterItem)
+            # loop over all sub chunks to set outputs
+            iOutRet = 0
+            for tmpInChunk,buildFileSpec,preJobSpecList,preOldPandaIDs,normalJobList in siteJobList:
+                siteName      = tmpInChunk['siteName']
+                siteSpec      = self.siteMapper.getSite(siteName.split(',')[0])
+                jobSpecList  += preJobSpecList
+                oldPandaIDs  += preOldPandaIDs
+                tmpJobSpecList = []
+                for jobSpec,inSubChunk,subOldPandaIDs,outRequest in normalJobList:
+                    provenanceID,instantiateTmpl,instantiatedSite,isUnMerging,xmlConfigJob,middleName = outRequest
                     # outputs
-                    outSubChunk,serialNr,tmpToRegister,siteDsMap,tmpParOutMap = self.taskBufferIF.getOutputFiles_JEDI(taskSpec.jediTaskID,
-                                                                                                                      provenanceID,
-                                                                                                                      simul,
-                                                                                                                      instantiateTmpl,
-                                                                                                                      instantiatedSite,
-                                                                                                                      isUnMerging,
-                                                                                                                      False,
-                                                                                                                      xmlConfigJob,
-                                                                                                                      siteDsMap,
-                                                                                                                      middleName,
-                                                                                                                      registerDatasets,
-                                                                                                                      None,
-                                                                                                                      fileIDPool)
-                    if outSubChunk == None:
-                        # failed
-                        tmpLog.error('failed to get OutputFiles')
-                        return failedRet
-                    # number of outputs per job
-                    if not simul:
-                        if nOutputs == None:
-                            nOutputs = len(outSubChunk)
-                            # bulk fetch fileIDs
-                            if totalNormalJobs > 1:
-                                fileIDPool = self.taskBufferIF.bulkFetchFileIDs_JEDI(taskSpec.jediTaskID,nOutputs*(totalNormalJobs-1))
-                        else:
-                            try:
-                                fileIDPool = fileIDPool[nOutputs:]
-                            except:
-                                fileIDPool = []
+                    if outRetList != None:
+                        outSubChunk,serialNr,tmpParOutMap = outRetList[iOutRet]
+                        iOutRet += 1
+                    else:
+                        outSubChunk,serialNr,tmpToRegister,siteDsMap,tmpParOutMap = self.taskBufferIF.getOutputFiles_JEDI(taskSpec.jediTaskID,
+                                                                                                                          provenanceID,
+                                                                                                                          simul,
+                                                                                                                          instantiateTmpl,
+                                                                                                                          instantiatedSite,
+                                                                                                                          isUnMerging,
+                                                                                                                          False,
+                                                                                                                          xmlConfigJob,
+                                                                                                                          siteDsMap,
+                                                                                                                          middleName,
+                                                                                                                          registerDatasets,
+                                                                                                                          None,
+                                                                                                                          fileIDPool)
+                        if outSubChunk == None:
+                            # failed
+                            tmpLog.error('failed to get OutputFiles')
+                            return failedRet
+                        # number of outputs per job
+                        if not simul:
+                            if nOutputs == None:
+                                nOutputs = len(outSubChunk)
+                                # bulk fetch fileIDs
+                                if totalNormalJobs > 1:
+                                    fileIDPool = self.taskBufferIF.bulkFetchFileIDs_JEDI(taskSpec.jediTaskID,nOutputs*(totalNormalJobs-1))
+                            else:
+                                try:
+                                    fileIDPool = fileIDPool[nOutputs:]
+                                except:
+                                    fileIDPool = []
+                        for tmpToRegisterItem in tmpToRegister:
+                            if not tmpToRegisterItem in datasetToRegister:
+                                datasetToRegister.append(tmpToRegisterItem)
                     # update parallel output mapping
                     for tmpParFileID,tmpParFileList in tmpParOutMap.iteritems():
                         if not tmpParFileID in parallelOutMap:
                             parallelOutMap[tmpParFileID] = []
                         parallelOutMap[tmpParFileID] += tmpParFileList
-                    for tmpToRegisterItem in tmpToRegister:
-                        if not tmpToRegisterItem in datasetToRegister:
-                            datasetToRegister.append(tmpToRegisterItem)
                     destinationDBlock = None
                     for tmpFileSpec in outSubChunk.values():
                         # get dataset
@@ -1234,9 +1577,6 @@ class JobGeneratorThread (WorkerThread):
                     # add
                     tmpJobSpecList.append(jobSpec)
                     oldPandaIDs.append(subOldPandaIDs)
-                    # incremet index of event service job
-                    if taskSpec.useEventService(siteSpec) and not inputChunk.isMerging:
-                        esIndex += 1
                     # lock task
                     if not simul and len(jobSpecList+tmpJobSpecList) % 50 == 0:
                         self.taskBufferIF.lockTask_JEDI(taskSpec.jediTaskID,self.pid)
@@ -1510,6 +1850,20 @@ class JobGeneratorThread (WorkerThread):
     # make job parameters
     def makeJobParameters(self,taskSpec,inSubChunk,outSubChunk,serialNr,paramList,jobSpec,simul,
                           taskParamMap,isMerging,jobFileList,useEventService):
+        compiledTemplate,renderArgs = self.prepareJobParameters(taskSpec,inSubChunk,outSubChunk,serialNr,paramList,
+                                                                jobSpec,simul,taskParamMap,isMerging,jobFileList,
+                                                                useEventService)
+        parTemplate,popIndexList = JobGeneratorThread.renderJobParameters(compiledTemplate,*renderArgs)
+        # remove job files
+        for tmpFileIdx in popIndexList:
+            jobFileList.pop(tmpFileIdx)
+        return parTemplate
+
+
+
+    # collect parameters to render job parameters. random seed is taken here since it needs DB access
+    def prepareJobParameters(self,taskSpec,inSubChunk,outSubChunk,serialNr,paramList,jobSpec,simul,
+                             taskParamMap,isMerging,jobFileList,useEventService):
         if not isMerging:
             parTemplate = taskSpec.jobParamsTemplate
         else:
@@ -1530,7 +1884,10 @@ class JobGeneratorThread (WorkerThread):
             sourceURL = taskParamMap['sourceURL']
         # get random seed
         if taskSpec.useRandomSeed() and not isMerging:
-            tmpStat,randomSpecList = self.taskBufferIF.getRandomSeed_JEDI(taskSpec.jediTaskID,simul)
+            if self.randomSeedAllocator != None:
+                tmpStat,randomSpecList = self.randomSeedAllocator.get()
+            else:
+                tmpStat,randomSpecList = self.taskBufferIF.getRandomSeed_JEDI(taskSpec.jediTaskID,simul)
             if tmpStat == True:
                 tmpRandomFileSpec,tmpRandomDatasetSpec = randomSpecList 
                 if tmpRandomFileSpec!= None:
@@ -1583,20 +1940,42 @@ class JobGeneratorThread (WorkerThread):
         # output
         for streamName,tmpFileSpec in outSubChunk.iteritems():
             streamLFNsMap[streamName] = [tmpFileSpec.lfn]
+        # compile template
+        if not parTemplate in self.jobParamsTemplateMap:
+            self.jobParamsTemplateMap[parTemplate] = self.compileJobParamsTemplate(parTemplate)
+        compiledTemplate = self.jobParamsTemplateMap[parTemplate]
+        # parameters for numbers
+        numParamList = [('SN',         serialNr),
+                        ('SN/P',       '{0:06d}'.format(serialNr)),
+                        ('RNDMSEED',   rndmSeed),
+                        ('MAXEVENTS',  maxEvents),
+                        ('SKIPEVENTS', skipEvents),
+                        ('FIRSTEVENT', firstEvent),
+                        ('SURL',       sourceURL),
+                        ] + paramList
+        # LFNs and flags for unmerged outputs of job files
+        jobFileInfoList = []
+        for tmpJobFileSpec in jobFileList:
+            jobFileInfoList.append((tmpJobFileSpec.lfn,tmpJobFileSpec.isUnMergedOutput()))
+        return compiledTemplate,(streamLFNsMap,streamDsMap,numParamList,jobFileInfoList,isMerging,useEventService)
+
+
+
+    # render job parameters with compiled template.
+    # indexes of job files to be removed are returned together
+    @staticmethod
+    def renderJobParameters(compiledTemplate,streamLFNsMap,streamDsMap,numParamList,jobFileInfoList,isMerging,
+                            useEventService):
+        jobFileInfoList = list(jobFileInfoList)
+        popIndexList = []
         # extract place holders with range expression, e.g., IN[0:2] 
-        for tmpMatch in re.finditer('\$\{([^\}]+)\}',parTemplate):
-            tmpPatt = tmpMatch.group(1)
-            # split to stream name and range expression
-            tmpStRaMatch = re.search('([^\[]+)(.*)',tmpPatt)
-            if tmpStRaMatch != None:
-                tmpStream = tmpStRaMatch.group(1)
-                tmpRange  = tmpStRaMatch.group(2)
-                if tmpPatt != tmpStream and streamLFNsMap.has_key(tmpStream):
-                    try:
-                        exec "streamLFNsMap['{0}']=streamLFNsMap['{1}']{2}".format(tmpPatt,tmpStream,
-                                                                                   tmpRange)
-                    except:
-                        pass
+        for tmpPatt,tmpStream,tmpRange in compiledTemplate['ranges']:
+            if streamLFNsMap.has_key(tmpStream):
+                try:
+                    exec "streamLFNsMap['{0}']=streamLFNsMap['{1}']{2}".format(tmpPatt,tmpStream,
+                                                                               tmpRange)
+                except:
+                    pass
         # loop over all streams to collect transient and final steams
         transientStreamCombo = {}
         streamToDelete = {}
@@ -1620,98 +1999,22 @@ class JobGeneratorThread (WorkerThread):
                 del streamLFNsMap[streamName]
             except:
                 pass
-        # loop over all place holders
-        for tmpMatch in re.finditer('\$\{([^\}]+)\}',parTemplate):
-            placeHolder = tmpMatch.group(1)
-            # remove decorators
-            streamNames = placeHolder.split('/')[0]
-            streamNameList = streamNames.split(',')
-            listLFN = []
-            for streamName in streamNameList:
-                if streamName in streamLFNsMap:
-                    listLFN += streamLFNsMap[streamName] 
-            if listLFN != []:
-                decorators = re.sub('^'+streamNames,'',placeHolder)
-                # long format
-                if '/L' in decorators:
-                    longLFNs = ''
-                    for tmpLFN in listLFN:
-                        if '/A' in decorators:
-                            longLFNs += "'"
-                        longLFNs += tmpLFN
-                        if '/A' in decorators:
-                            longLFNs += "'"
-                        if '/S' in decorators:
-                            # use white-space as separator
-                            longLFNs += ' '
-                        else:
-                            longLFNs += ','
-                    longLFNs = longLFNs[:-1]
-                    parTemplate = parTemplate.replace('${'+placeHolder+'}',longLFNs)
-                    continue
-                # list to string
-                if '/T' in decorators:
-                    parTemplate = parTemplate.replace('${'+placeHolder+'}',str(listLFN))
-                    continue
-                # write to file
-                if '/F' in decorators:
-                    parTemplate = parTemplate.replace('${'+placeHolder+'}','tmpin_'+streamDsMap[streamName])
-                # single file
-                if len(listLFN) == 1:
-                    # just replace with the original file name
-                    replaceStr = listLFN[0]
-                    parTemplate = parTemplate.replace('${'+streamNames+'}',replaceStr)
-                    # encoded    
-                    encStreamName = streamNames+'/E'
-                    replaceStr = urllib.unquote(replaceStr)
-                    parTemplate = parTemplate.replace('${'+encStreamName+'}',replaceStr)
-                else:
-                    # compact format
-                    compactLFNs = []
-                    # remove attempt numbers
-                    fullLFNList = ''
-                    for tmpLFN in listLFN:
-                        # keep full LFNs
-                        fullLFNList += '%s,' % tmpLFN
-                        compactLFNs.append(re.sub('\.\d+$','',tmpLFN))
-                    fullLFNList = fullLFNList[:-1]
-                    # find head and tail to convert file.1.pool,file.2.pool,file.4.pool to file.[1,2,4].pool
-                    tmpHead = ''
-                    tmpTail = ''
-                    tmpLFN0 = compactLFNs[0]
-                    tmpLFN1 = compactLFNs[1]
-                    for i in range(len(tmpLFN0)):
-                        match = re.search('^(%s)' % tmpLFN0[:i],tmpLFN1)
-                        if match:
-                            tmpHead = match.group(1)
-                        match = re.search('(%s)$' % tmpLFN0[-i:],tmpLFN1)
-                        if match:
-                            tmpTail = match.group(1)
-                    # remove numbers : ABC_00,00_XYZ -> ABC_,_XYZ
-                    tmpHead = re.sub('\d*$','',tmpHead)
-                    tmpTail = re.sub('^\d*','',tmpTail)
-                    # create compact paramter
-                    compactPar = '%s[' % tmpHead
-                    for tmpLFN in compactLFNs:
-                        # extract number
-                        tmpLFN = re.sub('^%s' % tmpHead,'',tmpLFN)
-                        tmpLFN = re.sub('%s$' % tmpTail,'',tmpLFN)
-                        compactPar += '%s,' % tmpLFN
-                    compactPar = compactPar[:-1]
-                    compactPar += ']%s' % tmpTail
-                    # check contents in []
-                    conMatch = re.search('\[([^\]]+)\]',compactPar)
-                    if conMatch != None and re.search('^[\d,]+$',conMatch.group(1)) != None:
-                        # replace with compact format
-                        replaceStr = compactPar
-                    else:
-                        # replace with full format since [] contains non digits
-                        replaceStr = fullLFNList
-                    parTemplate = parTemplate.replace('${'+streamNames+'}',replaceStr)
-                    # encoded    
-                    encStreamName = streamNames+'/E'
-                    replaceStr = urllib.unquote(fullLFNList)
-                    parTemplate = parTemplate.replace('${'+encStreamName+'}',replaceStr)
+        # replace place holders in one pass
+        tmpStrList = []
+        replaceStrMap = {}
+        for tmpSegment in compiledTemplate['segments']:
+            if not isinstance(tmpSegment,tuple):
+                tmpStrList.append(tmpSegment)
+                continue
+            placeHolder = tmpSegment[0]
+            if not placeHolder in replaceStrMap:
+                replaceStrMap[placeHolder] = JobGeneratorThread.makeStreamParam(tmpSegment,streamLFNsMap,streamDsMap)
+            if replaceStrMap[placeHolder] == None:
+                # leave as it is
+                tmpStrList.append('${'+placeHolder+'}')
+            else:
+                tmpStrList.append(replaceStrMap[placeHolder])
+        parTemplate = ''.join(tmpStrList)
         # replace params related to transient files
         replaceStrMap = {}
         emptyStreamMap = {}
@@ -1744,9 +2047,10 @@ class JobGeneratorThread (WorkerThread):
                 # remove outputs with empty input files
                 for emptyStream in emptyStreamMap[streamNameBase]:
                     tmpFileIdx = 0
-                    for tmpJobFileSpec in jobFileList:
-                        if tmpJobFileSpec.lfn in streamLFNsMap[emptyStream]:
-                            jobFileList.pop(tmpFileIdx)
+                    for tmpLFN,tmpIsUnMerged in jobFileInfoList:
+                        if tmpLFN in streamLFNsMap[emptyStream]:
+                            jobFileInfoList.pop(tmpFileIdx)
+                            popIndexList.append(tmpFileIdx)
                             break
                         tmpFileIdx += 1
         # remove outputs and params for deleted streams
@@ -1757,30 +2061,24 @@ class JobGeneratorThread (WorkerThread):
             if deletedLFNs == []:
                 continue
             tmpFileIdx = 0
-            for tmpJobFileSpec in jobFileList:
-                if tmpJobFileSpec.lfn in deletedLFNs:
-                    jobFileList.pop(tmpFileIdx)
+            for tmpLFN,tmpIsUnMerged in jobFileInfoList:
+                if tmpLFN in deletedLFNs:
+                    jobFileInfoList.pop(tmpFileIdx)
+                    popIndexList.append(tmpFileIdx)
                     break
                 tmpFileIdx += 1
         # replace placeholders for numbers
-        for streamName,parVal in [('SN',         serialNr),
-                                  ('SN/P',       '{0:06d}'.format(serialNr)),
-                                  ('RNDMSEED',   rndmSeed),
-                                  ('MAXEVENTS',  maxEvents),
-                                  ('SKIPEVENTS', skipEvents),
-                                  ('FIRSTEVENT', firstEvent),
-                                  ('SURL',       sourceURL),
-                                  ] + paramList:
-            # ignore undefined
-            if parVal == None:
+        for streamName,parVal in numParamList:
+            # ignore undefined or unused
+            if parVal == None or not streamName in compiledTemplate['names']:
                 continue
             # replace
             parTemplate = parTemplate.replace('${'+streamName+'}',str(parVal))
         # replace unmerge files
-        for jobFileSpec in jobFileList:
-            if jobFileSpec.isUnMergedOutput():
-                mergedFileName = re.sub('^panda\.um\.','',jobFileSpec.lfn)
-                parTemplate = parTemplate.replace(mergedFileName,jobFileSpec.lfn)
+        for tmpLFN,tmpIsUnMerged in jobFileInfoList:
+            if tmpIsUnMerged:
+                mergedFileName = re.sub('^panda\.um\.','',tmpLFN)
+                parTemplate = parTemplate.replace(mergedFileName,tmpLFN)
         # remove duplicated panda.um
         parTemplate = parTemplate.replace('panda.um.panda.um.','panda.um.')
         # remove ES parameters if necessary
@@ -1791,7 +2089,175 @@ class JobGeneratorThread (WorkerThread):
             parTemplate = re.sub('<PANDA_ES_ONLY>[^<]*</PANDA_ES_ONLY>','',parTemplate)
             parTemplate = re.sub('<PANDA_ESMERGE.*>[^<]*</PANDA_ESMERGE.*>','',parTemplate)
         # return
-        return parTemplate
+        return parTemplate,popIndexList
+
+
+
+    # compile job parameter template to a list of literal strings and place holders
+    @staticmethod
+    def compileJobParamsTemplate(parTemplate):
+        segments = []
+        ranges = []
+        names = set()
+        tmpIdx = 0
+        for tmpMatch in re.finditer('\$\{([^\}]+)\}',parTemplate):
+            placeHolder = tmpMatch.group(1)
+            names.add(placeHolder)
+            # literal string
+            if tmpMatch.start() > tmpIdx:
+                segments.append(parTemplate[tmpIdx:tmpMatch.start()])
+            tmpIdx = tmpMatch.end()
+            # split to stream name and range expression
+            tmpStRaMatch = re.search('([^\[]+)(.*)',placeHolder)
+            if tmpStRaMatch != None:
+                tmpStream = tmpStRaMatch.group(1)
+                tmpRange  = tmpStRaMatch.group(2)
+                if placeHolder != tmpStream and not (placeHolder,tmpStream,tmpRange) in ranges:
+                    ranges.append((placeHolder,tmpStream,tmpRange))
+            # remove decorators
+            streamNames = placeHolder.split('/')[0]
+            decorators = re.sub('^'+streamNames,'',placeHolder)
+            segments.append((placeHolder,streamNames,streamNames.split(','),decorators))
+        if tmpIdx < len(parTemplate):
+            segments.append(parTemplate[tmpIdx:])
+        return {'segments':segments,
+                'ranges':ranges,
+                'names':names}
+
+
+
+    # make parameter for a place holder of streams. None is returned if the place holder is not replaced
+    @staticmethod
+    def makeStreamParam(placeHolderItem,streamLFNsMap,streamDsMap):
+        placeHolder,streamNames,streamNameList,decorators = placeHolderItem
+        listLFN = []
+        for streamName in streamNameList:
+            if streamName in streamLFNsMap:
+                listLFN += streamLFNsMap[streamName] 
+        if listLFN == []:
+            return None
+        # long format
+        if '/L' in decorators:
+            longLFNs = ''
+            for tmpLFN in listLFN:
+                if '/A' in decorators:
+                    longLFNs += "'"
+                longLFNs += tmpLFN
+                if '/A' in decorators:
+                    longLFNs += "'"
+                if '/S' in decorators:
+                    # use white-space as separator
+                    longLFNs += ' '
+                else:
+                    longLFNs += ','
+            longLFNs = longLFNs[:-1]
+            return longLFNs
+        # list to string
+        if '/T' in decorators:
+            return str(listLFN)
+        # write to file
+        if '/F' in decorators:
+            return 'tmpin_'+streamDsMap[streamName]
+        # single file
+        if len(listLFN) == 1:
+            # just replace with the original file name
+            if placeHolder == streamNames:
+                return listLFN[0]
+            # encoded
+            if placeHolder == streamNames+'/E':
+                return urllib.unquote(listLFN[0])
+            return None
+        # compact format
+        if placeHolder == streamNames:
+            return JobGeneratorThread.makeCompactLFNs(listLFN)
+        # encoded
+        if placeHolder == streamNames+'/E':
+            return urllib.unquote(','.join(listLFN))
+        return None
+
+
+
+    # make compact format of LFNs, e.g., file.1.pool,file.2.pool,file.4.pool to file.[1,2,4].pool
+    @staticmethod
+    def makeCompactLFNs(listLFN):
+        compactLFNs = []
+        # remove attempt numbers
+        fullLFNList = ''
+        for tmpLFN in listLFN:
+            # keep full LFNs
+            fullLFNList += '%s,' % tmpLFN
+            compactLFNs.append(re.sub('\.\d+$','',tmpLFN))
+        fullLFNList = fullLFNList[:-1]
+        # find head and tail
+        tmpHead = ''
+        tmpTail = ''
+        tmpLFN0 = compactLFNs[0]
+        tmpLFN1 = compactLFNs[1]
+        useRegex = False
+        for tmpLFN in compactLFNs:
+            if re.search('[\\^$*+?{}\[\]()|\n]',tmpLFN) != None:
+                useRegex = True
+                break
+        if useRegex:
+            # LFNs with special characters for regex
+            for i in range(len(tmpLFN0)):
+                match = re.search('^(%s)' % tmpLFN0[:i],tmpLFN1)
+                if match:
+                    tmpHead = match.group(1)
+                match = re.search('(%s)$' % tmpLFN0[-i:],tmpLFN1)
+                if match:
+                    tmpTail = match.group(1)
+        else:
+            # linear scan where . in LFNs matches any character as in the regex
+            nMax = min(len(tmpLFN0),len(tmpLFN1))
+            nHead = 0
+            while nHead < nMax and (tmpLFN0[nHead] == tmpLFN1[nHead] or tmpLFN0[nHead] == '.'):
+                nHead += 1
+            tmpHead = tmpLFN1[:max(min(nHead,len(tmpLFN0)-1),0)]
+            nTail = 0
+            while nTail < nMax and (tmpLFN0[-nTail-1] == tmpLFN1[-nTail-1] or tmpLFN0[-nTail-1] == '.'):
+                nTail += 1
+            if min(nTail,len(tmpLFN0)-1) > 0:
+                tmpTail = tmpLFN1[len(tmpLFN1)-min(nTail,len(tmpLFN0)-1):]
+            elif len(tmpLFN0) > 0 and nTail >= len(tmpLFN0):
+                tmpTail = tmpLFN1[len(tmpLFN1)-len(tmpLFN0):]
+        # remove numbers : ABC_00,00_XYZ -> ABC_,_XYZ
+        tmpHead = re.sub('\d*$','',tmpHead)
+        tmpTail = re.sub('^\d*','',tmpTail)
+        # create compact paramter
+        compactPar = '%s[' % tmpHead
+        for tmpLFN in compactLFNs:
+            # extract number
+            if useRegex:
+                tmpLFN = re.sub('^%s' % tmpHead,'',tmpLFN)
+                tmpLFN = re.sub('%s$' % tmpTail,'',tmpLFN)
+            else:
+                if JobGeneratorThread.matchWithDot(tmpHead,tmpLFN[:len(tmpHead)]):
+                    tmpLFN = tmpLFN[len(tmpHead):]
+                if tmpTail != '' and JobGeneratorThread.matchWithDot(tmpTail,tmpLFN[len(tmpLFN)-len(tmpTail):]):
+                    tmpLFN = tmpLFN[:len(tmpLFN)-len(tmpTail)]
+            compactPar += '%s,' % tmpLFN
+        compactPar = compactPar[:-1]
+        compactPar += ']%s' % tmpTail
+        # check contents in []
+        conMatch = re.search('\[([^\]]+)\]',compactPar)
+        if conMatch != None and re.search('^[\d,]+$',conMatch.group(1)) != None:
+            # replace with compact format
+            return compactPar
+        # replace with full format since [] contains non digits
+        return fullLFNList
+
+
+
+    # check if a string matches a pattern where . matches any character
+    @staticmethod
+    def matchWithDot(pattern,tmpStr):
+        if len(pattern) != len(tmpStr):
+            return False
+        for tmpP,tmpC in zip(pattern,tmpStr):
+            if tmpP != tmpC and tmpP != '.':
+                return False
+        return True
 
 
 
@@ -1967,6 +2433,371 @@ class JobGeneratorThread (WorkerThread):
         return largestRamCount
 
 
+
+# thread to generate jobs for a pair of cloud and work queue
+class JobGeneratorUnitThread (threading.Thread):
+
+    # constructor
+    def __init__(self,jobGenerator,unitSemaphore,unitPool,unitArgs):
+        threading.Thread.__init__(self)
+        self.jobGenerator = jobGenerator
+        self.unitSemaphore = unitSemaphore
+        self.unitPool = unitPool
+        self.unitPool.add(self)
+        self.unitArgs = unitArgs
+
+
+    # main
+    def run(self):
+        vo,prodSourceLabel,cloudName,workQueue,siteMapper,throttle,taskSetupper,\
+            globalThreadPool,workerBudget = self.unitArgs
+        tmpLog = MsgWrapper(logger,'<cloud={0} queue={1}>'.format(cloudName,workQueue.queue_name))
+        try:
+            # throttle per unit since it keeps results as attributes
+            throttle = JobThrottler(self.jobGenerator.vos,self.jobGenerator.prodSourceLabels)
+            throttle.initializeSharedMods(self.jobGenerator.taskBufferIF)
+            self.jobGenerator.runUnit(vo,prodSourceLabel,cloudName,workQueue,siteMapper,throttle,taskSetupper,
+                                      globalThreadPool,workerBudget,tmpLog)
+        except:
+            errtype,errvalue = sys.exc_info()[:2]
+            tmpLog.error('failed with {0}:{1} {2}'.format(errtype.__name__,errvalue,traceback.format_exc()))
+            # unlock
+            try:
+                self.jobGenerator.taskBufferIF.unlockProcess_JEDI(vo,prodSourceLabel,cloudName,workQueue.queue_id,
+                                                                  self.jobGenerator.pid)
+            except:
+                pass
+        self.unitPool.remove(self)
+        self.unitSemaphore.release()
+
+
+
+# input chunk and intermediate results passed through stages of job generation
+class JobGeneratorWorkItem:
+
+    # constructor
+    def __init__(self,taskSpec,cloudName,inputChunk,isLastInput):
+        self.taskSpec          = taskSpec
+        self.cloudName         = cloudName
+        self.inputChunk        = inputChunk
+        self.isLastInput       = isLastInput
+        self.oldStatus         = taskSpec.status
+        self.tmpLog            = None
+        self.goForward         = True
+        self.skipped           = False
+        self.lockCounter       = False
+        self.taskParamMap      = None
+        self.splitter          = None
+        self.subChunks         = None
+        self.pandaJobs         = None
+        self.datasetToRegister = None
+        self.oldPandaIDs       = None
+        self.readyToSubmitJob  = False
+
+
+
+# allocator to hand out random seeds reserved for a task in bulk
+class RandomSeedAllocator:
+
+    # constructor
+    def __init__(self,taskBufferIF,jediTaskID,simul):
+        self.taskBufferIF = taskBufferIF
+        self.jediTaskID = jediTaskID
+        self.simul = simul
+        self.reserved = False
+        self.fileSpecList = []
+        self.datasetSpec = None
+
+
+    # reserve random seeds
+    def reserve(self,nSeeds):
+        tmpStat,(fileSpecList,datasetSpec) = self.taskBufferIF.reserveRandomSeeds_JEDI(self.jediTaskID,nSeeds,self.simul)
+        if tmpStat != True:
+            return False
+        self.reserved = True
+        self.datasetSpec = datasetSpec
+        if fileSpecList != None:
+            self.fileSpecList = fileSpecList
+        return True
+
+
+    # get a random seed in the same format as getRandomSeed_JEDI
+    def get(self):
+        # no random seed for the task
+        if self.reserved and self.datasetSpec == None:
+            return True,(None,None)
+        # ran out of reserved seeds
+        if len(self.fileSpecList) == 0:
+            return self.taskBufferIF.getRandomSeed_JEDI(self.jediTaskID,self.simul)
+        return True,(self.fileSpecList.pop(0),self.datasetSpec)
+
+
+    # return unused random seeds
+    def release(self):
+        fileIDs = []
+        for tmpFileSpec in self.fileSpecList:
+            if tmpFileSpec.fileID != None:
+                fileIDs.append(tmpFileSpec.fileID)
+        if len(fileIDs) > 0:
+            self.taskBufferIF.releaseRandomSeeds_JEDI(self.jediTaskID,self.datasetSpec.datasetID,fileIDs)
+        self.fileSpecList = []
+
+
+
+# stages of job generation joined by bounded queues
+class JobGeneratorPipeline:
+
+    # constructor. stageWorkers is a map of stage name and the number of workers. fusedStages is a list
+    # of consecutive stage names which run in one stage with the max number of workers among them
+    def __init__(self,vo,stageWorkers,queueSize,fusedStages=None):
+        self.vo = vo
+        self.lock = threading.Lock()
+        if fusedStages == None:
+            fusedStages = []
+        # list of stage names and methods in each stage
+        self.stageList = []
+        for stageName,methodName in JobGeneratorThread.stageList:
+            if self.stageList != [] and self.isFused(fusedStages,self.stageList[-1][0].split('+')[-1],stageName):
+                self.stageList[-1][0] += '+' + stageName
+                self.stageList[-1][1].append(methodName)
+            else:
+                self.stageList.append([stageName,[methodName]])
+        self.stageNames = [stageName for stageName,methodNameList in self.stageList]
+        self.nWorkers = []
+        self.queues = []
+        self.statMap = {}
+        for stageName in self.stageNames:
+            nWorker = max([stageWorkers.get(tmpName,1) for tmpName in stageName.split('+')] + [1])
+            self.nWorkers.append(nWorker)
+            # one queue per worker so that inputs of a task are processed in order by the same worker
+            self.queues.append([Queue.Queue(queueSize) for i in range(nWorker)])
+            self.statMap[stageName] = {'nItems':0,'exec':0.0,'inputWait':0.0,'outputWait':0.0,'maxQueue':0}
+        self.nActive = list(self.nWorkers)
+
+
+    # check if two stages are fused
+    @staticmethod
+    def isFused(fusedStages,stageName,nextStageName):
+        for tmpStages in fusedStages:
+            if stageName in tmpStages and nextStageName in tmpStages:
+                return True
+        return False
+
+
+    # parse config like broker:2,split:2,generate:4,setup:2,store:2
+    @staticmethod
+    def parseStageConfig(configStr):
+        stageWorkers = {}
+        for item in configStr.split(','):
+            item = item.strip()
+            if item == '':
+                continue
+            stageName,nWorker = item.split(':')
+            stageWorkers[stageName.strip()] = int(nWorker)
+        return stageWorkers
+
+
+    # record statistics
+    def record(self,stageIndex,metric,value):
+        stageName = self.stageNames[stageIndex]
+        self.lock.acquire()
+        try:
+            tmpStat = self.statMap[stageName]
+            if metric == 'queueSize':
+                tmpStat['maxQueue'] = max(tmpStat['maxQueue'],value)
+            else:
+                tmpStat[metric] += value
+                if metric == 'exec':
+                    tmpStat['nItems'] += 1
+        finally:
+            self.lock.release()
+        stats.record(self.vo,'JobGenerator',stageName,metric,value)
+
+
+    # get a work item for a worker in a stage. None is returned when upstream stages are done
+    def getItem(self,stageIndex,workerIndex):
+        startTime = time.time()
+        workItem = self.queues[stageIndex][workerIndex].get()
+        self.record(stageIndex,'inputWait',time.time()-startTime)
+        return workItem
+
+
+    # pass a work item to the next stage. time blocked by the full queue is recorded as back-pressure
+    def putItem(self,stageIndex,workItem):
+        nextIndex = stageIndex + 1
+        tmpQueue = self.queues[nextIndex][workItem.taskSpec.jediTaskID % self.nWorkers[nextIndex]]
+        startTime = time.time()
+        tmpQueue.put(workItem)
+        self.record(stageIndex,'outputWait',time.time()-startTime)
+        self.record(nextIndex,'queueSize',tmpQueue.qsize())
+
+
+    # notify that a worker finished. workers in the next stage are terminated once all workers are done
+    def finishWorker(self,stageIndex):
+        self.lock.acquire()
+        try:
+            self.nActive[stageIndex] -= 1
+            allDone = self.nActive[stageIndex] == 0
+        finally:
+            self.lock.release()
+        if allDone and stageIndex+1 < len(self.stageNames):
+            for tmpQueue in self.queues[stageIndex+1]:
+                tmpQueue.put(None)
+
+
+    # dump statistics
+    def dump(self):
+        retStr = ''
+        for stageIndex,stageName in enumerate(self.stageNames):
+            tmpStat = self.statMap[stageName]
+            retStr += '{0}(nWorkers={1} nItems={2} exec={3:.1f}s inputWait={4:.1f}s outputWait={5:.1f}s maxQueue={6}) '.format(stageName,
+                                                                                                                          self.nWorkers[stageIndex],
+                                                                                                                          tmpStat['nItems'],
+                                                                                                                          tmpStat['exec'],
+                                                                                                                          tmpStat['inputWait'],
+                                                                                                                          tmpStat['outputWait'],
+                                                                                                                          tmpStat['maxQueue'])
+        return retStr[:-1]
+
+
+
+# accumulator to submit jobs of multiple tasks in bulk
+class SubmissionAccumulator:
+
+    # constructor. jobs are flushed when maxJobs are accumulated or maxWait sec passed
+    def __init__(self,taskBufferIF,maxJobs,maxWait):
+        self.taskBufferIF = taskBufferIF
+        self.maxJobs = maxJobs
+        self.maxWait = maxWait
+        self.cond = threading.Condition()
+        self.groupMap = {}
+
+
+    # submit jobs. blocks until jobs are flushed and returns results only for the jobs
+    def storeJobs(self,pandaJobs,userName,fqans,toPending,oldPandaIDs,relationType):
+        key = (userName,tuple(fqans),toPending,relationType)
+        entry = {'jobs':pandaJobs,
+                 'oldPandaIDs':oldPandaIDs,
+                 'done':False,
+                 'result':None,
+                 'excInfo':None}
+        self.cond.acquire()
+        try:
+            if not key in self.groupMap:
+                self.groupMap[key] = {'entries':[],'nJobs':0,'startTime':time.time()}
+            group = self.groupMap[key]
+            group['entries'].append(entry)
+            group['nJobs'] += len(pandaJobs)
+            while not entry['done']:
+                if self.groupMap.get(key) is group:
+                    timeLeft = group['startTime'] + self.maxWait - time.time()
+                    if group['nJobs'] >= self.maxJobs or timeLeft <= 0:
+                        # flush the group by this thread
+                        del self.groupMap[key]
+                        self.cond.release()
+                        try:
+                            self.flush(key,group)
+                        finally:
+                            self.cond.acquire()
+                            for tmpEntry in group['entries']:
+                                tmpEntry['done'] = True
+                            self.cond.notifyAll()
+                    else:
+                        self.cond.wait(timeLeft)
+                else:
+                    # being flushed by another thread
+                    self.cond.wait()
+        finally:
+            self.cond.release()
+        if entry['excInfo'] != None:
+            raise entry['excInfo'][0],entry['excInfo'][1],entry['excInfo'][2]
+        return entry['result']
+
+
+    # submit accumulated jobs in one call and map results back to each entry
+    def flush(self,key,group):
+        userName,fqans,toPending,relationType = key
+        pandaJobs = []
+        oldPandaIDs = []
+        for entry in group['entries']:
+            pandaJobs += entry['jobs']
+            oldPandaIDs += entry['oldPandaIDs']
+        try:
+            logger.debug('bulk storeJobs for {0} jobs of {1} tasks with user={2}'.format(len(pandaJobs),
+                                                                                       len(group['entries']),
+                                                                                       userName))
+            resSubmit = self.taskBufferIF.storeJobs(pandaJobs,userName,
+                                                    fqans=list(fqans),toPending=toPending,
+                                                    oldPandaIDs=oldPandaIDs,
+                                                    relationType=relationType)
+            if len(resSubmit) != len(pandaJobs):
+                raise RuntimeError,'storeJobs returned {0} results for {1} jobs'.format(len(resSubmit),
+                                                                                     len(pandaJobs))
+            idx = 0
+            for entry in group['entries']:
+                entry['result'] = resSubmit[idx:idx+len(entry['jobs'])]
+                idx += len(entry['jobs'])
+        except:
+            excInfo = sys.exc_info()
+            for entry in group['entries']:
+                entry['excInfo'] = excInfo
+
+
+
+# thread for a stage of pipelined job generation
+class JobGeneratorStageThread (JobGeneratorThread):
+
+    # constructor
+    def __init__(self,pipeline,stageIndex,workerIndex,*args):
+        JobGeneratorThread.__init__(self,*args)
+        self.pipeline    = pipeline
+        self.stageIndex  = stageIndex
+        self.workerIndex = workerIndex
+
+
+    # main
+    def runImpl(self):
+        stageName,methodNameList = self.pipeline.stageList[self.stageIndex]
+        isLastStage = self.stageIndex+1 == len(self.pipeline.stageList)
+        try:
+            while True:
+                # the first stage takes inputs from the list while others take them from the queue
+                if self.stageIndex == 0:
+                    workItemList = self.getWorkItems()
+                    if workItemList == None:
+                        break
+                else:
+                    workItem = self.pipeline.getItem(self.stageIndex,self.workerIndex)
+                    if workItem == None:
+                        break
+                    workItemList = [workItem]
+                for workItem in workItemList:
+                    startTime = time.time()
+                    try:
+                        for methodName in methodNameList:
+                            getattr(self,methodName)(workItem)
+                            if workItem.skipped:
+                                break
+                    except:
+                        errtype,errvalue = sys.exc_info()[:2]
+                        logger.error('%s.runImpl() failed in %s with %s %s jediTaskID=%s' % (self.__class__.__name__,stageName,
+                                                                                             errtype.__name__,errvalue,
+                                                                                             workItem.taskSpec.jediTaskID))
+                        workItem.skipped = True
+                        if workItem.tmpLog != None:
+                            self.releaseCounter(workItem)
+                    self.pipeline.record(self.stageIndex,'exec',time.time()-startTime)
+                    # pass to the next stage
+                    if not workItem.skipped and not isLastStage:
+                        self.pipeline.putItem(self.stageIndex,workItem)
+        finally:
+            self.pipeline.finishWorker(self.stageIndex)
+        if isLastStage:
+            self.sendSummary()
+
+
+
+
 ########## launch 
                 
 def launcher(commuChannel,taskBufferIF,ddmIF,vos,prodSourceLabels,cloudList,
@@ -1,5 +1,6 @@
 from pandajedi.jedicore import Interaction
 from pandajedi.jedicore.MsgWrapper import MsgWrapper
+from pandajedi.jedicore import VectorSplitter
 
 # logger
 from pandacommon.pandalogger.PandaLogger import PandaLogger
@@ -13,6 +14,8 @@ class JobSplitter:
     def __init__(self):
         self.sizeGradientsPerInSizeForMerge = 1.2
         self.interceptsMerginForMerge = 500 * 1024 * 1024
+        # use cumulative sums instead of the per-file loop for homogeneous chunks
+        self.useVectorSplitter = True
 
         
 
@@ -113,6 +116,24 @@ class JobSplitter:
                                                                                                        respectLB,
                                                                                                        dynNumEvents))
         tmpLog.debug('multiplicity={0} splitByFields={1}'.format(multiplicity,str(splitByFields)))
+        # use cumulative sums for homogeneous chunks
+        vectorSplitter = None
+        if self.useVectorSplitter:
+            vectorSplitter = VectorSplitter.getSplitter(inputChunk,maxNumFiles=maxNumFiles,
+                                                        sizeGradients=sizeGradients,
+                                                        sizeIntercepts=sizeIntercepts,
+                                                        nFilesPerJob=nFilesPerJob,
+                                                        walltimeGradient=walltimeGradient,
+                                                        nEventsPerJob=nEventsPerJob,
+                                                        useBoundary=useBoundary,
+                                                        sizeGradientsPerInSize=sizeGradientsPerInSize,
+                                                        maxOutSize=maxOutSize,
+                                                        respectLB=respectLB,
+                                                        dynNumEvents=dynNumEvents,
+                                                        maxNumEventRanges=maxNumEventRanges,
+                                                        multiplicity=multiplicity,
+                                                        splitByFields=splitByFields)
+        tmpLog.debug('vectorSplitter={0}'.format(vectorSplitter != None))
         # split
         returnList = []
         subChunks  = []
@@ -164,25 +185,32 @@ class JobSplitter:
                                                                                               coreCount,corePower))
 
             # get sub chunk
-            subChunk = inputChunk.getSubChunk(siteName,maxSize=maxSize,
-                                              maxNumFiles=maxNumFiles,
-                                              sizeGradients=sizeGradients,
-                                              sizeIntercepts=sizeIntercepts,
-                                              nFilesPerJob=nFilesPerJob,
-                                              walltimeGradient=walltimeGradient,
-                                              maxWalltime=maxWalltime,
-                                              nEventsPerJob=nEventsPerJob,
-                                              useBoundary=useBoundary,
-                                              sizeGradientsPerInSize=sizeGradientsPerInSize,
-                                              maxOutSize=maxOutSize,
-                                              coreCount=coreCount,
-                                              respectLB=respectLB,
-                                              corePower=corePower,
-                                              dynNumEvents=dynNumEvents,
-                                              maxNumEventRanges=maxNumEventRanges,
-                                              multiplicity=multiplicity,
-                                              splitByFields=splitByFields,
-                                              tmpLog=tmpLog)
+            if vectorSplitter != None:
+                subChunk = vectorSplitter.getSubChunk(siteName,maxSize=maxSize,
+                                                      maxWalltime=maxWalltime,
+                                                      coreCount=coreCount,
+                                                      corePower=corePower,
+                                                      tmpLog=tmpLog)
+            else:
+                subChunk = inputChunk.getSubChunk(siteName,maxSize=maxSize,
+                                                  maxNumFiles=maxNumFiles,
+                                                  sizeGradients=sizeGradients,
+                                                  sizeIntercepts=sizeIntercepts,
+                                                  nFilesPerJob=nFilesPerJob,
+                                                  walltimeGradient=walltimeGradient,
+                                                  maxWalltime=maxWalltime,
+                                                  nEventsPerJob=nEventsPerJob,
+                                                  useBoundary=useBoundary,
+                                                  sizeGradientsPerInSize=sizeGradientsPerInSize,
+                                                  maxOutSize=maxOutSize,
+                                                  coreCount=coreCount,
+                                                  respectLB=respectLB,
+                                                  corePower=corePower,
+                                                  dynNumEvents=dynNumEvents,
+                                                  maxNumEventRanges=maxNumEventRanges,
+                                                  multiplicity=multiplicity,
+                                                  splitByFields=splitByFields,
+                                                  tmpLog=tmpLog)
             if subChunk == None:
                 break
             if subChunk != []:
@@ -17,17 +17,24 @@ class JobThrottler (FactoryBase):
 
     # main
     def toBeThrottled(self,vo,sourceLabel,cloudName,workQueue,jobStat):
-        impl = self.getImpl(vo,sourceLabel)
-        retVal = impl.toBeThrottled(vo,sourceLabel,cloudName,workQueue,jobStat)
-        # retrieve min priority and max number of jobs from concrete class
-        self.minPriority = impl.minPriority
-        self.maxNumJobs = impl.maxNumJobs
-        self.lackOfJobs = impl.underNqLimit
+        # SiteMapper of the implementation shared in the process is refreshed by the registry
+        impl = self.getImpl(vo,sourceLabel,doRefresh=False)
+        # lock per implementation since it keeps results as attributes
+        impl.lock.acquire()
+        try:
+            impl.resetResults()
+            retVal = impl.toBeThrottled(vo,sourceLabel,cloudName,workQueue,jobStat)
+            # retrieve min priority and max number of jobs from concrete class
+            self.minPriority = impl.minPriority
+            self.maxNumJobs = impl.maxNumJobs
+            self.lackOfJobs = impl.underNqLimit
+        finally:
+            impl.lock.release()
         return retVal
 
 
 
     # check throttle level
     def mergeThrottled(self,vo,sourceLabel,thrLevel):
-        impl = self.getImpl(vo,sourceLabel)
+        impl = self.getImpl(vo,sourceLabel,doRefresh=False)
         return impl.mergeThrottled(thrLevel)
@@ -36,6 +36,8 @@ class PostProcessor (JediKnight,FactoryBase):
         # start base classes
         JediKnight.start(self)
         FactoryBase.initializeMods(self,self.taskBufferIF,self.ddmIF)
+        # long-lived pool of workers
+        workerPool = self.makeWorkerPool(jedi_config.postprocessor)
         # go into main loop
         while True:
             startTime = datetime.datetime.utcnow()
@@ -68,16 +70,10 @@ class PostProcessor (JediKnight,FactoryBase):
                             taskList = ListWithLock(tmpList)
                             # make thread pool
                             threadPool = ThreadPool()
-                            # make workers
-                            nWorker = jedi_config.postprocessor.nWorkers
-                            for iWorker in range(nWorker):
-                                thr = PostProcessorThread(taskList,threadPool,
-                                                          self.taskBufferIF,
-                                                          self.ddmIF,
-                                                          self)
-                                thr.start()
-                            # join
-                            threadPool.join()
+                            # run workers in the pool
+                            workerPool.process(taskList,PostProcessorThread,
+                                               (threadPool,self.taskBufferIF,self.ddmIF,self))
+                            tmpLog.info('worker pool : {0}'.format(workerPool.dump()))
                 tmpLog.info('done')
             except:
                 errtype,errvalue = sys.exc_info()[:2]
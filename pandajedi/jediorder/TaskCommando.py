@@ -35,6 +35,8 @@ class TaskCommando (JediKnight):
     def start(self):
         # start base classes
         JediKnight.start(self)
+        # long-lived pool of workers
+        workerPool = self.makeWorkerPool(jedi_config.tcommando)
         # go into main loop
         while True:
             startTime = datetime.datetime.utcnow()
@@ -57,15 +59,10 @@ class TaskCommando (JediKnight):
                             taskList = ListWithLock(tmpList)
                             # make thread pool
                             threadPool = ThreadPool()
-                            # make workers
-                            nWorker = jedi_config.taskrefine.nWorkers
-                            for iWorker in range(nWorker):
-                                thr = TaskCommandoThread(taskList,threadPool,
-                                                         self.taskBufferIF,
-                                                         self.ddmIF)
-                                thr.start()
-                            # join
-                            threadPool.join()
+                            # run workers in the pool
+                            workerPool.process(taskList,TaskCommandoThread,
+                                               (threadPool,self.taskBufferIF,self.ddmIF))
+                            tmpLog.debug('worker pool : {0}'.format(workerPool.dump()))
                 tmpLog.debug('done')
             except:
                 errtype,errvalue = sys.exc_info()[:2]
@@ -0,0 +1,672 @@
+"""
+stand-ins of task buffer, DDM and brokerage to run JobGenerator offline
+
+"""
+
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import datetime
+import threading
+
+from pandajedi.jedicore import Interaction
+from pandajedi.jedicore.JediTaskSpec import JediTaskSpec
+from pandajedi.jedicore.JediDatasetSpec import JediDatasetSpec
+from pandajedi.jedicore.JediFileSpec import JediFileSpec
+from pandajedi.jedicore.InputChunk import InputChunk
+from pandajedi.jedicore.SiteCandidate import SiteCandidate
+from pandajedi.jedibrokerage.JobBrokerBase import JobBrokerBase
+
+
+# name of VO used in simulation
+simulVO = 'simul'
+
+
+# make fixture of sites and datasets
+def makeFixture(nTasks,nFilesPerTask,nSites=5,nEventsPerFile=1000,fileSize=2*1024*1024*1024,seed=0):
+    rand = random.Random(seed)
+    fixture = {'cloud':'SIMUL',
+               'sites':{},
+               'datasets':{}}
+    siteNames = []
+    for iSite in range(nSites):
+        siteName = 'SIMUL_SITE_{0}'.format(iSite)
+        siteNames.append(siteName)
+        fixture['sites'][siteName] = {'ddm':'{0}_DATADISK'.format(siteName),
+                                      'status':'online',
+                                      'maxwdir':500*1024,
+                                      'maxtime':2*24*60*60,
+                                      'coreCount':1,
+                                      'corepower':10,
+                                      'maxmemory':4000,
+                                      'minmemory':0,
+                                      'direct_access_lan':False}
+    for iTask in range(nTasks):
+        datasetName = 'simul:simul.{0:06d}.evgen.EVNT'.format(iTask)
+        fileMap = {}
+        for iFile in range(nFilesPerTask):
+            guid = str(uuid.UUID(int=rand.getrandbits(128)))
+            fileMap[guid] = {'lfn':'EVNT.{0:06d}._{1:06d}.pool.root.1'.format(iTask,iFile+1),
+                             'guid':guid,
+                             'scope':'simul',
+                             'fsize':rand.randint(fileSize/2,fileSize),
+                             'checksum':'ad:{0:08x}'.format(rand.getrandbits(32)),
+                             'events':nEventsPerFile}
+        replicaMap = {}
+        for siteName in rand.sample(siteNames,min(2,nSites)):
+            replicaMap[fixture['sites'][siteName]['ddm']] = [{'total':nFilesPerTask,'found':nFilesPerTask}]
+        fixture['datasets'][datasetName] = {'metadata':{'state':'closed',
+                                                        'is_open':False,
+                                                        'did_type':'DATASET',
+                                                        'length':nFilesPerTask},
+                                            'replicas':replicaMap,
+                                            'files':fileMap}
+    return fixture
+
+
+
+# site spec
+class SimulSiteSpec(object):
+
+    # constructor
+    def __init__(self,siteName,cloud,attrMap):
+        self.sitename = siteName
+        self.cloud = cloud
+        self.ddm = attrMap['ddm']
+        self.ddm_endpoints = SimulEndpoints()
+        self.status = attrMap['status']
+        self.maxwdir = attrMap['maxwdir']
+        self.maxtime = attrMap['maxtime']
+        self.coreCount = attrMap['coreCount']
+        self.corepower = attrMap['corepower']
+        self.maxmemory = attrMap['maxmemory']
+        self.minmemory = attrMap['minmemory']
+        self.direct_access_lan = attrMap['direct_access_lan']
+
+
+    def isDirectIO(self):
+        return self.direct_access_lan
+
+
+    def getJobSeed(self):
+        return 'std'
+
+
+
+# DDM endpoints of a site
+class SimulEndpoints(object):
+
+    def getAssoicatedEndpoint(self,patt):
+        return None
+
+
+
+# site mapper
+class SimulSiteMapper(object):
+
+    # constructor
+    def __init__(self,fixture):
+        self.cloudName = fixture['cloud']
+        self.siteSpecMap = {}
+        for siteName,attrMap in fixture['sites'].iteritems():
+            self.siteSpecMap[siteName] = SimulSiteSpec(siteName,self.cloudName,attrMap)
+
+
+    def checkSite(self,siteName):
+        return siteName in self.siteSpecMap
+
+
+    def getSite(self,siteName):
+        return self.siteSpecMap[siteName]
+
+
+    def getCloud(self,cloudName):
+        return {'sites':sorted(self.siteSpecMap.keys()),
+                'source':sorted(self.siteSpecMap.keys())[0]}
+
+
+
+# work queue
+class SimulWorkQueue(object):
+
+    # constructor
+    def __init__(self):
+        self.queue_id = 1
+        self.queue_name = 'simul'
+        self.queue_type = 'managed'
+        self.VO = simulVO
+
+
+
+# fake AtlasDDMClient backed by a fixture
+class SimulDDMClient(object):
+
+    # constructor
+    def __init__(self,fixture):
+        self.fixture = fixture
+        self.lock = threading.Lock()
+        self.registeredDatasets = set()
+
+
+    # get files in dataset
+    def getFilesInDataset(self,datasetName,getNumEvents=False,skipDuplicate=True,ignoreUnknown=False,longFormat=False):
+        if not datasetName in self.fixture['datasets']:
+            if ignoreUnknown:
+                return self.SC_SUCCEEDED,{}
+            return self.SC_FAILED,'getFilesInDataset : unknown dataset {0}'.format(datasetName)
+        fileMap = {}
+        for guid,fileItem in self.fixture['datasets'][datasetName]['files'].iteritems():
+            attrs = {}
+            attrs['lfn'] = str(fileItem['lfn'])
+            attrs['guid'] = str(guid)
+            attrs['scope'] = str(fileItem['scope'])
+            attrs['fsize'] = fileItem['fsize']
+            attrs['filesize'] = attrs['fsize']
+            attrs['chksum'] = str(fileItem['checksum'])
+            attrs['md5sum'] = attrs['chksum']
+            attrs['checksum'] = attrs['chksum']
+            attrs['events'] = str(fileItem['events'])
+            fileMap[attrs['guid']] = attrs
+        return self.SC_SUCCEEDED,fileMap
+
+
+    # list dataset replicas
+    def listDatasetReplicas(self,datasetName):
+        if not datasetName in self.fixture['datasets']:
+            return self.SC_FAILED,'listDatasetReplicas : unknown dataset {0}'.format(datasetName)
+        return self.SC_SUCCEEDED,self.fixture['datasets'][datasetName]['replicas']
+
+
+    # get dataset metadata
+    def getDatasetMetaData(self,datasetName):
+        if not datasetName in self.fixture['datasets']:
+            return self.SC_FAILED,'getDatasetMetaData : unknown dataset {0}'.format(datasetName)
+        return self.SC_SUCCEEDED,self.fixture['datasets'][datasetName]['metadata']
+
+
+    # list datasets
+    def listDatasets(self,datasetName,ignorePandaDS=True):
+        pattern = re.sub('/$','',datasetName).replace('*','.*')
+        dsList = [tmpName for tmpName in self.fixture['datasets'].keys() if re.search('^'+pattern+'$',tmpName) != None]
+        return self.SC_SUCCEEDED,dsList
+
+
+    # register new dataset
+    def registerNewDataset(self,datasetName,backEnd='rucio',location=None,lifetime=None,metaData=None):
+        self.lock.acquire()
+        self.registeredDatasets.add(datasetName)
+        self.lock.release()
+        return self.SC_SUCCEEDED,True
+
+
+    # register dataset location
+    def registerDatasetLocation(self,datasetName,location,lifetime=None,owner=None,backEnd='rucio',
+                                activity=None,grouping=None,weight=None,copies=1):
+        return self.SC_SUCCEEDED,True
+
+
+    # get endpoints for a site
+    def getSiteAlternateName(self,seName):
+        return [seName]
+
+
+Interaction.installSC(SimulDDMClient)
+
+
+
+# DDM interface with the fake client
+class SimulDDMInterface(object):
+
+    # constructor
+    def __init__(self,fixture):
+        self.client = SimulDDMClient(fixture)
+
+
+    def getInterface(self,vo):
+        return self.client
+
+
+
+# in-memory stand-in for methods of JediTaskBuffer used by JobGenerator
+class SimulTaskBuffer(object):
+
+    # constructor. latency is a delay in sec added to each call to emulate DB access
+    def __init__(self,siteMapper,latency=0):
+        self.siteMapper = siteMapper
+        self.siteMapperVersion = None
+        self.latency = latency
+        self.lock = threading.RLock()
+        self.taskParamMap = {}
+        self.datasetMap = {}
+        self.outTemplateMap = {}
+        self.randomSeedMap = {}
+        self.fileIDs = 0
+        self.datasetIDs = 0
+        self.pandaIDs = 0
+        self.nJobs = 0
+        self.nFiles = 0
+        # the number of calls per method
+        self.callMap = {}
+
+
+    # record a call
+    def recordCall(self,methodName):
+        self.lock.acquire()
+        if not methodName in self.callMap:
+            self.callMap[methodName] = 0
+        self.callMap[methodName] += 1
+        self.lock.release()
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+
+    # get new IDs
+    def getNewIDs(self,attrName,nIDs=1):
+        self.lock.acquire()
+        firstID = getattr(self,attrName)+1
+        setattr(self,attrName,firstID+nIDs-1)
+        self.lock.release()
+        return range(firstID,firstID+nIDs)
+
+
+    # add a dataset
+    def addDataset(self,datasetSpec):
+        datasetSpec.datasetID = self.getNewIDs('datasetIDs')[0]
+        self.datasetMap[(datasetSpec.jediTaskID,datasetSpec.datasetID)] = datasetSpec
+        return datasetSpec.datasetID
+
+
+    # add an output template
+    def addOutputTemplate(self,jediTaskID,datasetID,fileNameTemplate,outType,streamName):
+        if not jediTaskID in self.outTemplateMap:
+            self.outTemplateMap[jediTaskID] = []
+        self.outTemplateMap[jediTaskID].append({'datasetID':datasetID,
+                                                'fileNameTemplate':fileNameTemplate,
+                                                'serialNr':1,
+                                                'outType':outType,
+                                                'streamName':streamName})
+
+
+    # add random seeds
+    def addRandomSeeds(self,jediTaskID,datasetID):
+        self.randomSeedMap[jediTaskID] = {'datasetID':datasetID,
+                                          'nextSeed':1,
+                                          'released':[]}
+
+
+    # count output files
+    def addNumFiles(self,nFiles):
+        self.lock.acquire()
+        self.nFiles += nFiles
+        self.lock.release()
+
+
+    # get SiteMapper
+    def getSiteMapper(self):
+        return self.siteMapper
+
+
+    # get the number of idle task buffer instances
+    def getNumIdleChildren(self):
+        return None
+
+
+    # lock task
+    def lockTask_JEDI(self,jediTaskID,pid):
+        self.recordCall('lockTask_JEDI')
+        return True
+
+
+    # get task parameters
+    def getTaskParamsWithID_JEDI(self,jediTaskID):
+        self.recordCall('getTaskParamsWithID_JEDI')
+        return json.dumps(self.taskParamMap[jediTaskID])
+
+
+    # get dataset
+    def getDatasetWithID_JEDI(self,jediTaskID,datasetID):
+        self.recordCall('getDatasetWithID_JEDI')
+        if not (jediTaskID,datasetID) in self.datasetMap:
+            return False,None
+        return True,self.datasetMap[(jediTaskID,datasetID)]
+
+
+    # make output files for a job
+    def makeOutputFiles(self,jediTaskID,isUnMerging,middleName,fileIDs):
+        outMap = {}
+        maxSerialNr = None
+        datasetToRegister = []
+        parallelOutMap = {}
+        timeNow = datetime.datetime.utcnow()
+        for tmpTemplate in self.outTemplateMap.get(jediTaskID,[]):
+            datasetSpec = self.datasetMap[(jediTaskID,tmpTemplate['datasetID'])]
+            if isUnMerging != datasetSpec.type.startswith('trn_'):
+                continue
+            self.lock.acquire()
+            serialNr = tmpTemplate['serialNr']
+            tmpTemplate['serialNr'] += 1
+            self.lock.release()
+            nameTemplate = tmpTemplate['fileNameTemplate'].replace('${SN}','{SN:06d}')
+            nameTemplate = nameTemplate.replace('${SN/P}','{SN:06d}')
+            nameTemplate = nameTemplate.replace('${MIDDLENAME}',middleName)
+            fileSpec = JediFileSpec()
+            fileSpec.jediTaskID = jediTaskID
+            fileSpec.datasetID = tmpTemplate['datasetID']
+            fileSpec.fileID = fileIDs.pop(0)
+            fileSpec.lfn = nameTemplate.format(SN=serialNr)
+            fileSpec.status = 'defined'
+            fileSpec.creationDate = timeNow
+            fileSpec.type = tmpTemplate['outType']
+            fileSpec.keepTrack = 1
+            fileSpec.scope = datasetSpec.datasetName.split(':')[0]
+            outMap[tmpTemplate['streamName']] = fileSpec
+            parallelOutMap[fileSpec.fileID] = [fileSpec]
+            if maxSerialNr == None or maxSerialNr < serialNr:
+                maxSerialNr = serialNr
+        return outMap,maxSerialNr,datasetToRegister,parallelOutMap
+
+
+    # get output files
+    def getOutputFiles_JEDI(self,jediTaskID,provenanceID,simul,instantiateTmpl=False,instantiatedSite=None,
+                            isUnMerging=False,isPrePro=False,xmlConfigJob=None,siteDsMap=None,middleName='',
+                            registerDatasets=False,parallelOutMap=None,fileIDPool=[]):
+        self.recordCall('getOutputFiles_JEDI')
+        if siteDsMap == None:
+            siteDsMap = {}
+        nTemplates = len(self.outTemplateMap.get(jediTaskID,[]))
+        fileIDs = list(fileIDPool[:nTemplates])
+        fileIDs += self.getNewIDs('fileIDs',nTemplates-len(fileIDs))
+        outMap,maxSerialNr,datasetToRegister,tmpParOutMap = self.makeOutputFiles(jediTaskID,isUnMerging,
+                                                                                 middleName,fileIDs)
+        self.addNumFiles(len(outMap))
+        if parallelOutMap == None:
+            parallelOutMap = {}
+        parallelOutMap.update(tmpParOutMap)
+        return outMap,maxSerialNr,datasetToRegister,siteDsMap,parallelOutMap
+
+
+    # get output files for multiple jobs
+    def getOutputFilesBulk_JEDI(self,jediTaskID,outRequests,simul,siteDsMap=None,registerDatasets=False):
+        self.recordCall('getOutputFilesBulk_JEDI')
+        if siteDsMap == None:
+            siteDsMap = {}
+        nTemplates = len(self.outTemplateMap.get(jediTaskID,[]))
+        fileIDs = self.getNewIDs('fileIDs',nTemplates*len(outRequests))
+        retList = []
+        datasetSpecMap = {}
+        for provenanceID,instantiateTmpl,instantiatedSites,isUnMerging,xmlConfigJob,middleName in outRequests:
+            outMap,maxSerialNr,datasetToRegister,parallelOutMap = self.makeOutputFiles(jediTaskID,isUnMerging,
+                                                                                       middleName,fileIDs)
+            for fileSpec in outMap.values():
+                datasetSpecMap[fileSpec.datasetID] = self.datasetMap[(jediTaskID,fileSpec.datasetID)]
+            self.addNumFiles(len(outMap))
+            retList.append([outMap,maxSerialNr,parallelOutMap])
+        return retList,[],siteDsMap,datasetSpecMap
+
+
+    # bulk fetch fileIDs
+    def bulkFetchFileIDs_JEDI(self,jediTaskID,nIDs):
+        self.recordCall('bulkFetchFileIDs_JEDI')
+        return self.getNewIDs('fileIDs',nIDs)
+
+
+    # make a random seed
+    def makeRandomSeed(self,jediTaskID,seedMap):
+        if len(seedMap['released']) > 0:
+            return seedMap['released'].pop(0)
+        fileSpec = JediFileSpec()
+        fileSpec.jediTaskID = jediTaskID
+        fileSpec.datasetID = seedMap['datasetID']
+        fileSpec.fileID = self.getNewIDs('fileIDs')[0]
+        fileSpec.firstEvent = seedMap['nextSeed']
+        fileSpec.lfn = '{0}'.format(fileSpec.firstEvent)
+        fileSpec.status = 'picked'
+        seedMap['nextSeed'] += 1
+        return fileSpec
+
+
+    # get a random seed
+    def getRandomSeed_JEDI(self,jediTaskID,simul):
+        self.recordCall('getRandomSeed_JEDI')
+        if not jediTaskID in self.randomSeedMap:
+            return True,(None,None)
+        seedMap = self.randomSeedMap[jediTaskID]
+        self.lock.acquire()
+        try:
+            fileSpec = self.makeRandomSeed(jediTaskID,seedMap)
+        finally:
+            self.lock.release()
+        return True,(fileSpec,self.datasetMap[(jediTaskID,seedMap['datasetID'])])
+
+
+    # reserve random seeds
+    def reserveRandomSeeds_JEDI(self,jediTaskID,nSeeds,simul):
+        self.recordCall('reserveRandomSeeds_JEDI')
+        if not jediTaskID in self.randomSeedMap:
+            return True,(None,None)
+        seedMap = self.randomSeedMap[jediTaskID]
+        self.lock.acquire()
+        try:
+            fileSpecList = [self.makeRandomSeed(jediTaskID,seedMap) for iSeed in range(nSeeds)]
+        finally:
+            self.lock.release()
+        return True,(fileSpecList,self.datasetMap[(jediTaskID,seedMap['datasetID'])])
+
+
+    # release random seeds
+    def releaseRandomSeeds_JEDI(self,jediTaskID,datasetID,fileIDs):
+        self.recordCall('releaseRandomSeeds_JEDI')
+        return True
+
+
+    # get build file
+    def getBuildFileSpec_JEDI(self,jediTaskID,siteName,associatedSites):
+        self.recordCall('getBuildFileSpec_JEDI')
+        return True,None,None
+
+
+    # get old build file
+    def getOldBuildFileSpec_JEDI(self,jediTaskID,datasetID,fileID):
+        self.recordCall('getOldBuildFileSpec_JEDI')
+        return True,None,None
+
+
+    # insert build file
+    def insertBuildFileSpec_JEDI(self,jobSpec,reusedDatasetID,simul):
+        self.recordCall('insertBuildFileSpec_JEDI')
+        return True
+
+
+    # get PandaIDs of old merge jobs
+    def getOldMergeJobPandaIDs_JEDI(self,jediTaskID,pandaID):
+        self.recordCall('getOldMergeJobPandaIDs_JEDI')
+        return []
+
+
+    # get active jumbo jobs
+    def getActiveJumboJobs_JEDI(self,jediTaskID):
+        self.recordCall('getActiveJumboJobs_JEDI')
+        return {}
+
+
+    # get job parameters of the first job
+    def getJobParamsOfFirstJob_JEDI(self,jediTaskID):
+        self.recordCall('getJobParamsOfFirstJob_JEDI')
+        return None
+
+
+    # check if jumbo jobs are applicable
+    def isApplicableTaskForJumbo(self,jediTaskID):
+        self.recordCall('isApplicableTaskForJumbo')
+        return False
+
+
+    # store jobs
+    def storeJobs(self,jobs,user,joinThr=False,forkSetupper=False,fqans=[],hostname='',resetLocInSetupper=False,
+                  checkSpecialHandling=True,toPending=False,oldPandaIDs=None,relationType=None):
+        self.recordCall('storeJobs')
+        pandaIDs = self.getNewIDs('pandaIDs',len(jobs))
+        self.lock.acquire()
+        self.nJobs += len(jobs)
+        self.lock.release()
+        return [(pandaID,None,None) for pandaID in pandaIDs]
+
+
+    # reset unused files
+    def resetUnusedFiles_JEDI(self,jediTaskID,inputChunk):
+        self.recordCall('resetUnusedFiles_JEDI')
+        return 0
+
+
+    # update task
+    def updateTask_JEDI(self,taskSpec,criteria,oldStatus=None,updateDEFT=False,insertUnknown=None,
+                        setFrozenTime=True,setOldModTime=False):
+        self.recordCall('updateTask_JEDI')
+        return True,1
+
+
+    # unlock process
+    def unlockProcessWithPID_JEDI(self,vo,prodSourceLabel,workqueue_id,pid,useBase):
+        self.recordCall('unlockProcessWithPID_JEDI')
+        return True
+
+
+
+# brokerage to use sites holding replicas of the master dataset
+class SimulJobBroker (JobBrokerBase):
+
+    # constructor
+    def __init__(self,ddmIF,taskBufferIF):
+        JobBrokerBase.__init__(self,ddmIF,taskBufferIF)
+
+
+    # main
+    def doBrokerage(self,taskSpec,cloudName,inputChunk,taskParamMap,liveCounter=None,lockIDs=None):
+        tmpSt,replicaMap = self.ddmIF.listDatasetReplicas(inputChunk.masterDataset.datasetName)
+        if tmpSt != self.SC_SUCCEEDED:
+            return self.SC_FAILED,inputChunk
+        for siteName in self.siteMapper.getCloud(cloudName)['sites']:
+            siteSpec = self.siteMapper.getSite(siteName)
+            if not siteSpec.ddm in replicaMap:
+                continue
+            siteCandidate = SiteCandidate(siteName)
+            siteCandidate.weight = 1
+            inputChunk.addSiteCandidate(siteCandidate)
+        if inputChunk.siteCandidates == {}:
+            return self.SC_FAILED,inputChunk
+        return self.SC_SUCCEEDED,inputChunk
+
+
+
+# generator of synthetic tasks from a fixture
+class SimulTaskGenerator(object):
+
+    # constructor
+    def __init__(self,fixture,taskBuffer,ddmClient):
+        self.fixture = fixture
+        self.taskBuffer = taskBuffer
+        self.ddmClient = ddmClient
+
+
+    # make a task
+    def makeTask(self,jediTaskID,datasetName,nFilesPerJob,useRandomSeed):
+        taskSpec = JediTaskSpec()
+        taskSpec.jediTaskID = jediTaskID
+        taskSpec.taskName = 'simul.{0}.simul.HITS'.format(jediTaskID)
+        taskSpec.status = 'ready'
+        taskSpec.userName = 'simul'
+        taskSpec.vo = simulVO
+        taskSpec.prodSourceLabel = 'managed'
+        taskSpec.workingGroup = 'AP_SIMUL'
+        taskSpec.taskType = 'prod'
+        taskSpec.processingType = 'simul'
+        taskSpec.taskPriority = 500
+        taskSpec.currentPriority = 500
+        taskSpec.coreCount = 1
+        taskSpec.architecture = 'x86_64-slc6-gcc49-opt'
+        taskSpec.transUses = 'Atlas-21.0.0'
+        taskSpec.transHome = 'AtlasProduction-21.0.0.1'
+        taskSpec.transPath = 'Sim_tf.py'
+        taskSpec.walltime = 0
+        taskSpec.outDiskCount = 0
+        taskSpec.outDiskUnit = 'kB'
+        taskSpec.workDiskCount = 0
+        taskSpec.workDiskUnit = 'MB'
+        taskSpec.ramCount = 2000
+        taskSpec.ramUnit = 'MB'
+        taskSpec.baseRamCount = 0
+        taskSpec.reqID = jediTaskID
+        taskSpec.cloud = self.fixture['cloud']
+        taskSpec.workQueue_ID = 1
+        taskSpec.gshare = 'Simul'
+        taskSpec.setSplitRule('nFilesPerJob',str(nFilesPerJob))
+        if useRandomSeed:
+            taskSpec.setSplitRule('randomSeed','0')
+        taskSpec.jobParamsTemplate = '--inputEVNTFile=${IN} --outputHITSFile=${OUTPUT0} ' + \
+                                     '--maxEvents=${MAXEVENTS} --skipEvents=${SKIPEVENTS} ' + \
+                                     '--firstEvent=${FIRSTEVENT} --randomSeed=${RNDMSEED}'
+        self.taskBuffer.taskParamMap[jediTaskID] = {'taskName':taskSpec.taskName,
+                                                    'vo':taskSpec.vo}
+        # input
+        inDatasetSpec = self.makeDataset(jediTaskID,datasetName,'input','IN')
+        tmpSt,fileMap = self.ddmClient.getFilesInDataset(datasetName)
+        for guid,fileItem in sorted(fileMap.iteritems(),key=lambda x: x[1]['lfn']):
+            fileSpec = JediFileSpec()
+            fileSpec.jediTaskID = jediTaskID
+            fileSpec.datasetID = inDatasetSpec.datasetID
+            fileSpec.fileID = self.taskBuffer.getNewIDs('fileIDs')[0]
+            fileSpec.lfn = fileItem['lfn']
+            fileSpec.GUID = guid
+            fileSpec.type = 'input'
+            fileSpec.status = 'ready'
+            fileSpec.fsize = fileItem['fsize']
+            fileSpec.checksum = fileItem['checksum']
+            fileSpec.scope = fileItem['scope']
+            fileSpec.nEvents = int(fileItem['events'])
+            fileSpec.attemptNr = 0
+            fileSpec.maxAttempt = 3
+            fileSpec.keepTrack = 1
+            inDatasetSpec.addFile(fileSpec)
+        inDatasetSpec.nFiles = len(inDatasetSpec.Files)
+        # outputs
+        for datasetType,streamName,fileNameTemplate in [('output','OUTPUT0','HITS.{0}._${{SN}}.pool.root'),
+                                                        ('log','LOG','log.{0}._${{SN}}.job.log.tgz')]:
+            outDatasetSpec = self.makeDataset(jediTaskID,'simul:simul.{0}.{1}'.format(jediTaskID,datasetType),
+                                              datasetType,streamName)
+            self.taskBuffer.addOutputTemplate(jediTaskID,outDatasetSpec.datasetID,
+                                              fileNameTemplate.format(jediTaskID),datasetType,streamName)
+        # random seeds
+        if useRandomSeed:
+            seedDatasetSpec = self.makeDataset(jediTaskID,'seq_number','random_seed','RNDMSEED')
+            self.taskBuffer.addRandomSeeds(jediTaskID,seedDatasetSpec.datasetID)
+        # input chunk
+        inputChunk = InputChunk(taskSpec,inDatasetSpec)
+        return taskSpec,inputChunk
+
+
+    # make a dataset
+    def makeDataset(self,jediTaskID,datasetName,datasetType,streamName):
+        datasetSpec = JediDatasetSpec()
+        datasetSpec.jediTaskID = jediTaskID
+        datasetSpec.datasetName = datasetName
+        datasetSpec.type = datasetType
+        datasetSpec.streamName = streamName
+        datasetSpec.vo = simulVO
+        datasetSpec.status = 'ready'
+        datasetSpec.cloud = self.fixture['cloud']
+        datasetSpec.nFiles = 0
+        self.taskBuffer.addDataset(datasetSpec)
+        return datasetSpec
+
+
+    # make the list of inputs in the same format as getTasksToBeProcessed_JEDI
+    def makeInputList(self,nFilesPerJob=1,useRandomSeed=False,firstTaskID=1):
+        inputList = []
+        for iTask,datasetName in enumerate(sorted(self.fixture['datasets'].keys())):
+            jediTaskID = firstTaskID+iTask
+            taskSpec,inputChunk = self.makeTask(jediTaskID,datasetName,nFilesPerJob,useRandomSeed)
+            inputList.append((jediTaskID,[(taskSpec,self.fixture['cloud'],inputChunk)]))
+        return inputList
@@ -0,0 +1,125 @@
+# run JobGeneratorThread offline with stand-ins of task buffer and DDM to measure throughput
+import os
+import sys
+import json
+import time
+import resource
+import optparse
+
+parser = optparse.OptionParser()
+parser.add_option('--fixture',action='store',dest='fixture',default=None,
+                  help='JSON file of sites and datasets. Generated and written if the file does not exist')
+parser.add_option('--nTasks',action='store',dest='nTasks',type='int',default=10,
+                  help='the number of tasks to be generated')
+parser.add_option('--nFiles',action='store',dest='nFiles',type='int',default=100,
+                  help='the number of input files per task')
+parser.add_option('--nSites',action='store',dest='nSites',type='int',default=5,
+                  help='the number of sites')
+parser.add_option('--nFilesPerJob',action='store',dest='nFilesPerJob',type='int',default=1,
+                  help='the number of input files per job')
+parser.add_option('--nWorkers',action='store',dest='nWorkers',type='int',default=4,
+                  help='the number of JobGeneratorThreads')
+parser.add_option('--latency',action='store',dest='latency',type='float',default=0,
+                  help='delay in sec added to each call to the task buffer to emulate DB access')
+parser.add_option('--randomSeed',action='store_const',const=True,dest='randomSeed',default=False,
+                  help='use random seeds')
+options,args = parser.parse_args()
+
+# to import the stand-ins by module name
+sys.path.insert(0,os.path.dirname(os.path.abspath(__file__)))
+import SimulJobGenerator
+
+# use the stand-ins for the simulation VO
+from pandajedi.jediconfig import jedi_config
+jedi_config.jobbroker.modConfig += ',{0}:any:SimulJobGenerator:SimulJobBroker'.format(SimulJobGenerator.simulVO)
+jedi_config.tasksetup.modConfig += ',{0}:any:pandajedi.jedisetup.GenTaskSetupper:GenTaskSetupper'.format(SimulJobGenerator.simulVO)
+
+from pandajedi.jediorder.JobGenerator import JobGeneratorThread
+from pandajedi.jediorder.TaskSetupper import TaskSetupper
+from pandajedi.jedicore.ThreadUtils import ThreadPool,ListWithLock
+from pandajedi.jedicore.InteractionStats import Histogram
+
+# fixture
+if options.fixture != None and os.path.exists(options.fixture):
+    with open(options.fixture) as f:
+        fixture = json.load(f)
+else:
+    fixture = SimulJobGenerator.makeFixture(options.nTasks,options.nFiles,options.nSites)
+    if options.fixture != None:
+        with open(options.fixture,'w') as f:
+            json.dump(fixture,f)
+
+siteMapper = SimulJobGenerator.SimulSiteMapper(fixture)
+tbIF = SimulJobGenerator.SimulTaskBuffer(siteMapper,options.latency)
+ddmIF = SimulJobGenerator.SimulDDMInterface(fixture)
+workQueue = SimulJobGenerator.SimulWorkQueue()
+
+taskSetupper = TaskSetupper(SimulJobGenerator.simulVO,'managed')
+taskSetupper.initializeMods(tbIF,ddmIF)
+
+# synthetic tasks
+taskGenerator = SimulJobGenerator.SimulTaskGenerator(fixture,tbIF,ddmIF.getInterface(SimulJobGenerator.simulVO))
+tmpInputList = taskGenerator.makeInputList(options.nFilesPerJob,options.randomSeed)
+nInputs = len(tmpInputList)
+inputList = ListWithLock(tmpInputList)
+
+
+# JobGeneratorThread to measure the time spent in each stage
+class TimedJobGeneratorThread (JobGeneratorThread):
+
+    # histograms of stages
+    histMap = {}
+
+    # constructor
+    def __init__(self,*args):
+        JobGeneratorThread.__init__(self,*args)
+        for stageName,methodName in self.stageList:
+            if not stageName in self.histMap:
+                self.histMap[stageName] = Histogram(1e-6)
+            setattr(self,methodName,self.makeTimedMethod(stageName,getattr(self,methodName)))
+
+
+    # wrap a stage method
+    def makeTimedMethod(self,stageName,method):
+        def timedMethod(workItem):
+            startTime = time.time()
+            try:
+                return method(workItem)
+            finally:
+                self.histMap[stageName].add(time.time()-startTime)
+        return timedMethod
+
+
+
+# run
+threadPool = ThreadPool()
+startTime = time.time()
+for iWorker in range(options.nWorkers):
+    thr = TimedJobGeneratorThread(inputList,threadPool,tbIF,ddmIF,siteMapper,
+                                  False,taskSetupper,os.getpid(),workQueue,fixture['cloud'],
+                                  None,ListWithLock([]),False)
+    thr.start()
+threadPool.join()
+duration = time.time()-startTime
+
+# report
+print 'tasks    : {0}'.format(nInputs)
+print 'workers  : {0}'.format(options.nWorkers)
+print 'jobs     : {0}'.format(tbIF.nJobs)
+print 'files    : {0}'.format(tbIF.nFiles)
+print 'duration : {0:.3f} sec'.format(duration)
+if duration > 0:
+    print 'rate     : {0:.1f} jobs/sec'.format(tbIF.nJobs/duration)
+print 'peak RSS : {0:.1f} MB'.format(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024.0)
+print
+print '{0:10s} {1:>8s} {2:>10s} {3:>10s} {4:>10s} {5:>10s}'.format('stage','count','mean','p50','p95','max')
+for stageName,methodName in JobGeneratorThread.stageList:
+    summary = TimedJobGeneratorThread.histMap[stageName].getSummary()
+    if summary['count'] == 0:
+        continue
+    print '{0:10s} {1:8d} {2:10.6f} {3:10.6f} {4:10.6f} {5:10.6f}'.format(stageName,summary['count'],summary['mean'],
+                                                                         summary['p50'],summary['p95'],summary['max'])
+print
+print '{0:32s} {1:>8s}'.format('task buffer method','calls')
+for methodName,nCalls in sorted(tbIF.callMap.iteritems()):
+    print '{0:32s} {1:8d}'.format(methodName,nCalls)
@@ -0,0 +1,127 @@
+# compare subchunks made by the vectorized splitter with those made by the per-file loop
+import os
+import sys
+import copy
+import random
+
+sys.path.insert(0,os.path.dirname(os.path.abspath(__file__)))
+import SimulJobGenerator
+
+from pandajedi.jedicore.JediTaskSpec import JediTaskSpec
+from pandajedi.jedicore.JediDatasetSpec import JediDatasetSpec
+from pandajedi.jedicore.JediFileSpec import JediFileSpec
+from pandajedi.jedicore.InputChunk import InputChunk
+from pandajedi.jedicore.SiteCandidate import SiteCandidate
+from pandajedi.jedicore import VectorSplitter
+from pandajedi.jediorder.JobSplitter import JobSplitter
+
+try:
+    nTrials = int(sys.argv[1])
+except:
+    nTrials = 200
+
+VectorSplitter.minNumFiles = 0
+
+
+# make a random input chunk
+def makeInputChunk(rand,siteMapper):
+    taskSpec = JediTaskSpec()
+    taskSpec.jediTaskID = 1
+    taskSpec.splitRule = None
+    splitType = rand.choice(['files','events','size','filesAndEvents'])
+    if splitType in ['files','filesAndEvents']:
+        taskSpec.setSplitRule('nFilesPerJob',str(rand.randint(1,10)))
+    if splitType in ['events','filesAndEvents']:
+        taskSpec.setSplitRule('nEventsPerJob',str(rand.choice([100,500,1000,5000])))
+    if rand.random() < 0.3:
+        taskSpec.setSplitRule('nMaxFilesPerJob',str(rand.choice([0,1,2,5,50])))
+    if rand.random() < 0.3:
+        taskSpec.setSplitRule('nGBPerJob',str(rand.randint(1,20)))
+    if rand.random() < 0.2:
+        taskSpec.setSplitRule('nEsConsumers',str(rand.randint(1,4)))
+    taskSpec.outDiskCount = rand.choice([None,0,10,500,2000])
+    taskSpec.outDiskUnit = rand.choice(['kB','MB','kBPerEvent'])
+    taskSpec.workDiskCount = rand.choice([None,0,100,2000])
+    taskSpec.workDiskUnit = 'MB'
+    taskSpec.walltime = rand.choice([None,0,rand.randint(1,100),2**rand.uniform(-7,10)])
+    taskSpec.cpuTime = rand.choice([None,0,rand.randint(1,100),2**rand.uniform(-7,10)])
+    taskSpec.cpuTimeUnit = rand.choice([None,'HS06sPerEvent'])
+    taskSpec.baseWalltime = rand.choice([0,600])
+    taskSpec.cpuEfficiency = rand.choice([0,50,90])
+    # master dataset
+    datasetSpec = JediDatasetSpec()
+    datasetSpec.jediTaskID = 1
+    datasetSpec.datasetID = 1
+    datasetSpec.datasetName = 'simul:simul.test'
+    datasetSpec.type = 'input'
+    datasetSpec.masterID = None
+    nFiles = rand.randint(1,300)
+    nEventsPerFile = rand.choice([100,1000,5000])
+    eventRange = rand.choice([None,nEventsPerFile,nEventsPerFile/4])
+    fileID = 0
+    for iFile in range(nFiles):
+        if eventRange == None:
+            rangeList = [(None,None)]
+        else:
+            rangeList = [(iEvent,min(iEvent+eventRange,nEventsPerFile)-1) for iEvent in range(0,nEventsPerFile,eventRange)]
+            # skip some ranges to make discontinuity
+            if rand.random() < 0.1:
+                rangeList = rangeList[1:] or rangeList
+        for startEvent,endEvent in rangeList:
+            fileID += 1
+            fileSpec = JediFileSpec()
+            fileSpec.fileID = fileID
+            fileSpec.lfn = 'EVNT.{0:06d}.pool.root.1'.format(iFile)
+            fileSpec.fsize = long(2**rand.uniform(10,32))
+            fileSpec.nEvents = nEventsPerFile
+            fileSpec.startEvent = startEvent
+            fileSpec.endEvent = endEvent
+            datasetSpec.addFile(fileSpec)
+    datasetSpec.nFiles = len(datasetSpec.Files)
+    datasetSpec.nFilesToBeUsed = datasetSpec.nFiles - rand.choice([0,1])
+    inputChunk = InputChunk(taskSpec,datasetSpec)
+    for siteName in sorted(siteMapper.siteSpecMap.keys()):
+        siteCandidate = SiteCandidate(siteName)
+        siteCandidate.weight = rand.randint(1,10)
+        siteCandidate.localDiskFiles = rand.sample(datasetSpec.Files,len(datasetSpec.Files)/2)
+        inputChunk.addSiteCandidate(siteCandidate)
+    return inputChunk
+
+
+# make a random site mapper
+def makeSiteMapper(rand):
+    fixture = SimulJobGenerator.makeFixture(0,0,nSites=rand.randint(1,4))
+    for attrMap in fixture['sites'].values():
+        attrMap['maxwdir'] = rand.choice([0,5*1024,20*1024,1000*1024])
+        attrMap['maxtime'] = rand.choice([None,0,3600,12*3600,48*3600])
+        attrMap['coreCount'] = rand.choice([0,1,8])
+        attrMap['corepower'] = rand.choice([None,0,10])
+    return SimulJobGenerator.SimulSiteMapper(fixture)
+
+
+# split and make comparable results
+def split(inputChunk,siteMapper,useVectorSplitter,seed):
+    random.seed(seed)
+    splitter = JobSplitter()
+    splitter.useVectorSplitter = useVectorSplitter
+    tmpStat,subChunkList = splitter.doSplit(inputChunk.taskSpec,inputChunk,siteMapper)
+    retList = []
+    for tmpItem in subChunkList:
+        for subChunk in tmpItem['subChunks']:
+            for datasetSpec,fileList in subChunk:
+                retList.append((tmpItem['siteName'],datasetSpec.datasetID,
+                                [(fileSpec.fileID,fileSpec.locality) for fileSpec in fileList]))
+    return tmpStat,retList
+
+
+nFailed = 0
+for iTrial in range(nTrials):
+    rand = random.Random(iTrial)
+    siteMapper = makeSiteMapper(rand)
+    inputChunk = makeInputChunk(rand,siteMapper)
+    refResult = split(copy.deepcopy(inputChunk),siteMapper,False,iTrial)
+    newResult = split(copy.deepcopy(inputChunk),siteMapper,True,iTrial)
+    if refResult != newResult:
+        nFailed += 1
+        print 'trial={0} splitRule={1} differs'.format(iTrial,inputChunk.taskSpec.splitRule)
+print 'done {0} trials with {1} failures'.format(nTrials,nFailed)
@@ -1,3 +1,5 @@
+import threading
+
 from pandajedi.jedicore import Interaction
 
 # throttle level
@@ -13,6 +15,8 @@ class JobThrottlerBase (object):
         self.retThrottled   = self.SC_SUCCEEDED,True
         self.retUnThrottled = self.SC_SUCCEEDED,False
         self.retMergeUnThr  = self.SC_SUCCEEDED,THR_LEVEL5
+        # lock to check throttle and read the results kept as attributes
+        self.lock = threading.Lock()
         # limit
         self.refresh()
         self.msgType      = 'jobthrottler'
@@ -20,10 +24,15 @@ class JobThrottlerBase (object):
 
     # refresh
     def refresh(self):
+        self.resetResults()
+        self.siteMapper = self.taskBufferIF.getSiteMapper()
+
+
+    # reset results of the last check
+    def resetResults(self):
         self.maxNumJobs  = None
         self.minPriority = None
         self.underNqLimit = False
-        self.siteMapper = self.taskBufferIF.getSiteMapper()
 
         
     # set maximum number of jobs to be submitted    